@@ -12,8 +12,10 @@ from app.models.document_generation import (
     ChatMessageInput
 )
 from app.services.document_generation_service import DocumentGenerationService
+from app.services.context_packing_service import get_context_packer
 from app.services.session_service import SessionService
 from app.core.database import get_database
+from app.core.config import settings
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 router = APIRouter()
@@ -116,14 +118,13 @@ async def generate_documents(
         ]
         
         # Convert chat messages to the format expected by the service
-        # Limit to last 10 messages to reduce token usage
-        recent_messages = session_data.chat_messages[-10:] if len(session_data.chat_messages) > 10 else session_data.chat_messages
+        # (the service packs them into DOCUMENT_CHAT_CONTEXT_TOKENS)
         chat_messages = [
             ChatMessageInput(
                 role=msg.role,
                 content=msg.content
             )
-            for msg in recent_messages
+            for msg in session_data.chat_messages
         ]
         
         # Build foundation details - only essential information
@@ -133,10 +134,10 @@ async def generate_documents(
             "foerderbereich": foundation.get("foerderbereich"),
         }
         
-        # Truncate project query if too long (max 500 chars)
-        project_query = session_data.project_query or ""
-        if len(project_query) > 500:
-            project_query = project_query[:500] + "..."
+        # Truncate project query to its token budget
+        project_query = get_context_packer().truncate(
+            session_data.project_query or "", settings.DOCUMENT_PROJECT_QUERY_TOKENS
+        )
         
         # Create the internal request for the service
         from app.models.document_generation import GenerateDocumentsRequestLegacy
@@ -1,29 +1,54 @@
+import json
+from datetime import date, datetime, timedelta
 from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
 from app.core.database import get_database
-from app.models.scores import FoundationScoresResponse
+from app.models.scores import ExhaustiveScoresPage, FoundationScoresResponse
 from app.models.project_description import ProjectDescription, CharitablePurpose
-from app.services.scoring_service import score_foundations
+from app.services.derivation_service import DERIVED_FIELD
+from app.services.exhaustive_ranking_service import get_exhaustive_ranking_service
+from app.services.scoring_service import explain_scoring, score_foundations, stream_foundation_scores
 
 router = APIRouter()
 
 
+# The derived fields are internal to the scoring pipeline
+PUBLIC_PROJECTION = {DERIVED_FIELD: 0}
+
+
 class FoundationScoresRequest(BaseModel):
     """Request body for foundation scores endpoint."""
     session_id: str
 
 
 @router.get("/")
-async def get_foundations():
+async def get_foundations(
+    deadline_within_days: Optional[int] = Query(
+        None, description="Only foundations with a fixed application deadline in the next N days", ge=0
+    )
+):
     """
     Get all foundations with embedded projects.
     Returns foundations with their past projects included.
+    With deadline_within_days, returns the foundations whose fixed deadline
+    falls between today and today + N days, earliest deadline first.
     """
     db = get_database()
     
     # Fetch all foundations (projects are already embedded in the document)
-    cursor = db.foundations.find({})
+    if deadline_within_days is None:
+        cursor = db.foundations.find({}, PUBLIC_PROJECTION)
+    else:
+        today = datetime.combine(date.today(), datetime.min.time())
+        cursor = db.foundations.find({
+            "antragsprozess.deadline_type": "fixed",
+            f"{DERIVED_FIELD}.deadline": {
+                "$gte": today,
+                "$lte": today + timedelta(days=deadline_within_days),
+            },
+        }, PUBLIC_PROJECTION).sort(f"{DERIVED_FIELD}.deadline", 1)
     foundations = await cursor.to_list(length=None)
     
     # Convert _id to id for JSON serialization
@@ -40,13 +65,16 @@ async def get_foundations():
 @router.get("/scores", response_model=FoundationScoresResponse)
 async def get_foundation_scores_get(
     session_id: str,
-    limit: int = Query(5, description="Number of top matches to return", ge=1, le=20)
+    limit: int = Query(5, description="Number of top matches to return", ge=1, le=20),
+    explain: bool = Query(False, description="Include the candidate funnel and per-stage timings")
 ):
     """
     Get foundations with match scores, fits, mismatches, and questions (GET version).
     
     This endpoint uses AI to analyze the project and match it with foundations.
     For better type safety and required fields, consider using the POST version.
+    With explain=true the response's "explain" field shows the candidate funnel
+    (filter count, text hits, LLM candidates, prompt size) and stage timings.
     """
     try:
         db = get_database()
@@ -54,13 +82,17 @@ async def get_foundation_scores_get(
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        project_description = session["project_description"]
+        project = ProjectDescription(**session["project_description"])
         
         # Score foundations using AI
-        scored_foundations = await score_foundations(project_description, limit, db)
+        explanation = None
+        if explain:
+            scored_foundations, explanation = await explain_scoring(project, limit, db)
+        else:
+            scored_foundations = await score_foundations(project, limit, db)
 
-        project_name = project_description["name"]
-        project_description = project_description["description"]
+        project_name = project.name
+        project_description = project.description
         
         # Generate query summary
         query_summary = f"Found {len(scored_foundations)} matching foundations"
@@ -73,7 +105,8 @@ async def get_foundation_scores_get(
             success=True,
             count=len(scored_foundations),
             foundations=scored_foundations,
-            query_summary=query_summary
+            query_summary=query_summary,
+            explain=explanation
         )
     except HTTPException:
         raise
@@ -87,10 +120,106 @@ async def get_foundation_scores_get(
         )
 
 
+@router.get("/scores/stream")
+async def get_foundation_scores_stream(
+    session_id: str,
+    limit: int = Query(5, description="Number of top matches to return", ge=1, le=20)
+):
+    """
+    Stream foundation scores as newline-delimited JSON (application/x-ndjson).
+
+    Emits one JSON object per line, in this order:
+    - {"event": "candidates", "candidates": [{"id", "name", "score"}, ...]}
+    - {"event": "score", "foundation": FoundationScore} per evaluated foundation
+    - {"event": "ranking", "foundation_ids": [...]} with the final top matches
+    If scoring fails after the stream started, a final
+    {"event": "error", "detail": "..."} line is sent instead of the ranking.
+    """
+    db = get_database()
+    session = await db.sessions.find_one({"session_id": session_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    try:
+        project = ProjectDescription(**session["project_description"])
+    except (KeyError, TypeError, ValueError) as e:
+        # Before the stream starts, so the client gets a regular error response
+        raise HTTPException(status_code=400, detail=f"Invalid project description: {str(e)}")
+
+    async def event_lines():
+        try:
+            async for event in stream_foundation_scores(project, limit, db):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            print(f"❌ Error in get_foundation_scores_stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield json.dumps(
+                {"event": "error", "detail": f"Failed to score foundations: {str(e)}"},
+                ensure_ascii=False,
+            ) + "\n"
+
+    return StreamingResponse(
+        event_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/scores/all", response_model=ExhaustiveScoresPage)
+async def get_all_foundation_scores(
+    session_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page_size: Optional[int] = Query(
+        None, description="Number of foundations per page (default EXHAUSTIVE_PAGE_SIZE)", ge=1, le=100
+    )
+):
+    """
+    Rank the whole purpose-matched catalog for a session, page by page.
+
+    The first request starts a background ranking (cheap stages for every
+    foundation, then LLM evaluation in batches, best candidates first); pages
+    are served from the results persisted so far, best match score first.
+    Follow next_cursor to browse deeper; while status is "running" it may
+    return further results later.
+    """
+    db = get_database()
+    session = await db.sessions.find_one({"session_id": session_id})
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    try:
+        project = ProjectDescription(**session["project_description"])
+        service = get_exhaustive_ranking_service()
+        ranking = await service.ensure_started(db, session_id, project)
+        foundations, next_cursor = await service.page(db, ranking, cursor, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Error in get_all_foundation_scores: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to rank foundations: {str(e)}"
+        )
+
+    return ExhaustiveScoresPage(
+        success=True,
+        status=ranking["status"],
+        total=ranking.get("total"),
+        evaluated=ranking.get("evaluated", 0),
+        count=len(foundations),
+        foundations=foundations,
+        next_cursor=next_cursor
+    )
+
+
 @router.post("/scores", response_model=FoundationScoresResponse)
 async def get_foundation_scores_post(
     request: FoundationScoresRequest = Body(...),
-    limit: int = Query(5, description="Number of top matches to return", ge=1, le=20)
+    limit: int = Query(5, description="Number of top matches to return", ge=1, le=20),
+    explain: bool = Query(False, description="Include the candidate funnel and per-stage timings")
 ):
     """
     Get foundations with match scores, fits, mismatches, and questions (POST version).
@@ -115,13 +244,18 @@ async def get_foundation_scores_post(
         project_description = session["project_description"]
 
           # Score foundations using AI
-        scored_foundations = await score_foundations(ProjectDescription(**project_description), limit, db)
+        explanation = None
+        if explain:
+            scored_foundations, explanation = await explain_scoring(ProjectDescription(**project_description), limit, db)
+        else:
+            scored_foundations = await score_foundations(ProjectDescription(**project_description), limit, db)
         
         return FoundationScoresResponse(
             success=True,
             count=len(scored_foundations),
             foundations=scored_foundations,
-            query_summary="Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+            query_summary="Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.",
+            explain=explanation
         )
     except Exception as e:
         print(f"❌ Error in get_foundation_scores_post: {e}")
@@ -140,7 +274,7 @@ async def get_foundation(foundation_id: str):
     """
     db = get_database()
     
-    foundation = await db.foundations.find_one({"_id": foundation_id})
+    foundation = await db.foundations.find_one({"_id": foundation_id}, PUBLIC_PROJECTION)
     if not foundation:
         raise HTTPException(status_code=404, detail="Foundation not found")
     
@@ -9,6 +9,7 @@ from app.models.session import (
     SessionData,
     UpdateApplicationDocumentsRequest
 )
+from app.services.exhaustive_ranking_service import get_exhaustive_ranking_service
 from app.services.session_service import SessionService
 from app.core.database import get_database
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -119,6 +120,7 @@ async def delete_session(
         
         if not deleted:
             raise HTTPException(status_code=404, detail="Session not found")
+        await get_exhaustive_ranking_service().discard(service.db, session_id)
         
         return {
             "success": True,
@@ -18,6 +18,118 @@ class Settings(BaseSettings):
     # Requesty API
     REQUESTY_API_KEY: str
     REQUESTY_BASE_URL: str = "https://router.requesty.ai/v1"
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    
+    # Event loop monitoring - log when a handler blocks the loop longer than this (0 = off)
+    EVENT_LOOP_BLOCK_WARN_SECONDS: float = 0.5
+    
+    # Scoring - candidate retrieval:
+    # "bm25" = in-process BM25 index, "tfidf" = hashed TF-IDF cosine, "mongo_text" = MongoDB $text
+    SCORING_RETRIEVAL_MODE: str = "bm25"
+    TEXT_INDEX_MAX_AGE_SECONDS: int = 900  # full rebuild of the in-process indexes, 0 = never
+    INDEX_PATCH_MAX_FOUNDATIONS: int = 500  # more changed foundations rebuild instead of patching
+    VECTOR_INDEX_FEATURES: int = 2**18
+    
+    # Scoring - result cache (keyed by project fingerprint, limit and catalog version)
+    SCORING_CACHE_ENABLED: bool = True
+    SCORING_CACHE_MAX_ENTRIES: int = 256
+    SCORING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    SCORING_EVALUATION_MEMO_ENABLED: bool = True  # reuse single evaluations per (project, foundation)
+    
+    # Scoring - LLM evaluation (model, candidates per call, parallel calls, retries per shard)
+    SCORING_MODEL: str = "anthropic/claude-haiku-4-5"
+    SCORING_SHARD_SIZE: int = 4
+    SCORING_MAX_CONCURRENCY: int = 5
+    SCORING_SHARD_RETRIES: int = 1
+    
+    # Scoring - two-tier cascade: SCORING_RANKING_MODEL scores all candidates (scores only), then
+    # SCORING_MODEL writes the detailed evaluation (fits, mismatches, questions) of the top `limit`
+    SCORING_CASCADE: bool = False
+    SCORING_RANKING_MODEL: str = "anthropic/claude-haiku-4-5"
+    
+    # Scoring - heuristic pre-ranking of the text-ranked pool before the LLM
+    SCORING_PRERANK_ENABLED: bool = True
+    SCORING_PRERANK_POOL_SIZE: int = 50  # text-ranked candidates scored by the pre-ranker
+    SCORING_LLM_CANDIDATES: int = 6  # pre-ranked candidates sent to the LLM (at least `limit`)
+    SCORING_HEURISTIC_FALLBACK: bool = False  # serve the pre-ranking if the LLM fails
+    
+    # Scoring - progressive top-k: evaluate the ranked candidates in rounds and stop once the
+    # remaining candidates' prior scores cannot beat the k-th match score (see _iter_progressive)
+    SCORING_PROGRESSIVE: bool = False
+    SCORING_PROGRESSIVE_ROUND_SIZE: int = 4  # candidates per round after the first (which has at least `limit`)
+    SCORING_PROGRESSIVE_MAX_CANDIDATES: int = 16
+    SCORING_PROGRESSIVE_MARGIN: float = 0.05
+    
+    # Scoring - drop foundations whose funding regions cannot cover the project's explicit location
+    # (places only mentioned in the project text are a soft pre-ranking signal, never pruned)
+    SCORING_REGION_PRUNING: bool = True
+    
+    # Scoring - foundations whose fixed application deadline has passed:
+    # "exclude" (dropped at retrieval), "mark" (scored with a mismatch note) or "keep"
+    SCORING_EXPIRED_DEADLINES: str = "exclude"
+    
+    # Scoring - IVF nearest-neighbor index over the foundations' past projects
+    SCORING_PAST_PROJECT_MATCHING: bool = True
+    SCORING_PAST_PROJECT_CANDIDATES: int = 10  # foundations with similar past projects added to the text pool
+    PAST_PROJECT_EMBEDDING_DIM: int = 256
+    PAST_PROJECT_INDEX_LISTS: int = 0  # 0 = sqrt(number of past projects)
+    PAST_PROJECT_INDEX_PROBES: int = 16
+    
+    # Scoring - reuse the ranking of a near-duplicate project (MinHash LSH over recorded projects with
+    # the same charitable purposes and location); only its top foundations are re-evaluated by the LLM,
+    # the others keep the near-duplicate's memoized evaluations
+    SCORING_PROJECT_REUSE: bool = True
+    PROJECT_REUSE_THRESHOLD: float = 0.7  # estimated Jaccard similarity of the project texts
+    PROJECT_REUSE_RECHECK: int = 2  # top reused foundations re-evaluated by the LLM
+    PROJECT_REUSE_INDEX_MAX_AGE_SECONDS: int = 900
+    
+    # Scoring - distilled ranker trained on logged LLM scores (python -m app.train_ranker):
+    # "off", "order" (picks the LLM candidates) or "score" (also scores them, the LLM only explains)
+    SCORING_DISTILLED_RANKER: str = "off"
+    SCORING_LABEL_LOGGING: bool = True
+    SCORING_LABEL_TTL_SECONDS: int = 90 * 24 * 3600  # logged labels expire after this, 0 = never
+    SCORING_RANKER_MIN_LABELS: int = 200
+    SCORING_RANKER_RELOAD_SECONDS: int = 300
+    
+    # Prompt context budgets in tokens (see context_packing_service).
+    # tiktoken downloads the encoding once (cache it offline via TIKTOKEN_CACHE_DIR);
+    # an empty encoding name or a failed load estimates 4 characters per token.
+    CONTEXT_TOKENIZER_ENCODING: str = "cl100k_base"
+    SCORING_PROMPT_PROJECT_TOKENS: int = 600
+    SCORING_PROMPT_TOKENS_PER_FOUNDATION: int = 350
+    CHAT_HISTORY_TOKEN_BUDGET: int = 6000
+    DOCUMENT_CHAT_CONTEXT_TOKENS: int = 800
+    DOCUMENT_FOUNDATION_CONTEXT_TOKENS: int = 200
+    DOCUMENT_PROJECT_QUERY_TOKENS: int = 300
+    
+    # Foundation briefs (python -m app.generate_briefs) - LLM-distilled ~80-token summaries of
+    # focus, exclusions, typical grant and region that replace description and past projects in prompts
+    SCORING_PROMPT_BRIEFS: bool = True
+    SCORING_PROMPT_BRIEF_TOKENS: int = 120
+    BRIEF_MODEL: str = "anthropic/claude-haiku-4-5"
+    BRIEF_FOUNDATIONS_PER_CALL: int = 5
+    BRIEF_MAX_CONCURRENCY: int = 3
+    
+    # Batch re-matching (python -m app.rematch) - projects and distinct foundations per LLM call
+    REMATCH_PROJECTS_PER_CALL: int = 4
+    REMATCH_FOUNDATIONS_PER_CALL: int = 12
+    REMATCH_SESSION_CHUNK_SIZE: int = 500
+    
+    # Exhaustive ranking (GET /foundations/scores/all) - the whole purpose-matched catalog in
+    # LLM batches of EXHAUSTIVE_BATCH_SIZE, in rank order, persisted per session and paged by cursor
+    EXHAUSTIVE_BATCH_SIZE: int = 24
+    EXHAUSTIVE_PAGE_SIZE: int = 20
+    EXHAUSTIVE_STALE_SECONDS: int = 600  # unfinished rankings without progress are resumed after this
+    
+    # Foundation change watcher - bumps the catalog version (invalidating the scoring cache and
+    # indexes) and patches sessions' foundation_results when foundations change.
+    # Every worker starts it, but only the holder of a MongoDB lease watches; the others take
+    # over when the lease is not renewed. Polling (on the foundations' updated_at) is used when
+    # change streams are unavailable.
+    FOUNDATION_WATCHER_ENABLED: bool = True
+    FOUNDATION_WATCHER_POLL_SECONDS: float = 30.0
+    FOUNDATION_WATCHER_LEASE_SECONDS: float = 60.0
+    FOUNDATION_WATCHER_DEBOUNCE_SECONDS: float = 5.0  # changes collected into one version bump
     
     # CORS Origins - comma-separated string
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:3001"
@@ -0,0 +1,59 @@
+"""
+Event loop lag monitor.
+
+A blocking call inside an ``async def`` handler (e.g. a synchronous LLM or
+database call) stalls every other request on the worker. The monitor wakes up
+periodically and logs a warning whenever it was woken up much later than
+scheduled, which points at such a call.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CHECK_INTERVAL_SECONDS = 0.1
+
+
+class LoopMonitor:
+    """Background task that measures how late the event loop wakes it up."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            scheduled = time.perf_counter() + _CHECK_INTERVAL_SECONDS
+            await asyncio.sleep(_CHECK_INTERVAL_SECONDS)
+            lag = time.perf_counter() - scheduled
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                logger.warning(
+                    f"Event loop was blocked for {lag:.2f}s "
+                    f"(threshold {self.threshold:.2f}s) - look for synchronous calls in async handlers"
+                )
+
+    def start(self) -> None:
+        """Start monitoring on the running loop (no-op if disabled or running)."""
+        if self._task is None and self.threshold > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the monitoring task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+loop_monitor = LoopMonitor(settings.EVENT_LOOP_BLOCK_WARN_SECONDS)
@@ -0,0 +1,39 @@
+"""
+Distill every foundation into a compact brief for the scoring prompts.
+Run with: python -m app.generate_briefs [--force]
+"""
+import argparse
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.foundation_brief_service import get_foundation_briefs
+
+
+async def generate_briefs(force: bool):
+    """Generate the briefs of new and changed foundations (of all foundations with force)."""
+    print("Connecting to MongoDB...")
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        counts = await get_foundation_briefs().generate(db, force)
+
+        print(f"\n📊 Foundations: {counts['foundations']} ({counts['up_to_date']} briefs up to date)")
+        print(f"📊 Generated briefs: {counts['generated']} ({counts['failed']} failed)")
+        print("\n✅ Briefs stored; scoring prompts use them while SCORING_PROMPT_BRIEFS is on")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the foundation briefs for scoring prompts.")
+    parser.add_argument("--force", action="store_true", help="Regenerate up-to-date briefs as well")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(generate_briefs(args.force))
+
+
+if __name__ == "__main__":
+    main()
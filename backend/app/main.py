@@ -1,8 +1,19 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.loop_monitor import loop_monitor
 from app.api.routes import chat, foundations, sessions, documents
+from app.services.context_packing_service import get_context_packer
+from app.services.derivation_service import backfill_derived_fields, ensure_deadline_index
+from app.services.exhaustive_ranking_service import get_exhaustive_ranking_service
+from app.services.foundation_catalog_service import get_foundation_catalog
+from app.services.foundation_watcher_service import get_foundation_watcher
+from app.services.mongo_text_index_service import get_mongo_text_index
+from app.services.past_project_index_service import get_past_project_index
+from app.services.text_index_service import get_foundation_text_index
+from app.services.vector_index_service import get_foundation_vector_index
 
 # Create FastAPI app
 app = FastAPI(
@@ -22,12 +33,43 @@ app.add_middleware(
 # Startup/Shutdown events
 @app.on_event("startup")
 async def startup_db_client():
-    """Connect to MongoDB on startup."""
+    """Connect to MongoDB on startup and warm up the foundation retrieval index."""
     await connect_to_mongo()
+    loop_monitor.start()
+    try:
+        # Foundations without derived fields are still scored (computed on the fly)
+        await backfill_derived_fields(get_database())
+        await ensure_deadline_index(get_database())
+    except Exception as e:
+        print(f"⚠️ Could not backfill derived foundation fields on startup: {e}")
+    try:
+        # Weighted German text index used by SCORING_RETRIEVAL_MODE=mongo_text
+        await get_mongo_text_index().ensure(get_database())
+    except Exception as e:
+        print(f"⚠️ Could not create the foundations text index on startup: {e}")
+    try:
+        if settings.SCORING_RETRIEVAL_MODE != "mongo_text":
+            await get_foundation_catalog().ensure_built(get_database())
+        if settings.SCORING_RETRIEVAL_MODE == "tfidf":
+            await get_foundation_vector_index().ensure_built(get_database())
+        elif settings.SCORING_RETRIEVAL_MODE == "bm25":
+            await get_foundation_text_index().ensure_built(get_database())
+        if settings.SCORING_PAST_PROJECT_MATCHING:
+            await get_past_project_index().ensure_built(get_database())
+    except Exception as e:
+        # The index is built lazily on the first scoring request as well
+        print(f"⚠️ Could not build foundation retrieval index on startup: {e}")
+    # Load the tokenizer off the event loop (may download the encoding once)
+    await asyncio.to_thread(get_context_packer)
+    # Keep sessions' stored foundation results in sync with foundation changes
+    get_foundation_watcher().start(get_database())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close MongoDB connection on shutdown."""
+    await loop_monitor.stop()
+    await get_foundation_watcher().stop()
+    await get_exhaustive_ranking_service().stop()
     await close_mongo_connection()
 
 # Include routers
@@ -101,3 +101,17 @@ class Foundation(BaseModel):
             }
         }
 
+
+
+class FoundationBrief(BaseModel):
+    """Compact brief of a foundation, distilled by the LLM for scoring prompts."""
+    foundation_id: str = Field(description="The ID of the foundation")
+    funding_focus: str = Field(description="What the foundation funds, as specific as possible (a few keywords)")
+    exclusions: str = Field(description="What the foundation explicitly does not fund or who cannot apply ('keine' if nothing is stated)")
+    typical_grant: str = Field(description="Typical grant size and form, e.g. 'meist 2.000-10.000 €, Sachmittel'")
+    geographic_limits: str = Field(description="Where projects must take place or applicants must be located")
+
+
+class FoundationBriefsResponse(BaseModel):
+    """Response from LLM containing the briefs of several foundations."""
+    briefs: List[FoundationBrief] = Field(description="List of briefs, one for each foundation")
@@ -37,6 +37,7 @@ class ProjectDescription(BaseModel):
     description: str = Field(..., description="Detailed description of the project idea, should contain all relevant details about the project such as (but not limited to): scope, expected outcomes, needed resources and motivation behind the project")
     target_group: str = Field(..., description="Target group of the project")
     charitable_purpose: list[CharitablePurpose] = Field(..., description="Matching Charitable purposes of the project")
+    location: str | None = Field(default=None, description="Where the project takes place (city, district or federal state), if known")
 
 
 class ProjectDescriptionWrapper(BaseModel):
@@ -22,6 +22,28 @@ class ScoringResponse(BaseModel):
     evaluations: List[FoundationEvaluation] = Field(description="List of foundation evaluations, one for each candidate foundation")
 
 
+class FoundationRanking(BaseModel):
+    """Score-only evaluation of a single foundation (ranking tier of the scoring cascade)."""
+    foundation_id: str = Field(description="The ID of the foundation being evaluated")
+    match_score: float = Field(description="Match score between 0.0 and 1.0, where 1.0 is perfect match", ge=0.0, le=1.0)
+
+
+class RankingResponse(BaseModel):
+    """Response from LLM containing match scores only."""
+    rankings: List[FoundationRanking] = Field(description="List of foundation scores, one for each candidate foundation")
+
+
+class ProjectEvaluations(BaseModel):
+    """Evaluations of one project's candidate foundations in a multi-project scoring call."""
+    project_id: str = Field(description="The ID of the project being evaluated (e.g. P1)")
+    evaluations: List[FoundationEvaluation] = Field(description="List of evaluations, one for each foundation listed for this project")
+
+
+class BatchScoringResponse(BaseModel):
+    """Response from LLM containing evaluations for several projects."""
+    projects: List[ProjectEvaluations] = Field(description="List of project evaluations, one for each project")
+
+
 class FoundationScore(BaseModel):
     """Foundation with match score and analysis."""
     id: str
@@ -45,10 +67,39 @@ class FoundationScore(BaseModel):
     website: str
 
 
+class ScoringExplain(BaseModel):
+    """Candidate funnel and per-stage timings of one scoring request (explain mode)."""
+    cache_hit: bool = False
+    reused_similarity: Optional[float] = None  # similarity of the near-duplicate project whose ranking was reused
+    purpose_filter_count: Optional[int] = None  # foundations passing the purpose/region/deadline filter (not run with mongo_text)
+    text_hits: List[Dict[str, Any]] = []  # the text-ranked pool: id, name, score, past_project_score
+    candidates: List[Dict[str, Any]] = []  # candidates sent to the LLM: id, name, score, prior_score
+    memoized: int = 0  # candidates with a memoized evaluation (no LLM call)
+    llm_calls: List[Dict[str, Any]] = []  # tier, foundation_ids, prompt_chars, prompt_tokens, ms
+    prompt_chars: int = 0
+    prompt_tokens: int = 0  # estimated with the context packer's tokenizer
+    # Wall time per stage; "llm" spans the whole evaluation, "prompt_build" and "conversion" are summed over calls
+    timings_ms: Dict[str, float] = {}
+
+
 class FoundationScoresResponse(BaseModel):
     """Response containing scored foundations."""
     success: bool
     count: int
     foundations: List[FoundationScore]
     query_summary: str
+    explain: Optional[ScoringExplain] = None  # only with ?explain=true
+
+
+class ExhaustiveScoresPage(BaseModel):
+    """A page of a session's exhaustive ranking (best match score first)."""
+    success: bool
+    status: Literal["running", "complete", "failed"]
+    total: Optional[int] = None  # foundations to evaluate (None until the cheap ranking is done)
+    evaluated: int
+    count: int
+    foundations: List[FoundationScore]
+    # Cursor of the next page; while running, poll with it for further results
+    # (None before the first result). None once complete and fully served.
+    next_cursor: Optional[str] = None
 
@@ -0,0 +1,49 @@
+"""
+Re-score the stored projects of many sessions at once, e.g. after a catalog import.
+Run with: python -m app.rematch [--session SESSION_ID ...] [--limit 5] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.rematch_service import get_batch_rematch_service
+
+
+async def rematch_sessions(session_ids: list[str] | None, limit: int, dry_run: bool):
+    """Re-match the given sessions (all sessions with a project if None)."""
+    print("Connecting to MongoDB...")
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        report = await get_batch_rematch_service().rematch(db, session_ids, limit, dry_run)
+
+        print(f"\n📊 Sessions: {report.sessions} ({report.invalid_sessions} with an invalid project)")
+        print(f"📊 Distinct projects: {report.projects} ({report.failed_projects} failed)")
+        print(f"📊 Memoized evaluations reused: {report.memoized_evaluations}")
+        print(f"📊 Batched LLM calls: {report.llm_calls} (+{report.single_project_retries} single-project retries)")
+        if dry_run:
+            print(f"\n✅ Dry run: {report.updated_sessions} sessions would be updated")
+        else:
+            print(f"\n✅ Updated foundation results of {report.updated_sessions} sessions")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score the projects stored in sessions.")
+    parser.add_argument(
+        "--session", dest="session_ids", action="append",
+        help="Session to re-match (repeatable, default: all sessions with a project)",
+    )
+    parser.add_argument("--limit", type=int, default=5, help="Number of foundations stored per session")
+    parser.add_argument("--dry-run", action="store_true", help="Score without writing anything to the database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(rematch_sessions(args.session_ids, args.limit, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,12 @@ Seed database with mock foundation data.
 Run with: python -m app.seed_data
 """
 import asyncio
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.services.catalog_version_service import bump_catalog_version
+from app.services.derivation_service import ensure_deadline_index, with_derived_fields
+from app.services.mongo_text_index_service import get_mongo_text_index
 
 # Mock data based on DATA_SCHEMA.md
 MOCK_FOUNDATIONS = [
@@ -310,15 +314,25 @@ async def seed_database():
         
         # Insert mock data
         print(f"Inserting {len(MOCK_FOUNDATIONS)} foundations...")
-        result = await db.foundations.insert_many(MOCK_FOUNDATIONS)
+        # updated_at lets the polling change watcher find written foundations
+        now = datetime.utcnow()
+        result = await db.foundations.insert_many(
+            [{**with_derived_fields(foundation), "updated_at": now} for foundation in MOCK_FOUNDATIONS]
+        )
         print(f"✅ Successfully inserted {len(result.inserted_ids)} foundations")
         
+        # Invalidate cached scores and in-process indexes of running servers
+        catalog_version = await bump_catalog_version(db)
+        print(f"✅ Catalog version bumped to {catalog_version}")
+        
         # Create indexes
         print("Creating indexes...")
         await db.foundations.create_index("gemeinnuetzige_zwecke")
         await db.foundations.create_index("foerderbereich.scope")
         await db.foundations.create_index("foerderhoehe.category")
-        await db.foundations.create_index([("name", "text"), ("short_description", "text")])
+        await db.foundations.create_index("updated_at")
+        await ensure_deadline_index(db)
+        await get_mongo_text_index().ensure(db)
         print("✅ Indexes created")
         
         # Verify
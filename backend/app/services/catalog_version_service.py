@@ -0,0 +1,96 @@
+"""
+Catalog version counter for the foundations collection.
+
+Every change of the foundation catalog bumps a single counter document: the
+seed script bumps it after writing, and the foundation change watcher bumps it
+for any other write it detects (including direct database edits), storing a
+hash of the catalog state (foundation ids and their ``updated_at``) with it.
+Caches and in-process indexes remember the version they were built from, so
+any foundation change invalidates them without scanning the catalog.
+
+Bumps for known foundations also log the changed ids per version in
+``catalog_changes``, so the in-process indexes of every worker can patch just
+those foundations instead of rebuilding (see index_refresh_service). Bumps
+without ids (catalog imports) and versions whose log entry has expired force a
+full rebuild.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+CATALOG_META_ID = "foundations"
+
+# How long the changed foundation ids of a version are kept for index patching
+CATALOG_CHANGES_TTL = timedelta(days=1)
+
+_changes_index_ready = False
+
+
+async def get_catalog_version(db: AsyncIOMotorDatabase) -> int:
+    """Return the current catalog version (0 if the catalog was never bumped)."""
+    meta = await db.catalog_meta.find_one({"_id": CATALOG_META_ID}, {"version": 1})
+    return int(meta.get("version", 0)) if meta else 0
+
+
+async def get_catalog_state_hash(db: AsyncIOMotorDatabase) -> Optional[str]:
+    """Return the catalog state hash stored with the last version bump, if any."""
+    meta = await db.catalog_meta.find_one({"_id": CATALOG_META_ID}, {"state_hash": 1})
+    return meta.get("state_hash") if meta else None
+
+
+async def bump_catalog_version(
+    db: AsyncIOMotorDatabase,
+    state_hash: Optional[str] = None,
+    foundation_ids: Optional[Iterable[str]] = None,
+) -> int:
+    """
+    Increment the catalog version after a foundation write and return the new value.
+
+    Args:
+        db: Database instance
+        state_hash: Hash of the catalog state after the write
+        foundation_ids: Ids of the changed foundations, logged for index patching
+            (None if unknown, e.g. after an import)
+    """
+    global _changes_index_ready
+    update = {"updated_at": datetime.utcnow().isoformat()}
+    if state_hash is not None:
+        update["state_hash"] = state_hash
+    meta = await db.catalog_meta.find_one_and_update(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}, "$set": update},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    version = int(meta["version"])
+    if foundation_ids is not None:
+        if not _changes_index_ready:
+            await db.catalog_changes.create_index(
+                "created_at", expireAfterSeconds=int(CATALOG_CHANGES_TTL.total_seconds())
+            )
+            _changes_index_ready = True
+        await db.catalog_changes.insert_one(
+            {"_id": version, "foundation_ids": list(foundation_ids), "created_at": datetime.utcnow()}
+        )
+    return version
+
+
+async def get_catalog_changes(
+    db: AsyncIOMotorDatabase, since_version: int, until_version: int
+) -> Optional[Set[str]]:
+    """
+    Ids of the foundations changed after ``since_version`` up to ``until_version``.
+
+    Returns None if the changes of any version in between are unknown.
+    """
+    if until_version <= since_version:
+        return set()
+    cursor = db.catalog_changes.find(
+        {"_id": {"$gt": since_version, "$lte": until_version}}, {"foundation_ids": 1}
+    )
+    entries = await cursor.to_list(length=None)
+    if len(entries) != until_version - since_version:
+        return None
+    return {foundation_id for entry in entries for foundation_id in entry["foundation_ids"]}
@@ -10,12 +10,14 @@ from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app.services.prompt_service import get_project_idea_prompt
+from app.services.context_packing_service import get_context_packer
 
 
 llm = ChatOpenAI(
     model="anthropic/claude-haiku-4-5",
     api_key=SecretStr(settings.REQUESTY_API_KEY),
     base_url=settings.REQUESTY_BASE_URL,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
 )
 
 agent = create_agent(
@@ -74,6 +76,7 @@ class ChatService:
                     elif msg["role"] == "assistant":
                         langchain_messages.append(AIMessage(content=msg["content"]))
             
+            langchain_messages = self._fit_history(langchain_messages)
             print(f"🔍 DEBUG: Invoking agent with {len(langchain_messages)} messages")
             response = await agent.ainvoke({"messages": cast(Any, langchain_messages)})
             print(f"🔍 DEBUG: Agent response: {response}")
@@ -92,6 +95,27 @@ class ChatService:
             raise
 
 
+    def _fit_history(self, messages: list[BaseMessage]) -> list[BaseMessage]:
+        """
+        Keep the chat history within CHAT_HISTORY_TOKEN_BUDGET.
+
+        Keeps the first message (the project idea) and the newest messages that
+        fit the budget; the latest message is always sent.
+        """
+        if len(messages) <= 2:
+            return messages
+        packer = get_context_packer()
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET - packer.count_tokens(str(messages[0].content))
+        kept: list[BaseMessage] = []
+        for message in reversed(messages[1:]):
+            budget -= packer.count_tokens(str(message.content))
+            if kept and budget < 0:
+                break
+            kept.append(message)
+        if len(kept) < len(messages) - 1:
+            print(f"🔍 DEBUG: Dropped {len(messages) - 1 - len(kept)} older messages to fit the token budget")
+        return [messages[0], *reversed(kept)]
+    
     async def handle_llm_response(self, llm_response: ProjectDescriptionWrapper, session_id: str):
         """
         Handle the three possible response modes:
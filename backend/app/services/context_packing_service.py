@@ -0,0 +1,137 @@
+"""
+Token-budget context packing for LLM prompts.
+
+Prompt builders describe their context as prioritized segments and let the
+packer fit them into a token budget, instead of cutting each field at a fixed
+number of characters. Tokens are counted with a local tiktoken encoding; when
+tiktoken or its encoding file is unavailable the packer falls back to an
+estimate of four characters per token.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN = 4
+_ELLIPSIS = "..."
+
+
+@dataclass
+class ContextSegment:
+    """
+    One piece of prompt context.
+
+    Attributes:
+        text: The segment text
+        priority: Segments with higher priority are packed first
+        truncatable: Whether the segment may be shortened to fit the budget
+        min_tokens: Shortest useful length of a truncated segment; below this
+            the segment is dropped instead
+    """
+
+    text: str
+    priority: float = 0.0
+    truncatable: bool = True
+    min_tokens: int = 16
+
+
+class ContextPacker:
+    """Counts tokens and packs prioritized segments into a token budget."""
+
+    def __init__(self, encoding_name: str = ""):
+        self.encoding = None
+        if encoding_name:
+            try:
+                import tiktoken
+
+                self.encoding = tiktoken.get_encoding(encoding_name)
+                logger.info(f"Context packer counts tokens with tiktoken encoding '{encoding_name}'")
+            except Exception as e:
+                # Missing package or encoding file (downloaded on first use)
+                logger.warning(
+                    f"Tokenizer '{encoding_name}' unavailable ({type(e).__name__}), "
+                    f"estimating {_CHARS_PER_TOKEN} characters per token"
+                )
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens in ``text``."""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Shorten ``text`` to at most ``max_tokens`` tokens, marking the cut with "..."."""
+        if max_tokens <= 0:
+            return ""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        keep = max(0, max_tokens - self.count_tokens(_ELLIPSIS))
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            shortened = self.encoding.decode(tokens[:keep])
+        else:
+            shortened = text[: keep * _CHARS_PER_TOKEN]
+        # Prefer cutting at a word boundary
+        boundary = shortened.rfind(" ")
+        if boundary > len(shortened) * 0.8:
+            shortened = shortened[:boundary]
+        return shortened.rstrip() + _ELLIPSIS
+
+    def select(
+        self, segments: Sequence[ContextSegment], budget: int, separator: str = "\n"
+    ) -> List[Optional[str]]:
+        """
+        Fit ``segments`` into ``budget`` tokens.
+
+        Segments are taken in order of priority (stable for equal priorities).
+        A segment that does not fit is truncated to the remaining budget if it
+        is truncatable and at least ``min_tokens`` remain, otherwise dropped.
+        Since any segment can be cut at token granularity, this greedy order
+        maximizes the priority-weighted number of packed tokens.
+
+        Returns:
+            The packed text of each segment in input order (None if dropped)
+        """
+        packed: List[Optional[str]] = [None] * len(segments)
+        separator_tokens = self.count_tokens(separator)
+        remaining = budget
+        order = sorted(range(len(segments)), key=lambda i: -segments[i].priority)
+        for i in order:
+            segment = segments[i]
+            if not segment.text:
+                continue
+            cost = self.count_tokens(segment.text) + separator_tokens
+            if cost <= remaining:
+                packed[i] = segment.text
+                remaining -= cost
+            elif segment.truncatable and remaining - separator_tokens >= segment.min_tokens:
+                packed[i] = self.truncate(segment.text, remaining - separator_tokens)
+                remaining -= self.count_tokens(packed[i]) + separator_tokens
+        return packed
+
+    def pack(
+        self, segments: Sequence[ContextSegment], budget: int, separator: str = "\n"
+    ) -> str:
+        """Fit ``segments`` into ``budget`` tokens and join them in input order."""
+        return separator.join(
+            text for text in self.select(segments, budget, separator) if text is not None
+        )
+
+
+# Global packer instance
+_context_packer = None
+
+
+def get_context_packer() -> ContextPacker:
+    """Get or create the global context packer."""
+    global _context_packer
+    if _context_packer is None:
+        _context_packer = ContextPacker(settings.CONTEXT_TOKENIZER_ENCODING)
+    return _context_packer
@@ -0,0 +1,315 @@
+"""
+Derived foundation fields computed once at ingest time.
+
+Everything the scoring pipeline derives from a foundation document alone
+(funding defaults, the sanitized application process, the normalized deadline,
+the funding display string and the rendered prompt parts) is computed when the
+foundation is written and stored under ``derived`` in the document. The scoring
+hot path only reads it.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Bump when any derivation below changes so stored fields get recomputed
+DERIVATION_VERSION = 4
+
+DERIVED_FIELD = "derived"
+
+# Foundation fields the derivations read; the watcher and the backfill compare
+# their hash to the stored one to decide whether to recompute
+DERIVATION_SOURCE_FIELDS = (
+    "_id",
+    "id",
+    "name",
+    "long_description",
+    "gemeinnuetzige_zwecke",
+    "foerderbereich",
+    "foerderhoehe",
+    "antragsprozess",
+    "past_projects",
+)
+
+# Index for deadline queries (fixed deadlines by date)
+DEADLINE_INDEX = [("antragsprozess.deadline_type", 1), (f"{DERIVED_FIELD}.deadline", 1)]
+
+_DEADLINE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y", "%Y/%m/%d")
+
+# Default funding ranges per foerderhoehe category: (min_amount, max_amount)
+_CATEGORY_FUNDING_DEFAULTS = {
+    "large": (50000, 200000),
+    "großförderung": (50000, 200000),
+    "grossfoerderung": (50000, 200000),
+    "small": (0, 5000),
+    "kleinförderung": (0, 5000),
+    "kleinfoerderung": (0, 5000),
+    "medium": (5000, 50000),
+    "mittelgroße förderung": (5000, 50000),
+    "mittelgrosse foerderung": (5000, 50000),
+}
+
+# Markers that indicate AI reasoning contamination in rolling_info
+_CONTAMINATION_MARKERS = [
+    "Translation:",
+    "Text used:",
+    "Note:",
+    "JSON Construction:",
+    "Wait,",
+    "Snippet",
+    "Setting deadline_type",
+    "(Translation:",
+    "Decision timeline:",
+    "Required documents:",
+    "Evaluation process:",
+]
+
+
+def source_hash(foundation: Dict[str, Any]) -> str:
+    """Hash of the foundation fields the derivations are computed from."""
+    content = {field: foundation.get(field) for field in DERIVATION_SOURCE_FIELDS}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def apply_funding_defaults(foerderhoehe: Any) -> Dict[str, Any]:
+    """Return a copy of foerderhoehe with category-based defaults for missing amounts."""
+    if not isinstance(foerderhoehe, dict):
+        return {}
+
+    result = dict(foerderhoehe)
+    if not result:
+        return result
+
+    min_amount = result.get("min_amount")
+    max_amount = result.get("max_amount")
+    if min_amount is None or max_amount is None:
+        category = result.get("category")
+        defaults = _CATEGORY_FUNDING_DEFAULTS.get(str(category).lower() if category else "")
+        if defaults:
+            result["min_amount"] = min_amount if min_amount is not None else defaults[0]
+            result["max_amount"] = max_amount if max_amount is not None else defaults[1]
+    return result
+
+
+def sanitize_rolling_info(rolling_info: Optional[str]) -> Optional[str]:
+    """
+    Clean up rolling_info field to remove AI reasoning contamination.
+
+    Removes internal notes, translations, and reasoning that may have been
+    included in the data from AI-generated content.
+    """
+    if not rolling_info:
+        return rolling_info
+
+    # Find the earliest contamination marker
+    earliest_pos = len(rolling_info)
+    for marker in _CONTAMINATION_MARKERS:
+        pos = rolling_info.find(marker)
+        if pos != -1 and pos < earliest_pos:
+            earliest_pos = pos
+
+    # Clean the text up to the contamination marker
+    clean_text = rolling_info[:earliest_pos].strip()
+
+    # Remove trailing incomplete sentences
+    if clean_text and not clean_text.endswith(('.', '!', '?')):
+        # Find the last complete sentence
+        last_period = clean_text.rfind('.')
+        if last_period > 0:
+            clean_text = clean_text[:last_period + 1]
+
+    # If we cleaned too much or got empty string, provide fallback
+    if not clean_text or len(clean_text) < 10:
+        return "Anträge sind fortlaufend möglich"
+
+    # Limit to first 2-3 sentences if still too long
+    if len(clean_text) > 300:
+        sentences = clean_text.split('. ')
+        clean_text = '. '.join(sentences[:2]) + '.'
+
+    return clean_text
+
+
+def sanitize_antragsprozess(antragsprozess: Any) -> Dict[str, Any]:
+    """Sanitize application process data, particularly the rolling_info field."""
+    if not isinstance(antragsprozess, dict):
+        return {}
+
+    # Create a copy to avoid modifying the original
+    sanitized = antragsprozess.copy()
+
+    # Clean the rolling_info field if it exists
+    if "rolling_info" in sanitized and sanitized["rolling_info"]:
+        sanitized["rolling_info"] = sanitize_rolling_info(sanitized["rolling_info"])
+
+    return sanitized
+
+
+def parse_deadline(antragsprozess: Any) -> Optional[datetime]:
+    """
+    Normalize a fixed application deadline to a (BSON) datetime at midnight.
+
+    deadline_date is free-form; ISO dates (optionally with a time) and German
+    dates ("31.12.2024") are recognized. Returns None for rolling or
+    unparseable deadlines.
+    """
+    if not isinstance(antragsprozess, dict) or antragsprozess.get("deadline_type") != "fixed":
+        return None
+    value = antragsprozess.get("deadline_date")
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    for candidate in (text[:10], text):
+        for fmt in _DEADLINE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt)
+            except ValueError:
+                continue
+    return None
+
+
+def is_deadline_expired(antragsprozess: Any, today: Optional[date] = None) -> bool:
+    """Whether the application process has a fixed deadline before ``today``."""
+    deadline = parse_deadline(antragsprozess)
+    return deadline is not None and deadline.date() < (today or date.today())
+
+
+def format_funding_amount(foerderhoehe: Any) -> str:
+    """Format funding amount for display."""
+    if not isinstance(foerderhoehe, dict):
+        return "Förderhöhe nicht angegeben"
+
+    max_amount = foerderhoehe.get("max_amount")
+
+    if not max_amount:
+        return "Förderhöhe nicht angegeben"
+
+    # Format with dots as thousands separators (German style)
+    formatted = f"{max_amount:,.0f}".replace(",", ".")
+    return f"Bis zu {formatted} €"
+
+
+def format_prompt_parts(foundation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Render the parts of the foundation's block in the scoring prompt.
+
+    The parts are packed into the prompt's token budget at request time (see
+    ScoringService._format_foundations_for_prompt), so nothing is cut here.
+    """
+    foundation_id = foundation.get("_id") or foundation.get("id", "")
+    name = foundation.get("name", "Unbekannt")
+    long_desc = foundation.get("long_description", "")
+    zwecke = ", ".join(foundation.get("gemeinnuetzige_zwecke", []))
+    foerderbereich = foundation.get("foerderbereich", {})
+    scope = foerderbereich.get("scope", "unbekannt")
+    foerderhoehe = foundation.get("foerderhoehe") or {}
+    min_amount = foerderhoehe.get("min_amount") or 0
+    max_amount = foerderhoehe.get("max_amount") or 0
+
+    return {
+        "header": f"ID: {foundation_id}\nName: {name}",
+        "purposes": f"Gemeinnützige Zwecke: {zwecke}",
+        "funding": f"Förderbereich: {scope}\nFörderhöhe: {min_amount:,.0f}€ - {max_amount:,.0f}€",
+        "description": f"Beschreibung: {long_desc}",
+        "past_projects": [
+            f"- {proj.get('name', 'Unbekannt')}: {proj.get('description', '')}"
+            for proj in foundation.get("past_projects", [])
+        ],
+    }
+
+
+def derive_foundation_fields(foundation: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the derived fields of a foundation document."""
+    return {
+        "version": DERIVATION_VERSION,
+        "source_hash": source_hash(foundation),
+        "foerderhoehe": apply_funding_defaults(foundation.get("foerderhoehe", {})),
+        "antragsprozess": sanitize_antragsprozess(foundation.get("antragsprozess")),
+        "deadline": parse_deadline(foundation.get("antragsprozess")),
+        "funding_amount": format_funding_amount(foundation.get("foerderhoehe", {})),
+        "prompt_parts": format_prompt_parts(foundation),
+    }
+
+
+def with_derived_fields(foundation: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of the foundation document with up-to-date derived fields."""
+    document = dict(foundation)
+    document[DERIVED_FIELD] = derive_foundation_fields(document)
+    return document
+
+
+def is_current(derived: Any, foundation: Dict[str, Any]) -> bool:
+    """Whether stored derived fields are up to date with the foundation's source fields."""
+    return (
+        isinstance(derived, dict)
+        and derived.get("version") == DERIVATION_VERSION
+        and derived.get("source_hash") == source_hash(foundation)
+    )
+
+
+def get_derived_fields(foundation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the stored derived fields of a foundation.
+
+    Stored fields are trusted: their freshness is checked when they are written
+    (foundation watcher, startup backfill), not on every read. Falls back to
+    computing them for documents written before the derivation stage existed
+    or with an older DERIVATION_VERSION.
+    """
+    derived = foundation.get(DERIVED_FIELD)
+    if isinstance(derived, dict) and derived.get("version") == DERIVATION_VERSION:
+        return derived
+    logger.debug(
+        f"Computing derived fields on the fly for foundation {foundation.get('_id') or foundation.get('id')}."
+    )
+    return derive_foundation_fields(foundation)
+
+
+async def ensure_deadline_index(db: AsyncIOMotorDatabase) -> None:
+    """Create the index used by deadline filters (see DEADLINE_INDEX)."""
+    await db.foundations.create_index(DEADLINE_INDEX)
+
+
+async def backfill_derived_fields(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Store derived fields on foundations where they are missing or stale.
+
+    Catches documents written before this stage existed, after a
+    DERIVATION_VERSION bump, or modified while no change watcher was running.
+    Returns the number of updated foundations.
+    """
+    updated = 0
+    operations = []
+    async for foundation in db.foundations.find({}):
+        if is_current(foundation.get(DERIVED_FIELD), foundation):
+            continue
+        operations.append(
+            UpdateOne(
+                {"_id": foundation["_id"]},
+                {"$set": {DERIVED_FIELD: derive_foundation_fields(foundation)}},
+            )
+        )
+        if len(operations) >= batch_size:
+            await db.foundations.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+
+    if operations:
+        await db.foundations.bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    if updated:
+        logger.info(f"Backfilled derived fields for {updated} foundations.")
+    return updated
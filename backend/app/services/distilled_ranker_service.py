@@ -0,0 +1,320 @@
+"""
+Distilled candidate ranker trained on past LLM scores.
+
+Every LLM evaluation is a labeled example: the match_score of a (project,
+foundation) pair. The evaluations are logged together with a few cheap
+features of the pair to ``scoring_labels``, and ``python -m app.train_ranker``
+fits a logistic regression on them in NumPy. The model is stored in
+``ranker_models`` and served inside ScoringService (SCORING_DISTILLED_RANKER):
+- "order": the model instead of the heuristic pre-ranker picks the candidates
+  that are sent to the LLM
+- "score": the model picks the top ``limit`` and provides their match scores;
+  the LLM only writes the explanations (fits, mismatches, questions)
+
+Unlike the pre-ranker's features, these do not depend on the candidate pool,
+so logged and served features agree. The "text" feature is the retrieval score
+each candidate already carries (BM25 by default, the TF-IDF cosine with
+SCORING_RETRIEVAL_MODE=tfidf) rather than a separately computed TF-IDF
+similarity, so a model only serves the retrieval mode it was trained for.
+
+Labels expire after SCORING_LABEL_TTL_SECONDS (TTL index on ``created_at``),
+so the collection stays bounded while logging is on.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationEvaluation
+from app.services.derivation_service import get_derived_fields
+from app.services.prerank_service import get_heuristic_preranker, text_words
+from app.services.region_service import get_region_hierarchy
+from app.services.scoring_cache_service import foundation_content_hash
+
+logger = logging.getLogger(__name__)
+
+# Feature columns of DistilledRanker.features, in order
+FEATURE_NAMES = (
+    "purpose_overlap",
+    "purpose_focus",
+    "area",
+    "funding",
+    "text",
+)
+
+MODEL_ID = "distilled_ranker"
+
+# Funding amount that maps to a funding feature of 1.0
+_FUNDING_SCALE = 1_000_000
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def fit_logistic_regression(
+    features: np.ndarray,
+    targets: np.ndarray,
+    l2: float = 1e-3,
+    iterations: int = 2000,
+    learning_rate: float = 1.0,
+) -> Tuple[np.ndarray, float]:
+    """
+    Fit a logistic regression to soft targets in [0, 1] by full-batch gradient descent.
+
+    Returns:
+        (weights, bias)
+    """
+    n, d = features.shape
+    weights = np.zeros(d, dtype=np.float64)
+    bias = 0.0
+    for _ in range(iterations):
+        error = _sigmoid(features @ weights + bias) - targets
+        weights -= learning_rate * (features.T @ error / n + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+
+def pairwise_accuracy(scores: np.ndarray, targets: np.ndarray, groups: np.ndarray) -> float:
+    """Share of same-project pairs with different targets that ``scores`` order correctly."""
+    correct = total = 0
+    for group in np.unique(groups):
+        rows = np.flatnonzero(groups == group)
+        if len(rows) < 2:
+            continue
+        score_diff = np.sign(scores[rows][:, None] - scores[rows][None, :])
+        target_diff = np.sign(targets[rows][:, None] - targets[rows][None, :])
+        mask = target_diff > 0
+        correct += int((score_diff[mask] > 0).sum())
+        total += int(mask.sum())
+    return correct / total if total else float("nan")
+
+
+class DistilledRanker:
+    """Logistic regression over pair features, trained on logged LLM match scores."""
+
+    def __init__(self):
+        self.weights: Optional[np.ndarray] = None
+        self.bias = 0.0
+        self.model_info: Dict[str, Any] = {}
+        self.loaded_at: Optional[float] = None
+        self._labels_index_ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+
+    def features(
+        self, project: ProjectDescription, foundations: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Build the (n_foundations, len(FEATURE_NAMES)) feature matrix, each column in [0, 1].
+
+        - purpose_overlap: share of the project's purposes the foundation supports
+        - purpose_focus: share of the foundation's purposes the project pursues
+        - area: geographic fit (see HeuristicPreRanker.area_score)
+        - funding: log of the max funding amount, 1.0 at 1 Mio. €
+        - text: retrieval relevance ("score" field, BM25 or TF-IDF cosine), saturated as s / (1 + s)
+        """
+        matrix = np.zeros((len(foundations), len(FEATURE_NAMES)), dtype=np.float64)
+        if not foundations:
+            return matrix
+
+        project_purposes = {purpose.value for purpose in project.charitable_purpose}
+        project_words = text_words(f"{project.name} {project.description} {project.target_group}")
+        hierarchy = get_region_hierarchy()
+        project_regions = hierarchy.project_regions(project)
+        preranker = get_heuristic_preranker()
+
+        for row, foundation in enumerate(foundations):
+            zwecke = set(foundation.get("gemeinnuetzige_zwecke") or [])
+            overlap = len(zwecke & project_purposes)
+            if project_purposes:
+                matrix[row, 0] = overlap / len(project_purposes)
+            if zwecke:
+                matrix[row, 1] = overlap / len(zwecke)
+            matrix[row, 2] = preranker.area_score(
+                hierarchy, project_regions, project_words, foundation.get("foerderbereich") or {}
+            )
+            max_amount = get_derived_fields(foundation)["foerderhoehe"].get("max_amount") or 0.0
+            matrix[row, 3] = min(np.log1p(max(max_amount, 0.0)) / np.log1p(_FUNDING_SCALE), 1.0)
+            text_score = max(foundation.get("score") or 0.0, 0.0)
+            matrix[row, 4] = text_score / (1.0 + text_score)
+        return matrix
+
+    def predict(self, project: ProjectDescription, foundations: List[Dict[str, Any]]) -> np.ndarray:
+        """Predicted match scores in [0, 1]."""
+        if not self.ready or not foundations:
+            return np.zeros(len(foundations), dtype=np.float64)
+        return _sigmoid(self.features(project, foundations) @ self.weights + self.bias)
+
+    def rank(
+        self, project: ProjectDescription, candidates: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (foundation, predicted score) pairs, best first; ties keep retrieval order."""
+        scores = self.predict(project, candidates)
+        order = np.argsort(-scores, kind="stable")
+        return [(candidates[i], float(scores[i])) for i in order]
+
+    async def ensure_loaded(self, db: AsyncIOMotorDatabase) -> None:
+        """Load the trained model, re-checking for a newer one every SCORING_RANKER_RELOAD_SECONDS."""
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.SCORING_RANKER_RELOAD_SECONDS:
+            return
+        self.loaded_at = time.monotonic()
+        try:
+            model = await db.ranker_models.find_one({"_id": MODEL_ID})
+        except Exception:
+            logger.exception("Failed to load the distilled ranker")
+            return
+        if not model:
+            return
+        if model.get("trained_at") == self.model_info.get("trained_at"):
+            return
+        if tuple(model.get("feature_names", [])) != FEATURE_NAMES:
+            logger.warning("Stored distilled ranker uses other features, retrain it with python -m app.train_ranker")
+            self.weights = None
+            return
+        if model.get("retrieval_mode") != settings.SCORING_RETRIEVAL_MODE:
+            logger.warning(
+                f"Stored distilled ranker was trained for retrieval mode {model.get('retrieval_mode')!r}, "
+                f"not {settings.SCORING_RETRIEVAL_MODE!r}; not using it"
+            )
+            self.weights = None
+            return
+        self.weights = np.asarray(model["weights"], dtype=np.float64)
+        self.bias = float(model["bias"])
+        self.model_info = {key: model.get(key) for key in ("trained_at", "labels", "metrics")}
+        logger.info(f"Loaded distilled ranker trained at {model.get('trained_at')} on {model.get('labels')} labels")
+
+    async def log_labels(
+        self,
+        db: AsyncIOMotorDatabase,
+        project: ProjectDescription,
+        fingerprint: str,
+        labeled: Iterable[Tuple[Dict[str, Any], FoundationEvaluation]],
+    ) -> None:
+        """Store (foundation, LLM evaluation) pairs of a project as training labels."""
+        labeled = list(labeled)
+        if not labeled:
+            return
+        await self._ensure_labels_index(db)
+        try:
+            foundations = [foundation for foundation, _ in labeled]
+            features = self.features(project, foundations)
+            now = datetime.utcnow()
+            operations = []
+            for row, (foundation, evaluation) in enumerate(labeled):
+                content_hash = foundation_content_hash(foundation)
+                # One label per project and foundation version
+                label_id = hashlib.sha256(
+                    f"{fingerprint}:{evaluation.foundation_id}:{content_hash}".encode("utf-8")
+                ).hexdigest()
+                operations.append(
+                    ReplaceOne(
+                        {"_id": label_id},
+                        {
+                            "_id": label_id,
+                            "project_fingerprint": fingerprint,
+                            "foundation_id": evaluation.foundation_id,
+                            "retrieval_mode": settings.SCORING_RETRIEVAL_MODE,
+                            "features": features[row].tolist(),
+                            "match_score": evaluation.match_score,
+                            "created_at": now,
+                        },
+                        upsert=True,
+                    )
+                )
+            await db.scoring_labels.bulk_write(operations, ordered=False)
+        except Exception:
+            # Label logging must never fail the scoring request
+            logger.exception("Failed to log scoring labels")
+
+    async def _ensure_labels_index(self, db: AsyncIOMotorDatabase) -> None:
+        """Create the TTL index that expires old labels (once per process)."""
+        if self._labels_index_ready or settings.SCORING_LABEL_TTL_SECONDS <= 0:
+            return
+        self._labels_index_ready = True
+        try:
+            await db.scoring_labels.create_index(
+                "created_at", expireAfterSeconds=settings.SCORING_LABEL_TTL_SECONDS
+            )
+        except Exception:
+            # E.g. an existing index with another TTL; labels are still logged
+            logger.exception("Failed to create the scoring label TTL index")
+
+    async def train(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """
+        Fit the model on the logged labels of the current retrieval mode and store it.
+
+        Every fifth project (by fingerprint) is held out to report validation
+        metrics; the stored model is then fit on all labels.
+
+        Raises:
+            ValueError: If fewer than SCORING_RANKER_MIN_LABELS labels are logged.
+        """
+        cursor = db.scoring_labels.find(
+            {"retrieval_mode": settings.SCORING_RETRIEVAL_MODE},
+            {"features": 1, "match_score": 1, "project_fingerprint": 1},
+        )
+        labels = [
+            label
+            for label in await cursor.to_list(length=None)
+            if len(label.get("features", [])) == len(FEATURE_NAMES)
+        ]
+        if len(labels) < settings.SCORING_RANKER_MIN_LABELS:
+            raise ValueError(
+                f"Need at least {settings.SCORING_RANKER_MIN_LABELS} labels to train, "
+                f"found {len(labels)} for retrieval mode {settings.SCORING_RETRIEVAL_MODE!r}"
+            )
+
+        features = np.array([label["features"] for label in labels], dtype=np.float64)
+        targets = np.clip(np.array([label["match_score"] for label in labels], dtype=np.float64), 0.0, 1.0)
+        groups = np.array([label["project_fingerprint"] for label in labels])
+        held_out = np.array([int(group[:8], 16) % 5 == 0 for group in groups])
+
+        metrics: Dict[str, Any] = {}
+        if held_out.any() and (~held_out).any():
+            weights, bias = fit_logistic_regression(features[~held_out], targets[~held_out])
+            predicted = _sigmoid(features[held_out] @ weights + bias)
+            metrics = {
+                "validation_labels": int(held_out.sum()),
+                "validation_mae": float(np.abs(predicted - targets[held_out]).mean()),
+                "validation_pairwise_accuracy": pairwise_accuracy(
+                    predicted, targets[held_out], groups[held_out]
+                ),
+            }
+
+        weights, bias = fit_logistic_regression(features, targets)
+        model = {
+            "_id": MODEL_ID,
+            "feature_names": list(FEATURE_NAMES),
+            "weights": weights.tolist(),
+            "bias": bias,
+            "retrieval_mode": settings.SCORING_RETRIEVAL_MODE,
+            "labels": len(labels),
+            "metrics": metrics,
+            "trained_at": datetime.utcnow().isoformat(),
+        }
+        await db.ranker_models.replace_one({"_id": MODEL_ID}, model, upsert=True)
+        logger.info(f"Trained distilled ranker on {len(labels)} labels: {metrics}")
+        return model
+
+
+# Global ranker instance
+_distilled_ranker = None
+
+
+def get_distilled_ranker() -> DistilledRanker:
+    """Get or create the global distilled ranker."""
+    global _distilled_ranker
+    if _distilled_ranker is None:
+        _distilled_ranker = DistilledRanker()
+    return _distilled_ranker
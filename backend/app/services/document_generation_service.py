@@ -17,6 +17,7 @@ from app.models.document_generation import (
     RequiredDocumentInput
 )
 from app.core.config import settings
+from app.services.context_packing_service import ContextSegment, get_context_packer
 
 
 class DocumentOutput(BaseModel):
@@ -43,6 +44,7 @@ class DocumentGenerationService:
             model="anthropic/claude-haiku-4-5",
             api_key=SecretStr(settings.REQUESTY_API_KEY),
             base_url=settings.REQUESTY_BASE_URL,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
         )
         
         # Create agent with structured output for document generation
@@ -252,53 +254,50 @@ FORMATIERUNG:
 WICHTIG: Das improvements-Array MUSS für JEDES Dokument GENAU 3 Einträge haben!"""
     
     def _build_chat_context(self, messages: List) -> str:
-        """Build context from chat messages - limited to reduce token usage."""
+        """Build context from chat messages - packed into DOCUMENT_CHAT_CONTEXT_TOKENS."""
         if not messages:
             return "Keine zusätzlichen Informationen aus dem Chat vorhanden."
         
-        # Limit to last 8 messages and truncate long messages
-        limited_messages = messages[-8:] if len(messages) > 8 else messages
-        context_parts = []
-        for msg in limited_messages:
-            role = "Nutzer" if msg.role == "user" else "Assistent"
-            # Truncate individual messages if too long (max 300 chars per message)
-            content = msg.content
-            if len(content) > 300:
-                content = content[:300] + "..."
-            context_parts.append(f"{role}: {content}")
-        
-        return "\n".join(context_parts)
+        packer = get_context_packer()
+        budget = settings.DOCUMENT_CHAT_CONTEXT_TOKENS
+        # Newer messages first; a single long message may use at most a quarter of the budget
+        segments = [
+            ContextSegment(
+                packer.truncate(
+                    f"{'Nutzer' if msg.role == 'user' else 'Assistent'}: {msg.content}",
+                    budget // 4,
+                ),
+                priority=i,
+            )
+            for i, msg in enumerate(messages)
+        ]
+        return packer.pack(segments, budget)
     
     def _build_foundation_context(self, foundation_name: str | None, foundation_details: dict | None) -> str:
-        """Build context about the foundation - only essential information to reduce token usage."""
+        """Build context about the foundation - packed into DOCUMENT_FOUNDATION_CONTEXT_TOKENS."""
         if not foundation_name:
             return "Keine spezifischen Stiftungsinformationen vorhanden."
         
-        context = f"Stiftung: {foundation_name}\n"
+        segments = [ContextSegment(f"Stiftung: {foundation_name}", priority=3, truncatable=False)]
         
         if foundation_details:
-            # Only include purpose if it's concise (max 200 chars)
             if "purpose" in foundation_details and foundation_details["purpose"]:
-                purpose = foundation_details["purpose"]
-                if len(purpose) > 200:
-                    purpose = purpose[:200] + "..."
-                context += f"Förderzweck: {purpose}\n"
+                segments.append(ContextSegment(f"Förderzweck: {foundation_details['purpose']}", priority=0))
             # Include funding amount (essential and concise)
             if "foerderhoehe" in foundation_details and foundation_details["foerderhoehe"]:
                 foerderhoehe = foundation_details["foerderhoehe"]
                 min_amount = foerderhoehe.get('min_amount') or 0
                 max_amount = foerderhoehe.get('max_amount') or 0
                 if min_amount or max_amount:
-                    context += f"Förderhöhe: {min_amount:,.0f}€ - {max_amount:,.0f}€\n"
-            # Include funding scope if concise (max 150 chars)
+                    segments.append(ContextSegment(
+                        f"Förderhöhe: {min_amount:,.0f}€ - {max_amount:,.0f}€", priority=2, truncatable=False
+                    ))
             if "foerderbereich" in foundation_details and foundation_details["foerderbereich"]:
                 scope = foundation_details["foerderbereich"].get("scope", "")
                 if scope:
-                    if len(scope) > 150:
-                        scope = scope[:150] + "..."
-                    context += f"Förderbereich: {scope}\n"
+                    segments.append(ContextSegment(f"Förderbereich: {scope}", priority=1))
         
-        return context
+        return get_context_packer().pack(segments, settings.DOCUMENT_FOUNDATION_CONTEXT_TOKENS) + "\n"
     
     def _build_documents_info(self, documents: List[RequiredDocumentInput]) -> str:
         """Build information about required documents."""
@@ -494,7 +493,7 @@ Antworte mit einem JSON-Objekt im Format:
             ])
             
             chain = prompt | self.llm
-            response = chain.invoke({})
+            response = await chain.ainvoke({})
             
             # Parse response
             content = response.content.strip()
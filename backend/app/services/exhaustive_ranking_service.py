@@ -0,0 +1,294 @@
+"""
+Exhaustive ranking of the whole purpose-matched catalog for a session.
+
+/foundations/scores evaluates a handful of candidates per request. An
+exhaustive ranking runs as a background job per session instead:
+1. the cheap stages rank every foundation passing the filters (text ranking,
+   then the pre-ranker or distilled ranker, without a limit)
+2. the LLM evaluates them in that order, EXHAUSTIVE_BATCH_SIZE at a time
+   (memoized evaluations are reused and calls are bounded like any scoring call)
+3. every finished batch is persisted to ``exhaustive_results``
+
+Pages are served from the persisted results while the job is still running,
+best match score first, with a keyset cursor. A later batch can contain
+foundations that rank above a page already served; clients that need the
+final order re-read from the first page once the status is "complete". The
+ranking is restarted when the session's project or the catalog changes.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationScore
+from app.services.catalog_version_service import get_catalog_version
+from app.services.distilled_ranker_service import get_distilled_ranker
+from app.services.scoring_cache_service import project_fingerprint
+from app.services.scoring_service import ScoringService, get_scoring_service
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(match_score: float, rank: int) -> str:
+    """Opaque page cursor pointing after the result with this score and rank."""
+    payload = json.dumps([match_score, rank]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decode a page cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        match_score, rank = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(match_score), int(rank)
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class ExhaustiveRankingService:
+    """Runs and pages exhaustive rankings, one background job per session."""
+
+    def __init__(self, scoring_service: ScoringService):
+        self.scoring = scoring_service
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Per-session start locks and the number of requests holding or awaiting them
+        self._start_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self, db: AsyncIOMotorDatabase) -> None:
+        if self._indexes_ready:
+            return
+        await db.exhaustive_results.create_index(
+            [("session_id", 1), ("match_score", -1), ("rank", 1)]
+        )
+        self._indexes_ready = True
+
+    async def ensure_started(
+        self, db: AsyncIOMotorDatabase, session_id: str, project: ProjectDescription
+    ) -> Dict[str, Any]:
+        """
+        Return the session's ranking status, (re-)starting the job if needed.
+
+        A job is started when there is no ranking for the current project and
+        catalog version yet, or when an unfinished one made no progress for
+        EXHAUSTIVE_STALE_SECONDS (e.g. the server restarted); the latter resumes
+        after the results already persisted. Concurrent requests for a session
+        are serialized, so they share one job.
+        """
+        await self._ensure_indexes(db)
+        lock, waiting = self._start_locks.get(session_id, (asyncio.Lock(), 0))
+        self._start_locks[session_id] = (lock, waiting + 1)
+        try:
+            async with lock:
+                return await self._start_if_needed(db, session_id, project)
+        finally:
+            lock, waiting = self._start_locks[session_id]
+            if waiting > 1:
+                self._start_locks[session_id] = (lock, waiting - 1)
+            else:
+                del self._start_locks[session_id]
+
+    async def _start_if_needed(
+        self, db: AsyncIOMotorDatabase, session_id: str, project: ProjectDescription
+    ) -> Dict[str, Any]:
+        fingerprint = project_fingerprint(project)
+        catalog_version = await get_catalog_version(db)
+        ranking = await db.exhaustive_rankings.find_one({"_id": session_id})
+        now = datetime.utcnow()
+
+        current = (
+            ranking is not None
+            and ranking.get("fingerprint") == fingerprint
+            and ranking.get("catalog_version") == catalog_version
+        )
+        if current:
+            task = self._tasks.get(session_id)
+            stale = now - ranking["updated_at"] > timedelta(seconds=settings.EXHAUSTIVE_STALE_SECONDS)
+            if ranking["status"] == "complete" or (task is not None and not task.done()) or not stale:
+                return ranking
+
+        # Never leave a previous job running next to the new one
+        await self._cancel(session_id)
+        if not current:
+            await db.exhaustive_results.delete_many({"session_id": session_id})
+
+        ranking = {
+            "_id": session_id,
+            "fingerprint": fingerprint,
+            "catalog_version": catalog_version,
+            "status": "running",
+            "total": None,
+            "evaluated": 0,
+            "failed": 0,
+            "created_at": ranking["created_at"] if current else now,
+            "updated_at": now,
+        }
+        await db.exhaustive_rankings.replace_one({"_id": session_id}, ranking, upsert=True)
+        self._tasks[session_id] = asyncio.create_task(
+            self._run(db, session_id, project, catalog_version)
+        )
+        logger.info(f"Started exhaustive ranking for session {session_id}")
+        return ranking
+
+    async def _run(
+        self,
+        db: AsyncIOMotorDatabase,
+        session_id: str,
+        project: ProjectDescription,
+        catalog_version: int,
+    ) -> None:
+        try:
+            # Cheap stages over everything passing the filters
+            pool = await self.scoring._retrieve_pool(project, None, db, catalog_version)
+            if settings.SCORING_DISTILLED_RANKER != "off":
+                await get_distilled_ranker().ensure_loaded(db)
+            ranked = self.scoring._select_candidates(project, pool, len(pool)) if pool else []
+
+            done = set(
+                await db.exhaustive_results.distinct("foundation_id", {"session_id": session_id})
+            )
+            await db.exhaustive_rankings.update_one(
+                {"_id": session_id},
+                {"$set": {"total": len(ranked), "evaluated": len(done), "updated_at": datetime.utcnow()}},
+            )
+
+            # LLM evaluation in rank order, one bounded batch at a time
+            rank_of = {foundation["_id"]: rank for rank, foundation in enumerate(ranked)}
+            batch_size = max(1, settings.EXHAUSTIVE_BATCH_SIZE)
+            pending = [foundation for foundation in ranked if foundation["_id"] not in done]
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start : start + batch_size]
+                scores: List[FoundationScore] = [
+                    score async for score in self.scoring._iter_evaluations(project, batch, db)
+                ]
+                if scores:
+                    await db.exhaustive_results.bulk_write(
+                        [
+                            ReplaceOne(
+                                {"_id": f"{session_id}:{score.id}"},
+                                {
+                                    "_id": f"{session_id}:{score.id}",
+                                    "session_id": session_id,
+                                    "foundation_id": score.id,
+                                    "rank": rank_of[score.id],
+                                    "match_score": score.match_score,
+                                    "foundation": score.model_dump(),
+                                },
+                                upsert=True,
+                            )
+                            for score in scores
+                        ],
+                        ordered=False,
+                    )
+                await db.exhaustive_rankings.update_one(
+                    {"_id": session_id},
+                    {
+                        "$inc": {"evaluated": len(scores), "failed": len(batch) - len(scores)},
+                        "$set": {"updated_at": datetime.utcnow()},
+                    },
+                )
+
+            await db.exhaustive_rankings.update_one(
+                {"_id": session_id},
+                {"$set": {"status": "complete", "updated_at": datetime.utcnow()}},
+            )
+            logger.info(f"Exhaustive ranking for session {session_id} complete ({len(ranked)} foundations)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Exhaustive ranking for session {session_id} failed")
+            await db.exhaustive_rankings.update_one(
+                {"_id": session_id},
+                {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}},
+            )
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                del self._tasks[session_id]
+
+    async def page(
+        self,
+        db: AsyncIOMotorDatabase,
+        ranking: Dict[str, Any],
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Tuple[List[FoundationScore], Optional[str]]:
+        """
+        Return a page of persisted results after ``cursor`` and the next cursor.
+
+        The next cursor is None once the ranking is complete and no results
+        follow; while it is running, it points after the last result served so
+        far (or repeats ``cursor`` if the page is empty) so clients can poll.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        page_size = page_size or settings.EXHAUSTIVE_PAGE_SIZE
+        query: Dict[str, Any] = {"session_id": ranking["_id"]}
+        if cursor:
+            match_score, rank = decode_cursor(cursor)
+            query["$or"] = [
+                {"match_score": {"$lt": match_score}},
+                {"match_score": match_score, "rank": {"$gt": rank}},
+            ]
+        results = (
+            await db.exhaustive_results.find(query)
+            .sort([("match_score", -1), ("rank", 1)])
+            .limit(page_size + 1)
+            .to_list(length=page_size + 1)
+        )
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if has_more or ranking["status"] != "complete":
+            next_cursor = (
+                encode_cursor(results[-1]["match_score"], results[-1]["rank"]) if results else cursor
+            )
+        else:
+            next_cursor = None
+        return [FoundationScore(**result["foundation"]) for result in results], next_cursor
+
+    async def discard(self, db: AsyncIOMotorDatabase, session_id: str) -> None:
+        """Stop the session's job and delete its ranking."""
+        await self._cancel(session_id)
+        await db.exhaustive_rankings.delete_one({"_id": session_id})
+        await db.exhaustive_results.delete_many({"session_id": session_id})
+
+    async def _cancel(self, session_id: str) -> None:
+        task = self._tasks.pop(session_id, None)
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self) -> None:
+        """Cancel all running jobs (they resume on the next request)."""
+        for session_id in list(self._tasks):
+            await self._cancel(session_id)
+
+
+# Global service instance
+_exhaustive_ranking_service = None
+
+
+def get_exhaustive_ranking_service() -> ExhaustiveRankingService:
+    """Get or create the global exhaustive ranking service."""
+    global _exhaustive_ranking_service
+    if _exhaustive_ranking_service is None:
+        _exhaustive_ranking_service = ExhaustiveRankingService(get_scoring_service())
+    return _exhaustive_ranking_service
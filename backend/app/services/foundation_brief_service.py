@@ -0,0 +1,248 @@
+"""
+LLM-distilled foundation briefs for the scoring prompts.
+
+Most of a foundation's long description and past projects is boilerplate for
+matching purposes. ``python -m app.generate_briefs`` distills every foundation
+once into a brief of roughly 80 tokens (funding focus, exclusions, typical
+grant, geographic limits) and stores it in ``foundation_briefs`` together with
+a hash of the fields it was written from. Later runs only regenerate the briefs
+of foundations whose source fields changed.
+
+With SCORING_PROMPT_BRIEFS the scoring prompts use an up-to-date brief instead
+of the description and past projects (see
+ScoringService._format_foundations_for_prompt); foundations without one keep
+the full format.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import SecretStr
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.models.foundation import FoundationBrief, FoundationBriefsResponse
+from app.services.context_packing_service import get_context_packer
+
+logger = logging.getLogger(__name__)
+
+# Foundation fields a brief is written from (all in FOUNDATION_SCORING_PROJECTION)
+BRIEF_SOURCE_FIELDS = (
+    "name",
+    "short_description",
+    "long_description",
+    "gemeinnuetzige_zwecke",
+    "foerderbereich",
+    "foerderhoehe",
+    "antragsprozess",
+    "past_projects",
+)
+
+# Budget of a foundation's source text in the generation prompt
+_SOURCE_TOKENS = 1500
+
+
+def brief_source_hash(foundation: Dict[str, Any]) -> str:
+    """Hash of the foundation fields its brief is written from."""
+    content = {field: foundation.get(field) for field in BRIEF_SOURCE_FIELDS}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def format_brief(brief: FoundationBrief) -> str:
+    """Render a brief as it appears in the scoring prompt."""
+    return (
+        f"Förderschwerpunkt: {brief.funding_focus}\n"
+        f"Ausschlüsse: {brief.exclusions}\n"
+        f"Typische Förderung: {brief.typical_grant}\n"
+        f"Region: {brief.geographic_limits}"
+    )
+
+
+def _foundation_id(foundation: Dict[str, Any]) -> Optional[str]:
+    return foundation.get("_id") or foundation.get("id")
+
+
+class FoundationBriefService:
+    """Generates, stores and attaches the foundation briefs."""
+
+    def __init__(self):
+        self._structured_llm = None
+        self._semaphore = asyncio.Semaphore(max(1, settings.BRIEF_MAX_CONCURRENCY))
+
+    def _llm(self):
+        # Created on first use; serving briefs needs no model
+        if self._structured_llm is None:
+            llm = ChatOpenAI(
+                model=settings.BRIEF_MODEL,
+                api_key=SecretStr(settings.REQUESTY_API_KEY),
+                base_url=settings.REQUESTY_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+            )
+            self._structured_llm = llm.with_structured_output(FoundationBriefsResponse)
+        return self._structured_llm
+
+    async def generate(self, db: AsyncIOMotorDatabase, force: bool = False) -> Dict[str, int]:
+        """
+        Write the briefs of foundations without an up-to-date one.
+
+        Briefs of deleted foundations are removed. Returns the number of
+        foundations, briefs already up to date, generated briefs and
+        foundations the LLM returned no brief for.
+        """
+        projection = {field: 1 for field in BRIEF_SOURCE_FIELDS}
+        foundations = await db.foundations.find({}, projection).to_list(length=None)
+        stored = {
+            doc["_id"]: doc.get("source_hash")
+            async for doc in db.foundation_briefs.find({}, {"source_hash": 1})
+        }
+
+        pending = [
+            foundation
+            for foundation in foundations
+            if force or stored.get(foundation["_id"]) != brief_source_hash(foundation)
+        ]
+        per_call = max(1, settings.BRIEF_FOUNDATIONS_PER_CALL)
+        logger.info(
+            f"Generating briefs for {len(pending)} of {len(foundations)} foundations "
+            f"with {settings.BRIEF_MODEL}..."
+        )
+        results = await asyncio.gather(
+            *(
+                self._generate_batch(db, pending[i : i + per_call])
+                for i in range(0, len(pending), per_call)
+            )
+        )
+
+        foundation_ids = [foundation["_id"] for foundation in foundations]
+        removed = await db.foundation_briefs.delete_many({"_id": {"$nin": foundation_ids}})
+        if removed.deleted_count:
+            logger.info(f"Removed {removed.deleted_count} briefs of deleted foundations")
+
+        generated = sum(results)
+        return {
+            "foundations": len(foundations),
+            "up_to_date": len(foundations) - len(pending),
+            "generated": generated,
+            "failed": len(pending) - generated,
+        }
+
+    async def _generate_batch(
+        self, db: AsyncIOMotorDatabase, foundations: List[Dict[str, Any]]
+    ) -> int:
+        """Generate and store the briefs of one LLM call; returns the number stored."""
+        by_id = {foundation["_id"]: foundation for foundation in foundations}
+        chain = self._create_brief_prompt() | self._llm()
+        try:
+            async with self._semaphore:
+                response: FoundationBriefsResponse = await chain.ainvoke(
+                    {"foundations": self._format_sources(foundations)}
+                )
+        except Exception:
+            logger.exception(f"Brief generation for {len(foundations)} foundations failed")
+            return 0
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                {"_id": brief.foundation_id},
+                {
+                    "_id": brief.foundation_id,
+                    "source_hash": brief_source_hash(by_id[brief.foundation_id]),
+                    "model": settings.BRIEF_MODEL,
+                    "brief": brief.model_dump(exclude={"foundation_id"}),
+                    "text": format_brief(brief),
+                    "created_at": now,
+                },
+                upsert=True,
+            )
+            for brief in response.briefs
+            if brief.foundation_id in by_id
+        ]
+        if operations:
+            await db.foundation_briefs.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    @staticmethod
+    def _format_sources(foundations: List[Dict[str, Any]]) -> str:
+        """Format the source fields of the foundations for the generation prompt."""
+        packer = get_context_packer()
+        formatted = []
+        for foundation in foundations:
+            source = {
+                field: foundation.get(field)
+                for field in BRIEF_SOURCE_FIELDS
+                if field not in ("name", "past_projects")
+            }
+            past_projects = [
+                f"- {project.get('name', '')}: {project.get('description', '')}"
+                for project in foundation.get("past_projects") or []
+            ]
+            block = (
+                f"ID: {foundation['_id']}\nName: {foundation.get('name', '')}\n"
+                f"{json.dumps(source, ensure_ascii=False, default=str)}\n"
+                "Vergangene Projekte:\n" + "\n".join(past_projects)
+            )
+            formatted.append(f"\nSTIFTUNG:\n{packer.truncate(block, _SOURCE_TOKENS)}\n")
+        return "\n".join(formatted)
+
+    @staticmethod
+    def _create_brief_prompt() -> ChatPromptTemplate:
+        """Create the prompt template for brief generation."""
+        system_message = """Du fasst Stiftungsprofile für ein Matching-System zusammen, das Projekte mit passenden Stiftungen abgleicht.
+Schreibe für jede Stiftung ein dichtes Kurzprofil mit insgesamt höchstens 60 Wörtern.
+Nenne nur, was für die Entscheidung wichtig ist, ob ein Projekt gefördert werden kann: konkrete Förderschwerpunkte,
+Ausschlüsse, typische Fördersummen und geografische Einschränkungen. Keine Werbesprache, keine Wiederholungen.
+Antworte auf Deutsch."""
+
+        human_message = """Erstelle die Kurzprofile der folgenden Stiftungen (foundation_id = die angegebene ID):
+{foundations}"""
+
+        return ChatPromptTemplate.from_messages(
+            [("system", system_message), ("human", human_message)]
+        )
+
+    async def attach(self, db: AsyncIOMotorDatabase, foundations: Iterable[Dict[str, Any]]) -> None:
+        """
+        Set the "brief" field of candidate documents to their up-to-date brief text.
+
+        Documents that already carry the field are skipped; it is None where no
+        brief was generated yet or the foundation changed since.
+        """
+        pending = [f for f in foundations if "brief" not in f and _foundation_id(f)]
+        if not pending:
+            return
+        try:
+            briefs = {
+                doc["_id"]: doc
+                async for doc in db.foundation_briefs.find(
+                    {"_id": {"$in": list({_foundation_id(f) for f in pending})}},
+                    {"source_hash": 1, "text": 1},
+                )
+            }
+        except Exception:
+            logger.exception("Failed to load foundation briefs, using the full prompt format")
+            return
+        for foundation in pending:
+            brief = briefs.get(_foundation_id(foundation))
+            current = brief is not None and brief.get("source_hash") == brief_source_hash(foundation)
+            foundation["brief"] = brief["text"] if current else None
+
+
+# Global service instance
+_foundation_brief_service = None
+
+
+def get_foundation_briefs() -> FoundationBriefService:
+    """Get or create the global foundation brief service."""
+    global _foundation_brief_service
+    if _foundation_brief_service is None:
+        _foundation_brief_service = FoundationBriefService()
+    return _foundation_brief_service
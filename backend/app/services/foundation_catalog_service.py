@@ -0,0 +1,277 @@
+"""
+Columnar in-memory catalog of foundation attributes used for filtering.
+
+One row per foundation, stored as NumPy arrays:
+- purpose_mask: bit i is set if the foundation supports the i-th CharitablePurpose
+- scope: code of foerderbereich.scope (see SCOPE_CODES, -1 = unknown)
+- min_amount / max_amount: funding range after category defaults (NaN = unknown)
+- deadline: fixed application deadline (NaT = rolling or unknown)
+- regions: region hierarchy nodes of foerderbereich (see region_service)
+
+Purpose and range filters become vectorized bit and compare operations instead
+of a MongoDB query on the long purpose strings. The catalog is loaded lazily
+and built off the event loop; when foundations change, a copy with just their
+rows replaced is swapped in (like the text indexes, see index_refresh_service).
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.models.project_description import CharitablePurpose
+from app.services.derivation_service import apply_funding_defaults, parse_deadline
+from app.services.index_refresh_service import RefreshingIndex
+from app.services.region_service import get_region_hierarchy
+
+logger = logging.getLogger(__name__)
+
+PURPOSE_BITS: Dict[str, int] = {
+    purpose.value: 1 << bit for bit, purpose in enumerate(CharitablePurpose)
+}
+
+SCOPE_CODES: Dict[str, int] = {
+    "local": 0,
+    "regional": 1,
+    "national": 2,
+    "international": 3,
+}
+
+# Fields loaded from MongoDB to build the catalog
+CATALOG_PROJECTION = {
+    "gemeinnuetzige_zwecke": 1,
+    "foerderbereich.scope": 1,
+    "foerderbereich.specific_areas": 1,
+    "foerderhoehe": 1,
+    "antragsprozess.deadline_type": 1,
+    "antragsprozess.deadline_date": 1,
+}
+
+_INITIAL_CAPACITY = 64
+
+
+def purpose_mask(purposes: Iterable[str]) -> int:
+    """Bitmask of the given purpose strings (unknown purposes are ignored)."""
+    mask = 0
+    for purpose in purposes or []:
+        mask |= PURPOSE_BITS.get(purpose, 0)
+    return mask
+
+
+def _deadline(antragsprozess: Any) -> np.datetime64:
+    deadline = parse_deadline(antragsprozess)
+    if deadline is None:
+        return np.datetime64("NaT", "D")
+    return np.datetime64(deadline.date(), "D")
+
+
+def _amount(value: Any) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FoundationCatalog(RefreshingIndex):
+    """Row-per-foundation attribute arrays with vectorized filters."""
+
+    name = "columnar foundation catalog"
+    projection = CATALOG_PROJECTION
+
+    def __init__(self):
+        super().__init__()
+        self.ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        # Region node indices per row; flattened into (row, tin, tout) arrays on demand
+        self.regions: List[List[int]] = []
+        self._region_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._allocate(_INITIAL_CAPACITY)
+
+    def _allocate(self, capacity: int) -> None:
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.purpose_mask = np.zeros(capacity, dtype=np.uint32)
+        self.scope = np.full(capacity, -1, dtype=np.int8)
+        self.min_amount = np.full(capacity, np.nan, dtype=np.float64)
+        self.max_amount = np.full(capacity, np.nan, dtype=np.float64)
+        self.deadline = np.full(capacity, np.datetime64("NaT", "D"), dtype="datetime64[D]")
+
+    def _grow(self) -> None:
+        size = len(self.alive)
+        old = (self.alive, self.purpose_mask, self.scope, self.min_amount, self.max_amount, self.deadline)
+        self._allocate(size * 2)
+        for new_array, old_array in zip(
+            (self.alive, self.purpose_mask, self.scope, self.min_amount, self.max_amount, self.deadline),
+            old,
+        ):
+            new_array[:size] = old_array
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _set_row(self, foundation: Dict[str, Any]) -> None:
+        foundation_id = foundation.get("_id") or foundation.get("id")
+        if not foundation_id:
+            return
+        row = self._rows.get(foundation_id)
+        if row is None:
+            row = len(self.ids)
+            if row >= len(self.alive):
+                self._grow()
+            self.ids.append(foundation_id)
+            self.regions.append([])
+            self._rows[foundation_id] = row
+
+        foerderbereich = foundation.get("foerderbereich") or {}
+        foerderhoehe = apply_funding_defaults(foundation.get("foerderhoehe"))
+        self.alive[row] = True
+        self.purpose_mask[row] = purpose_mask(foundation.get("gemeinnuetzige_zwecke"))
+        self.scope[row] = SCOPE_CODES.get(str(foerderbereich.get("scope", "")).lower(), -1)
+        self.min_amount[row] = _amount(foerderhoehe.get("min_amount"))
+        self.max_amount[row] = _amount(foerderhoehe.get("max_amount"))
+        self.deadline[row] = _deadline(foundation.get("antragsprozess"))
+        hierarchy = get_region_hierarchy()
+        self.regions[row] = [
+            hierarchy.index[node_id] for node_id in hierarchy.foundation_regions(foerderbereich)
+        ]
+        self._region_arrays = None
+
+    def _remove_row(self, foundation_id: str) -> None:
+        # The row stays allocated until the next full build
+        row = self._rows.pop(foundation_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.ids[row] = None
+            self.regions[row] = []
+            self._region_arrays = None
+
+    def _flatten_regions(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        hierarchy = get_region_hierarchy()
+        rows = np.fromiter(
+            (row for row, nodes in enumerate(self.regions) for _ in nodes), dtype=np.int64
+        )
+        nodes = np.fromiter(
+            (node for node_list in self.regions for node in node_list), dtype=np.int64
+        )
+        return rows, hierarchy.tin[nodes], hierarchy.tout[nodes]
+
+    def _build(self, foundations: List[Dict[str, Any]]) -> "FoundationCatalog":
+        catalog = FoundationCatalog()
+        catalog._allocate(max(_INITIAL_CAPACITY, len(foundations)))
+        for foundation in foundations:
+            catalog._set_row(foundation)
+        catalog._region_arrays = catalog._flatten_regions()
+        return catalog
+
+    def _swap(self, catalog: "FoundationCatalog") -> None:
+        self.ids = catalog.ids
+        self._rows = catalog._rows
+        self.regions = catalog.regions
+        self._region_arrays = catalog._region_arrays
+        self.alive = catalog.alive
+        self.purpose_mask = catalog.purpose_mask
+        self.scope = catalog.scope
+        self.min_amount = catalog.min_amount
+        self.max_amount = catalog.max_amount
+        self.deadline = catalog.deadline
+
+    def _patch(self, foundations: List[Dict[str, Any]], removed_ids: Set[str]) -> "FoundationCatalog":
+        catalog = FoundationCatalog()
+        catalog.ids = list(self.ids)
+        catalog._rows = dict(self._rows)
+        catalog.regions = list(self.regions)
+        catalog.alive = self.alive.copy()
+        catalog.purpose_mask = self.purpose_mask.copy()
+        catalog.scope = self.scope.copy()
+        catalog.min_amount = self.min_amount.copy()
+        catalog.max_amount = self.max_amount.copy()
+        catalog.deadline = self.deadline.copy()
+        for foundation_id in removed_ids:
+            catalog._remove_row(foundation_id)
+        for foundation in foundations:
+            catalog._set_row(foundation)
+        catalog._region_arrays = catalog._flatten_regions()
+        return catalog
+
+    def _describe(self) -> str:
+        return f"with {len(self)} rows"
+
+    def select(
+        self,
+        purposes: Optional[Iterable[str]] = None,
+        scopes: Optional[Iterable[str]] = None,
+        min_funding: Optional[float] = None,
+        max_funding: Optional[float] = None,
+        open_on: Optional[date] = None,
+        regions: Optional[Iterable[str]] = None,
+    ) -> np.ndarray:
+        """
+        Boolean row mask of foundations matching all given filters.
+
+        Args:
+            purposes: Match foundations supporting ANY of these purposes
+            scopes: Match foundations with one of these foerderbereich scopes
+            min_funding: Match foundations whose max_amount reaches this amount
+            max_funding: Match foundations whose min_amount does not exceed this amount
+            open_on: Drop foundations whose fixed deadline is before this date
+            regions: Project location as region node ids; drops foundations whose
+                known funding regions lie on a different branch of the hierarchy
+        """
+        size = len(self.ids)
+        mask = self.alive[:size].copy()
+        if purposes is not None:
+            mask &= (self.purpose_mask[:size] & np.uint32(purpose_mask(purposes))) != 0
+        if scopes is not None:
+            codes = [SCOPE_CODES[scope] for scope in scopes if scope in SCOPE_CODES]
+            mask &= np.isin(self.scope[:size], codes)
+        if min_funding is not None:
+            mask &= ~(self.max_amount[:size] < min_funding)
+        if max_funding is not None:
+            mask &= ~(self.min_amount[:size] > max_funding)
+        if open_on is not None:
+            deadline = self.deadline[:size]
+            mask &= np.isnat(deadline) | (deadline >= np.datetime64(open_on, "D"))
+        if regions:
+            mask &= self._region_mask(size, regions)
+        return mask
+
+    def _region_mask(self, size: int, regions: Iterable[str]) -> np.ndarray:
+        hierarchy = get_region_hierarchy()
+        project_nodes = [hierarchy.index[node_id] for node_id in regions if node_id in hierarchy.index]
+        if not project_nodes:
+            return np.ones(size, dtype=bool)
+
+        if self._region_arrays is None:
+            self._region_arrays = self._flatten_regions()
+        rows, tin, tout = self._region_arrays
+
+        # A foundation region contains the project location or lies inside it
+        hit = np.zeros(len(rows), dtype=bool)
+        for node in project_nodes:
+            project_tin, project_tout = hierarchy.tin[node], hierarchy.tout[node]
+            hit |= (tin <= project_tin) & (project_tin <= tout)
+            hit |= (project_tin <= tin) & (tin <= project_tout)
+
+        known = np.zeros(size, dtype=bool)
+        compatible = np.zeros(size, dtype=bool)
+        in_range = rows < size
+        known[rows[in_range]] = True
+        compatible[rows[hit & in_range]] = True
+        # Foundations without resolvable regions are never pruned
+        return ~known | compatible
+
+    def filter_ids(self, **filters: Any) -> List[str]:
+        """Return the ids of foundations matching ``filters`` (see select)."""
+        return [self.ids[row] for row in np.flatnonzero(self.select(**filters))]
+
+
+# Global catalog instance
+_foundation_catalog = None
+
+
+def get_foundation_catalog() -> FoundationCatalog:
+    """Get or create the global columnar foundation catalog."""
+    global _foundation_catalog
+    if _foundation_catalog is None:
+        _foundation_catalog = FoundationCatalog()
+    return _foundation_catalog
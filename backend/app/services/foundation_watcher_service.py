@@ -0,0 +1,473 @@
+"""
+Incremental re-scoring of stored session results when foundations change.
+
+Sessions keep the FoundationScore list they were shown in ``foundation_results``.
+When a foundation changes, the watcher finds the sessions listing it (through
+an index on ``foundation_results.id``), re-evaluates only that foundation for
+each distinct project and patches its stored score in place. A deleted
+foundation, or one that no longer matches a project's purposes or location, is
+removed from the results.
+
+Every worker starts the watcher, but only the one holding the lease document
+in ``watcher_leases`` watches. It renews the lease every third of
+FOUNDATION_WATCHER_LEASE_SECONDS; when it stops or dies, another worker takes
+over once the lease expires.
+
+Changes are read from a MongoDB change stream. Deployments without change
+streams (standalone servers) fall back to polling: every
+FOUNDATION_WATCHER_POLL_SECONDS the foundations whose ``updated_at`` is at or
+after the newest one seen so far are read, and only when the collection's
+estimated count disagrees with the known ids are the ids scanned for inserts
+and deletes. Writers therefore set ``updated_at`` on every foundation write
+(the seed script does); change streams pick up any write.
+
+Changes are collected for FOUNDATION_WATCHER_DEBOUNCE_SECONDS (or one polling
+interval) and then handled together: one catalog version bump lists all
+changed ids, so the scoring cache is dropped once and the in-process indexes
+of all workers patch those foundations. A foundation whose stored derived
+fields are outdated is re-derived (and the fields written back) before it is
+re-scored; updates of the derived fields alone are ignored. On start the
+watcher compares the catalog state (ids and ``updated_at``) with the hash
+stored at the last bump and bumps the version if it differs. Changes made
+while the server is down are not replayed to sessions; re-match affected
+sessions with ``python -m app.rematch`` after offline catalog imports.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationScore
+from app.services.catalog_version_service import bump_catalog_version, get_catalog_state_hash
+from app.services.derivation_service import (
+    DERIVED_FIELD,
+    derive_foundation_fields,
+    is_current,
+    is_deadline_expired,
+)
+from app.services.region_service import get_region_hierarchy
+from app.services.scoring_cache_service import get_scoring_cache, project_fingerprint
+from app.services.scoring_service import FOUNDATION_SCORING_PROJECTION, get_scoring_service
+
+logger = logging.getLogger(__name__)
+
+_LEASE_ID = "foundation_watcher"
+
+# Restores the match score order of a session's results after a patch
+_RESORT_RESULTS = {"$push": {"foundation_results": {"$each": [], "$sort": {"match_score": -1}}}}
+
+
+def is_derived_only(update_description: Optional[Dict[str, Any]]) -> bool:
+    """Whether a change stream update only wrote the derived fields of a foundation."""
+    if not update_description:
+        return False
+    fields = [
+        *(update_description.get("updatedFields") or {}),
+        *(update_description.get("removedFields") or []),
+    ]
+    return bool(fields) and all(
+        field == DERIVED_FIELD or field.startswith(DERIVED_FIELD + ".") for field in fields
+    )
+
+
+class FoundationChangeWatcher:
+    """Background task that keeps sessions' foundation_results in sync with the foundations."""
+
+    def __init__(self, poll_seconds: float, lease_seconds: float, debounce_seconds: float = 0.0):
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.debounce_seconds = debounce_seconds
+        self.owner = uuid.uuid4().hex
+        # "change_stream" or "poll" once running
+        self.mode: Optional[str] = None
+        # updated_at of every known foundation, and the newest one (the polling watermark)
+        self._versions: Dict[str, Any] = {}
+        self._watermark: Optional[datetime] = None
+        # Changes not handled yet: foundation id -> new document (None if deleted)
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start watching on the running loop (no-op if disabled or running)."""
+        if self._task is None and settings.FOUNDATION_WATCHER_ENABLED:
+            self._db = db
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        """Stop the watcher task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            # Let another worker take over without waiting for the lease to expire
+            await self._db.watcher_leases.delete_one({"_id": _LEASE_ID, "owner": self.owner})
+        except Exception:
+            logger.exception("Failed to release the foundation watcher lease")
+
+    async def _acquire_lease(self, db: AsyncIOMotorDatabase) -> bool:
+        """Take or renew the watcher lease; False while another worker holds it."""
+        now = datetime.utcnow()
+        try:
+            await db.watcher_leases.update_one(
+                {"_id": _LEASE_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {
+                    "$set": {
+                        "owner": self.owner,
+                        "expires_at": now + timedelta(seconds=self.lease_seconds),
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The upsert collides with the lease of another worker
+            return False
+        except Exception:
+            logger.exception("Failed to acquire the foundation watcher lease")
+            return False
+        return True
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        renew_seconds = max(1.0, self.lease_seconds / 3)
+        while True:
+            if not await self._acquire_lease(db):
+                await asyncio.sleep(renew_seconds)
+                continue
+            logger.info(f"Acquired the foundation watcher lease ({self.owner})")
+            sync = asyncio.create_task(self._sync(db))
+            try:
+                while not sync.done():
+                    await asyncio.sleep(renew_seconds)
+                    if not await self._acquire_lease(db):
+                        logger.warning("Lost the foundation watcher lease, stopping to watch")
+                        break
+            finally:
+                sync.cancel()
+                try:
+                    await sync
+                except asyncio.CancelledError:
+                    pass
+
+    async def _sync(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                await db.sessions.create_index("foundation_results.id")
+                await db.foundations.create_index("updated_at")
+                await self._load_versions(db)
+                if await get_catalog_state_hash(db) != await self._state_hash():
+                    logger.info("Foundations changed since the last catalog version bump")
+                    await self._catalog_changed(db)
+                if self.mode != "poll":
+                    await self._watch(db)
+                else:
+                    await self._poll(db)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if self.mode is None:
+                    # Change streams need a replica set or a sharded cluster
+                    logger.warning(
+                        f"Change streams unavailable ({e}), polling foundations every {self.poll_seconds}s"
+                    )
+                    self.mode = "poll"
+                    continue
+                logger.exception("Foundation change watcher failed, restarting")
+                await asyncio.sleep(self.poll_seconds)
+            except Exception:
+                logger.exception("Foundation change watcher failed, restarting")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _load_versions(self, db: AsyncIOMotorDatabase) -> None:
+        foundations = await db.foundations.find({}, {"updated_at": 1}).to_list(length=None)
+        self._versions = {}
+        self._watermark = None
+        for foundation in foundations:
+            self._track(foundation["_id"], foundation)
+
+    def _track(self, foundation_id: str, document: Optional[Dict[str, Any]]) -> None:
+        """Remember a foundation's updated_at (forget it if it was deleted)."""
+        if document is None:
+            self._versions.pop(foundation_id, None)
+            return
+        updated_at = document.get("updated_at")
+        self._versions[foundation_id] = updated_at
+        if isinstance(updated_at, datetime) and (
+            self._watermark is None or updated_at > self._watermark
+        ):
+            self._watermark = updated_at
+
+    async def _state_hash(self) -> str:
+        """Hash of the known foundation ids and their updated_at."""
+        versions = list(self._versions.items())
+
+        def digest() -> str:
+            payload = json.dumps(sorted(versions, key=lambda item: str(item[0])), default=str)
+            return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+        return await asyncio.to_thread(digest)
+
+    async def _catalog_changed(
+        self, db: AsyncIOMotorDatabase, foundation_ids: Optional[List[str]] = None
+    ) -> None:
+        """
+        Bump the catalog version and drop scoring results of older versions.
+
+        The changed ``foundation_ids`` are logged with the version so the
+        in-process indexes patch them instead of rebuilding (None = unknown).
+        """
+        catalog_version = await bump_catalog_version(db, await self._state_hash(), foundation_ids)
+        await get_scoring_cache().invalidate(db, catalog_version)
+
+    async def _watch(self, db: AsyncIOMotorDatabase) -> None:
+        async with db.foundations.watch(full_document="updateLookup") as stream:
+            # The stream is opened by the first getMore (fails on standalone servers)
+            change = await stream.try_next()
+            if self.mode is None:
+                logger.info("Watching foundation changes with a change stream")
+            self.mode = "change_stream"
+            while stream.alive:
+                if change is not None:
+                    self._handle_change_event(change)
+                # try_next returns None after waiting for changes, so this runs regularly
+                if self._pending and time.monotonic() - self._pending_since >= self.debounce_seconds:
+                    await self._flush(db)
+                change = await stream.try_next()
+
+    def _handle_change_event(self, change: Dict[str, Any]) -> None:
+        operation = change.get("operationType")
+        if operation not in ("insert", "replace", "update", "delete"):
+            return
+        if operation == "update" and is_derived_only(change.get("updateDescription")):
+            return
+        foundation_id = change["documentKey"]["_id"]
+        document = None if operation == "delete" else change.get("fullDocument")
+        self._queue(foundation_id, document)
+
+    async def _poll(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await self._scan_changes(db)
+            if self._pending:
+                # One version bump for all changes of the interval
+                await self._flush(db)
+
+    async def _scan_changes(self, db: AsyncIOMotorDatabase) -> None:
+        """Queue the foundations written, inserted or deleted since the last scan."""
+        # $gte: writes within the same millisecond as the watermark are not missed
+        query = (
+            {"updated_at": {"$gte": self._watermark}}
+            if self._watermark is not None
+            else {"updated_at": {"$ne": None}}
+        )
+        for document in await db.foundations.find(query).to_list(length=None):
+            foundation_id = document["_id"]
+            if (
+                foundation_id not in self._versions
+                or self._versions[foundation_id] != document.get("updated_at")
+            ):
+                self._queue(foundation_id, document)
+
+        if await db.foundations.estimated_document_count() == len(self._versions):
+            return
+        # Deleted foundations, or inserted ones without updated_at
+        found = await db.foundations.find({}, {"_id": 1}).to_list(length=None)
+        ids = {foundation["_id"] for foundation in found}
+        for foundation_id in [f_id for f_id in self._versions if f_id not in ids]:
+            self._queue(foundation_id, None)
+        inserted = [f_id for f_id in ids if f_id not in self._versions]
+        if inserted:
+            async for document in db.foundations.find({"_id": {"$in": inserted}}):
+                self._queue(document["_id"], document)
+
+    def _queue(self, foundation_id: str, document: Optional[Dict[str, Any]]) -> None:
+        """Collect a change; the latest document of a foundation wins."""
+        self._track(foundation_id, document)
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending[foundation_id] = document
+
+    async def _flush(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        Handle the collected changes: bump the catalog version once for all of
+        them and patch the stored results of the sessions listing them.
+
+        Returns:
+            Number of patched sessions
+        """
+        pending, self._pending, self._pending_since = self._pending, {}, None
+        documents = {}
+        for foundation_id, document in pending.items():
+            documents[foundation_id] = (
+                await self._rederive(db, document) if document is not None else None
+            )
+        await self._catalog_changed(db, list(pending))
+        patched = 0
+        for foundation_id, document in documents.items():
+            patched += await self._patch_sessions(db, foundation_id, document)
+        logger.info(
+            f"Handled changes of {len(pending)} foundations, patched {patched} session results"
+        )
+        return patched
+
+    async def _patch_sessions(
+        self,
+        db: AsyncIOMotorDatabase,
+        foundation_id: str,
+        document: Optional[Dict[str, Any]],
+    ) -> int:
+        """Patch the stored results of the sessions listing a changed foundation."""
+        cursor = db.sessions.find(
+            {"foundation_results.id": foundation_id},
+            {"session_id": 1, "project_description": 1},
+        )
+        sessions = await cursor.to_list(length=None)
+        if not sessions:
+            return 0
+
+        now = datetime.utcnow().isoformat()
+        remove = {"$pull": {"foundation_results": {"id": foundation_id}}, "$set": {"updated_at": now}}
+        if document is None:
+            operations = [UpdateOne({"session_id": s["session_id"]}, remove) for s in sessions]
+            patched = len(operations)
+        else:
+            operations, patched = await self._rescore_sessions(
+                db, foundation_id, document, sessions, remove, now
+            )
+
+        if operations:
+            # Ordered, so each session's re-sort runs after its patch
+            await db.sessions.bulk_write(operations, ordered=True)
+        logger.info(
+            f"Foundation {foundation_id} changed, patched the results of {patched} sessions"
+        )
+        return patched
+
+    @staticmethod
+    async def _rederive(db: AsyncIOMotorDatabase, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the document with up-to-date derived fields, storing them if they were stale."""
+        if is_current(document.get(DERIVED_FIELD), document):
+            return document
+        derived = derive_foundation_fields(document)
+        await db.foundations.update_one({"_id": document["_id"]}, {"$set": {DERIVED_FIELD: derived}})
+        return {**document, DERIVED_FIELD: derived}
+
+    async def _rescore_sessions(
+        self,
+        db: AsyncIOMotorDatabase,
+        foundation_id: str,
+        document: Dict[str, Any],
+        sessions: List[Dict[str, Any]],
+        remove: Dict[str, Any],
+        now: str,
+    ) -> Tuple[List[UpdateOne], int]:
+        """Build the updates of the sessions' results and count the patched sessions."""
+        # Same fields as a scoring candidate, so memo keys match the request path
+        foundation = {
+            key: value
+            for key, value in document.items()
+            if key == "_id" or key in FOUNDATION_SCORING_PROJECTION
+        }
+        projects: Dict[str, Tuple[ProjectDescription, List[str]]] = {}
+        for session in sessions:
+            try:
+                project = ProjectDescription(**session["project_description"])
+            except (KeyError, TypeError, ValidationError):
+                continue
+            entry = projects.setdefault(project_fingerprint(project), (project, []))
+            entry[1].append(session["session_id"])
+
+        eligible = {
+            fingerprint: entry
+            for fingerprint, entry in projects.items()
+            if self._is_eligible(entry[0], foundation)
+        }
+        scores = await asyncio.gather(
+            *(self._evaluate(db, project, foundation) for project, _ in eligible.values())
+        )
+        scores_by_fingerprint = dict(zip(eligible, scores))
+
+        operations = []
+        patched = 0
+        for fingerprint, (_, session_ids) in projects.items():
+            if fingerprint not in eligible:
+                operations.extend(UpdateOne({"session_id": s}, remove) for s in session_ids)
+                patched += len(session_ids)
+                continue
+            score = scores_by_fingerprint[fingerprint]
+            if score is None:
+                # Keep the old score; the next change or a rematch retries
+                continue
+            for session_id in session_ids:
+                operations.append(
+                    UpdateOne(
+                        {"session_id": session_id, "foundation_results.id": foundation_id},
+                        {"$set": {"foundation_results.$": score.model_dump(), "updated_at": now}},
+                    )
+                )
+                # The new match score may move the foundation within the ranking
+                operations.append(UpdateOne({"session_id": session_id}, _RESORT_RESULTS))
+            patched += len(session_ids)
+        return operations, patched
+
+    @staticmethod
+    def _is_eligible(project: ProjectDescription, foundation: Dict[str, Any]) -> bool:
+        """Whether the foundation would still pass the retrieval filters for the project."""
+        purposes = {purpose.value for purpose in project.charitable_purpose}
+        if not purposes & set(foundation.get("gemeinnuetzige_zwecke") or []):
+            return False
+        if settings.SCORING_EXPIRED_DEADLINES == "exclude" and is_deadline_expired(
+            foundation.get("antragsprozess")
+        ):
+            return False
+        if settings.SCORING_REGION_PRUNING:
+            hierarchy = get_region_hierarchy()
+            return hierarchy.can_fund(
+                hierarchy.foundation_regions(foundation.get("foerderbereich")),
+                hierarchy.location_regions(project),
+            )
+        return True
+
+    async def _evaluate(
+        self, db: AsyncIOMotorDatabase, project: ProjectDescription, foundation: Dict[str, Any]
+    ) -> Optional[FoundationScore]:
+        """Evaluate one (project, foundation) pair, reusing a memoized evaluation."""
+        score = await get_scoring_service().evaluate_foundation(project, foundation, db)
+        if score is None:
+            logger.error(
+                f"LLM failed to re-evaluate foundation {foundation['_id']}, keeping the stored score"
+            )
+        return score
+
+
+# Global watcher instance
+_foundation_watcher = None
+
+
+def get_foundation_watcher() -> FoundationChangeWatcher:
+    """Get or create the global foundation change watcher."""
+    global _foundation_watcher
+    if _foundation_watcher is None:
+        _foundation_watcher = FoundationChangeWatcher(
+            settings.FOUNDATION_WATCHER_POLL_SECONDS,
+            settings.FOUNDATION_WATCHER_LEASE_SECONDS,
+            settings.FOUNDATION_WATCHER_DEBOUNCE_SECONDS,
+        )
+    return _foundation_watcher
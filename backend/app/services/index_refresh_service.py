@@ -0,0 +1,151 @@
+"""
+Off-loop building of the in-process indexes over the foundation catalog.
+
+The BM25 and TF-IDF indexes, the columnar catalog and the past project index
+are built from the foundations collection with CPU-bound Python and NumPy
+code. The build runs in a worker thread on fresh objects that are swapped in
+when done, so requests never wait for it on the event loop.
+
+Only the first build of a process is awaited. An index that is stale (older
+than TEXT_INDEX_MAX_AGE_SECONDS or built from another catalog version) keeps
+serving while a single background task refreshes it. When only the catalog
+version moved on, the refresh patches the foundations logged as changed since
+the index's version (see catalog_version_service) instead of rebuilding, as
+long as they are at most INDEX_PATCH_MAX_FOUNDATIONS. The max age counts from
+the last full build, so patched indexes are still rebuilt from scratch
+regularly.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.services.catalog_version_service import get_catalog_changes, get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshingIndex:
+    """
+    Base class of the indexes built from the foundations collection.
+
+    Subclasses set ``name`` and ``projection`` and implement ``_build`` (runs
+    in a worker thread and must not touch the live index) and ``_swap``
+    (installs the build result on the event loop). Indexes that can be patched
+    implement ``_patch`` (runs in a worker thread next to searches of the live
+    index) and, unless the patch is a build result for ``_swap``, ``_apply_patch``.
+    """
+
+    name = "index"
+    projection: Dict[str, int] = {}
+
+    def __init__(self):
+        self.built_at: Optional[float] = None
+        self.catalog_version: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+
+    def _is_expired(self) -> bool:
+        max_age = settings.TEXT_INDEX_MAX_AGE_SECONDS
+        return max_age > 0 and time.monotonic() - self.built_at > max_age
+
+    def _is_stale(self, catalog_version: Optional[int] = None) -> bool:
+        if self.built_at is None:
+            return True
+        if catalog_version is not None and catalog_version != self.catalog_version:
+            return True
+        return self._is_expired()
+
+    async def ensure_built(
+        self, db: AsyncIOMotorDatabase, catalog_version: Optional[int] = None
+    ) -> None:
+        """
+        Build the index on first use and refresh it in the background when it is stale.
+
+        The index is stale once it exceeds its max age or, if ``catalog_version``
+        is given, when it was built from a different catalog version. A stale
+        index keeps serving until the refresh has been applied.
+        """
+        if self.built_at is None:
+            async with self._lock:
+                if self.built_at is None:
+                    await self.rebuild(db)
+            return
+        if self._is_stale(catalog_version) and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.create_task(self._refresh_in_background(db))
+
+    async def _refresh_in_background(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            async with self._lock:
+                if not await self.catch_up(db):
+                    await self.rebuild(db)
+        except Exception:
+            logger.exception(f"Refreshing the {self.name} failed, serving the previous build")
+
+    async def catch_up(self, db: AsyncIOMotorDatabase) -> bool:
+        """
+        Patch the foundations changed since the index's catalog version.
+
+        Returns False if the index needs a full rebuild instead: it exceeded its
+        max age, cannot be patched, or the changes are unknown or too many.
+        """
+        if self.built_at is None or self._is_expired():
+            return False
+        catalog_version = await get_catalog_version(db)
+        changed = await get_catalog_changes(db, self.catalog_version, catalog_version)
+        if changed is None or len(changed) > settings.INDEX_PATCH_MAX_FOUNDATIONS:
+            return False
+
+        started = time.perf_counter()
+        cursor = db.foundations.find({"_id": {"$in": list(changed)}}, self.projection)
+        foundations = await cursor.to_list(length=None)
+        removed_ids = changed - {foundation["_id"] for foundation in foundations}
+
+        patch = await asyncio.to_thread(self._patch, foundations, removed_ids)
+        if patch is None:
+            return False
+
+        self._apply_patch(patch)
+        self.catalog_version = catalog_version
+        logger.info(
+            f"Patched {self.name} with {len(changed)} changed foundations "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return True
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> None:
+        """Rebuild the whole index from the foundations collection and swap it in."""
+        started = time.perf_counter()
+        catalog_version = await get_catalog_version(db)
+        cursor = db.foundations.find({}, self.projection)
+        foundations = await cursor.to_list(length=None)
+
+        built = await asyncio.to_thread(self._build, foundations)
+
+        self._swap(built)
+        self.built_at = time.monotonic()
+        self.catalog_version = catalog_version
+        logger.info(
+            f"Built {self.name} {self._describe()} "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def _build(self, foundations: List[Dict[str, Any]]) -> Any:
+        raise NotImplementedError
+
+    def _swap(self, built: Any) -> None:
+        raise NotImplementedError
+
+    def _patch(self, foundations: List[Dict[str, Any]], removed_ids: Set[str]) -> Any:
+        """Prepare the update for changed and deleted foundations (None = rebuild instead)."""
+        return None
+
+    def _apply_patch(self, patch: Any) -> None:
+        self._swap(patch)
+
+    def _describe(self) -> str:
+        return ""
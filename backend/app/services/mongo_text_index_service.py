@@ -0,0 +1,90 @@
+"""
+Managed MongoDB text index for SCORING_RETRIEVAL_MODE=mongo_text.
+
+A collection can only have one text index, and ``$text`` always searches it.
+This service owns that index on the foundations collection: a weighted,
+German-language index over the fields the scoring pipeline ranks by. An older
+text index with other fields or weights (e.g. the former name/short_description
+index created by seed_data) is replaced.
+"""
+
+import logging
+from typing import Any, Dict
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+MONGO_TEXT_INDEX_NAME = "foundation_text_de"
+
+# Field weights of the text index (textScore multiplies the term matches per field)
+MONGO_TEXT_INDEX_WEIGHTS = {
+    "name": 10,
+    "short_description": 5,
+    "gemeinnuetzige_zwecke": 3,
+    "past_projects.description": 3,
+    "long_description": 2,
+    "past_projects.outcomes": 1,
+}
+
+MONGO_TEXT_INDEX_LANGUAGE = "german"
+
+# Documents never carry this field, so a "language" field cannot override the analyzer
+_LANGUAGE_OVERRIDE = "text_index_language"
+
+
+def _is_text_index(info: Dict[str, Any]) -> bool:
+    # Text indexes are stored with the internal key fields _fts/_ftsx
+    return any(field == "_fts" for field, _ in info.get("key", []))
+
+
+def _matches(name: str, info: Dict[str, Any]) -> bool:
+    return (
+        name == MONGO_TEXT_INDEX_NAME
+        and info.get("weights") == MONGO_TEXT_INDEX_WEIGHTS
+        and info.get("default_language") == MONGO_TEXT_INDEX_LANGUAGE
+        and info.get("language_override") == _LANGUAGE_OVERRIDE
+    )
+
+
+class MongoTextIndexManager:
+    """Creates the foundations text index once per process."""
+
+    def __init__(self):
+        self.ready = False
+
+    async def ensure(self, db: AsyncIOMotorDatabase) -> None:
+        """Create the text index, replacing a text index with another definition."""
+        if self.ready:
+            return
+        indexes = await db.foundations.index_information()
+        for name, info in list(indexes.items()):
+            if not _is_text_index(info):
+                continue
+            if _matches(name, info):
+                self.ready = True
+                return
+            logger.info(f"Dropping outdated foundations text index {name}")
+            await db.foundations.drop_index(name)
+
+        await db.foundations.create_index(
+            [(field, "text") for field in MONGO_TEXT_INDEX_WEIGHTS],
+            name=MONGO_TEXT_INDEX_NAME,
+            weights=MONGO_TEXT_INDEX_WEIGHTS,
+            default_language=MONGO_TEXT_INDEX_LANGUAGE,
+            language_override=_LANGUAGE_OVERRIDE,
+        )
+        logger.info(f"Created foundations text index {MONGO_TEXT_INDEX_NAME}")
+        self.ready = True
+
+
+# Global manager instance
+_mongo_text_index = None
+
+
+def get_mongo_text_index() -> MongoTextIndexManager:
+    """Get or create the global text index manager."""
+    global _mongo_text_index
+    if _mongo_text_index is None:
+        _mongo_text_index = MongoTextIndexManager()
+    return _mongo_text_index
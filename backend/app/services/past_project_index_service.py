@@ -0,0 +1,341 @@
+"""
+Approximate nearest-neighbor index over the foundations' past projects.
+
+``past_projects`` records what a foundation actually funded. Every past project
+(name and description) is embedded as a dense vector: its hashed TF-IDF
+features (see vector_index_service) are folded into PAST_PROJECT_EMBEDDING_DIM
+signed buckets and L2-normalized, so dot products approximate the cosine
+similarity of the sparse vectors.
+
+The vectors are searched with an inverted file (IVF) index: spherical k-means
+centroids partition the projects into lists, and a query only scans the lists
+of its PAST_PROJECT_INDEX_PROBES nearest centroids. A foundation's similarity
+to a project is the maximum over its past projects, so foundations with
+hundreds of past projects are found through the single closest one.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.index_refresh_service import RefreshingIndex
+from app.services.text_index_service import GermanAnalyzer
+from app.services.vector_index_service import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Fields loaded from MongoDB to build the index
+PAST_PROJECT_INDEX_PROJECTION = {
+    "past_projects.name": 1,
+    "past_projects.description": 1,
+}
+
+# Sparse hashed features per project before folding into the dense embedding
+_SPARSE_FEATURES = 2**18
+
+
+def past_project_texts(foundation: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Return (position in past_projects, text) of the foundation's non-empty past projects."""
+    texts = []
+    for position, project in enumerate(foundation.get("past_projects") or []):
+        if not isinstance(project, dict):
+            continue
+        text = f"{project.get('name') or ''} {project.get('description') or ''}".strip()
+        if text:
+            texts.append((position, text))
+    return texts
+
+
+class PastProjectEmbedder:
+    """Maps text to L2-normalized dense hashed TF-IDF embeddings."""
+
+    def __init__(self, analyzer: GermanAnalyzer, dim: int):
+        self.vectorizer = HashingVectorizer(analyzer, _SPARSE_FEATURES)
+        self.dim = dim
+        # Document frequencies are fixed at fit time; unseen features get the maximal idf
+        self.idf = np.ones(_SPARSE_FEATURES, dtype=np.float32)
+
+    def fit(self, texts: List[str]) -> None:
+        """Compute the idf weights over the given corpus."""
+        df = np.zeros(_SPARSE_FEATURES, dtype=np.float64)
+        for text in texts:
+            df[list(self.vectorizer.features(text))] += 1.0
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding of ``text`` (all zeros if it has no index terms)."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = self.vectorizer.features(text)
+        if not features:
+            return vector
+        buckets = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        weights = np.log1p(counts) * self.idf[buckets]
+        # Fold the sparse features into signed dense buckets
+        signs = 1.0 - 2.0 * ((buckets // self.dim) & 1)
+        np.add.at(vector, buckets % self.dim, weights * signs)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
+
+
+class IVFIndex:
+    """
+    Inverted file index over unit vectors with max-similarity aggregation per group.
+
+    Vectors are kept per group (foundation) so single groups can be replaced
+    cheaply; the packed list arrays are rebuilt lazily on the next query after a
+    change. PastProjectIndex changes a copy in its worker thread and packs it
+    there, so its searches never pack. Copies keep their centroids: they are
+    retrained once the number of vectors has doubled or halved since the last
+    training, otherwise new vectors join their nearest list.
+    """
+
+    KMEANS_ITERATIONS = 10
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.groups: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty = True
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.trained_size = 0
+        self.group_ids: List[str] = []
+        self.group_of: Dict[str, int] = {}
+        self.list_ptr = np.zeros(1, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.row_groups = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return sum(vectors.shape[0] for vectors, _ in self.groups.values())
+
+    def copy(self) -> "IVFIndex":
+        """Unpacked copy sharing the group vectors and centroids (both are replaced, never changed)."""
+        index = IVFIndex(self.dim)
+        index.groups = dict(self.groups)
+        index.centroids = self.centroids
+        index.trained_size = self.trained_size
+        return index
+
+    def add(self, group_id: str, vectors: np.ndarray, positions: np.ndarray) -> None:
+        """Set the vectors of a group; ``positions`` identify them within the group."""
+        if vectors.shape[0] == 0:
+            self.remove(group_id)
+            return
+        self.groups[group_id] = (vectors.astype(np.float32), positions.astype(np.int64))
+        self._dirty = True
+
+    def remove(self, group_id: str) -> None:
+        if self.groups.pop(group_id, None) is not None:
+            self._dirty = True
+
+    def _n_lists(self, n_vectors: int) -> int:
+        n_lists = settings.PAST_PROJECT_INDEX_LISTS or int(math.sqrt(n_vectors))
+        return max(1, min(n_lists, n_vectors))
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Fit spherical k-means centroids (deterministic initialization)."""
+        n_lists = self._n_lists(vectors.shape[0])
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(vectors.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            norms = np.linalg.norm(sums, axis=1)
+            # Empty lists keep their centroid
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        self.centroids = centroids.astype(np.float32)
+        self.trained_size = vectors.shape[0]
+
+    def pack(self) -> None:
+        """(Re-)build the packed list arrays from the group dictionary."""
+        self.group_ids = list(self.groups.keys())
+        self.group_of = {group_id: i for i, group_id in enumerate(self.group_ids)}
+        if self.groups:
+            vectors = np.concatenate([self.groups[g][0] for g in self.group_ids])
+            row_groups = np.repeat(
+                np.arange(len(self.group_ids), dtype=np.int64),
+                [self.groups[g][0].shape[0] for g in self.group_ids],
+            )
+        else:
+            vectors = np.zeros((0, self.dim), dtype=np.float32)
+            row_groups = np.zeros(0, dtype=np.int64)
+
+        n_vectors = vectors.shape[0]
+        if n_vectors and (
+            self.centroids.shape[0] == 0
+            or n_vectors > 2 * self.trained_size
+            or 2 * n_vectors < self.trained_size
+        ):
+            self.train(vectors)
+
+        if n_vectors:
+            assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        else:
+            assignment = np.zeros(0, dtype=np.int64)
+        order = np.argsort(assignment, kind="stable")
+        list_ptr = np.zeros(self.centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=self.centroids.shape[0]), out=list_ptr[1:])
+
+        self.vectors = vectors[order]
+        self.row_groups = row_groups[order]
+        self.list_ptr = list_ptr
+        self._dirty = False
+
+    def search(
+        self,
+        query: np.ndarray,
+        candidate_ids: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        n_probe: int = 16,
+    ) -> List[Tuple[str, float]]:
+        """Approximate max similarity per group for the groups in the probed lists, best first."""
+        if not self.groups:
+            return []
+        if self._dirty:
+            self.pack()
+
+        n_lists = self.centroids.shape[0]
+        probes = np.argsort(-(self.centroids @ query))[: max(1, min(n_probe, n_lists))]
+        starts = self.list_ptr[probes]
+        lengths = self.list_ptr[probes + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+        rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        similarities = self.vectors[rows] @ query
+        groups = self.row_groups[rows]
+
+        if candidate_ids is not None:
+            allowed = np.zeros(len(self.group_ids), dtype=bool)
+            allowed[[self.group_of[c] for c in candidate_ids if c in self.group_of]] = True
+            keep = allowed[groups]
+            similarities, groups = similarities[keep], groups[keep]
+
+        best = np.zeros(len(self.group_ids), dtype=np.float32)
+        np.maximum.at(best, groups, similarities)
+        hits = np.flatnonzero(best > 0)
+        if hits.size == 0:
+            return []
+        if limit is not None and hits.size > limit:
+            hits = hits[np.argpartition(-best[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-best[hits], kind="stable")]
+        return [(self.group_ids[g], float(best[g])) for g in hits]
+
+    def group_similarities(self, query: np.ndarray, group_id: str) -> Tuple[float, List[int]]:
+        """Exact max similarity of a group and its positions, most similar first."""
+        if group_id not in self.groups:
+            return 0.0, []
+        vectors, positions = self.groups[group_id]
+        similarities = vectors @ query
+        order = np.argsort(-similarities, kind="stable")
+        return max(float(similarities[order[0]]), 0.0), positions[order].tolist()
+
+
+class PastProjectIndex(RefreshingIndex):
+    """IVF index over the past projects of all foundations, loaded lazily from MongoDB."""
+
+    name = "past project index"
+    projection = PAST_PROJECT_INDEX_PROJECTION
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = GermanAnalyzer()
+        self.embedder = PastProjectEmbedder(self.analyzer, settings.PAST_PROJECT_EMBEDDING_DIM)
+        self.index = IVFIndex(settings.PAST_PROJECT_EMBEDDING_DIM)
+
+    def _build(
+        self, foundations: List[Dict[str, Any]]
+    ) -> Tuple[GermanAnalyzer, PastProjectEmbedder, IVFIndex]:
+        documents = [
+            (foundation["_id"], past_project_texts(foundation))
+            for foundation in foundations
+            if foundation.get("_id") is not None
+        ]
+        analyzer = GermanAnalyzer()
+        for _, texts in documents:
+            for _, text in texts:
+                analyzer.learn(text)
+        embedder = PastProjectEmbedder(analyzer, settings.PAST_PROJECT_EMBEDDING_DIM)
+        embedder.fit([text for _, texts in documents for _, text in texts])
+        index = IVFIndex(settings.PAST_PROJECT_EMBEDDING_DIM)
+        for doc_id, texts in documents:
+            index.add(
+                doc_id,
+                embedder.embed_many([text for _, text in texts]),
+                np.array([position for position, _ in texts], dtype=np.int64),
+            )
+        # Train and pack in the worker thread, never on the first request
+        index.pack()
+        return analyzer, embedder, index
+
+    def _swap(self, built: Tuple[GermanAnalyzer, PastProjectEmbedder, IVFIndex]) -> None:
+        self.analyzer, self.embedder, self.index = built
+
+    def _patch(
+        self, foundations: List[Dict[str, Any]], removed_ids: Set[str]
+    ) -> Tuple[GermanAnalyzer, PastProjectEmbedder, IVFIndex]:
+        # Changed projects are embedded with the idf weights of the last full build
+        index = self.index.copy()
+        for doc_id in removed_ids:
+            index.remove(doc_id)
+        for foundation in foundations:
+            texts = past_project_texts(foundation)
+            for _, text in texts:
+                self.analyzer.learn(text)
+            index.add(
+                foundation["_id"],
+                self.embedder.embed_many([text for _, text in texts]),
+                np.array([position for position, _ in texts], dtype=np.int64),
+            )
+        index.pack()
+        return self.analyzer, self.embedder, index
+
+    def _describe(self) -> str:
+        return (
+            f"over {len(self.index)} projects of {len(self.index.groups)} foundations "
+            f"({self.index.centroids.shape[0]} lists)"
+        )
+
+    def search(
+        self, text: str, candidate_ids: Optional[Iterable[str]] = None, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Rank foundations by their most similar past project, optionally restricted to ``candidate_ids``."""
+        query = self.embedder.embed(text)
+        if not query.any():
+            return []
+        return self.index.search(query, candidate_ids, limit, settings.PAST_PROJECT_INDEX_PROBES)
+
+    def annotate(self, text: str, foundations: List[Dict[str, Any]]) -> None:
+        """
+        Store the exact past project similarity of each foundation document.
+
+        Sets "past_project_score" (max similarity) and "past_project_order"
+        (positions in past_projects, most similar first).
+        """
+        query = self.embedder.embed(text)
+        for foundation in foundations:
+            foundation_id = foundation.get("_id") or foundation.get("id")
+            score, order = self.index.group_similarities(query, foundation_id)
+            foundation["past_project_score"] = score
+            foundation["past_project_order"] = order
+
+
+# Global index instance
+_past_project_index = None
+
+
+def get_past_project_index() -> PastProjectIndex:
+    """Get or create the global past project index."""
+    global _past_project_index
+    if _past_project_index is None:
+        _past_project_index = PastProjectIndex()
+    return _past_project_index
@@ -0,0 +1,221 @@
+"""
+Heuristic pre-ranker for scoring candidates.
+
+Scores the text-ranked candidate pool with a handful of cheap numeric features
+so that only the most promising foundations are sent to the LLM. The same
+scores give a deterministic ranking that can be served when the LLM is
+unavailable (SCORING_HEURISTIC_FALLBACK).
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationEvaluation
+from app.services.derivation_service import get_derived_fields
+from app.services.region_service import RegionHierarchy, get_region_hierarchy
+
+logger = logging.getLogger(__name__)
+
+# Feature columns of HeuristicPreRanker.features, in order
+FEATURE_NAMES = ("purpose_overlap", "area", "funding", "text", "past_projects")
+
+# Weights of the feature columns; they sum to 1 so scores stay in [0, 1]
+FEATURE_WEIGHTS = np.array([0.3, 0.2, 0.1, 0.25, 0.15], dtype=np.float64)
+
+# Area compatibility by the level of the funding region that contains the project location
+_LEVEL_AREA_SCORES = {
+    "borough": 1.0,
+    "city": 1.0,
+    "district": 1.0,
+    "state": 0.9,
+    "country": 0.6,
+    "continent": 0.5,
+    "world": 0.5,
+}
+
+# Area compatibility if the project location lies above the funding region
+# (project "Bayern", foundation "München")
+_COARSER_LOCATION_AREA_SCORE = 0.4
+
+# Area compatibility when the project text does not mention any funding area
+_SCOPE_AREA_SCORES = {
+    "international": 0.6,
+    "national": 0.6,
+    "regional": 0.2,
+    "local": 0.2,
+}
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def text_words(text: str) -> set:
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+
+class HeuristicPreRanker:
+    """Vectorized feature scoring of candidate foundations for a project."""
+
+    def __init__(self, weights: np.ndarray = FEATURE_WEIGHTS):
+        self.weights = weights
+
+    def features(
+        self, project: ProjectDescription, candidates: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Build the (n_candidates, len(FEATURE_NAMES)) feature matrix, each column in [0, 1].
+
+        - purpose_overlap: share of the project's purposes the foundation supports
+        - area: by the level of the foundation region containing the project
+          location (see region_service); without a known location 1.0 if the
+          project text names one of the specific areas, otherwise a prior by
+          foerderbereich.scope
+        - funding: log of the foundation's max funding amount, scaled to the pool
+        - text: retrieval relevance ("score" field), scaled to the pool
+        - past_projects: similarity of the foundation's most similar past
+          project ("past_project_score" field), scaled to the pool
+        """
+        n = len(candidates)
+        matrix = np.zeros((n, len(FEATURE_NAMES)), dtype=np.float64)
+        if n == 0:
+            return matrix
+
+        project_purposes = {purpose.value for purpose in project.charitable_purpose}
+        project_words = text_words(
+            f"{project.name} {project.description} {project.target_group}"
+        )
+        hierarchy = get_region_hierarchy()
+        project_regions = hierarchy.project_regions(project)
+        max_amounts = np.zeros(n, dtype=np.float64)
+        text_scores = np.zeros(n, dtype=np.float64)
+        past_project_scores = np.zeros(n, dtype=np.float64)
+
+        for row, foundation in enumerate(candidates):
+            zwecke = set(foundation.get("gemeinnuetzige_zwecke") or [])
+            if project_purposes:
+                matrix[row, 0] = len(zwecke & project_purposes) / len(project_purposes)
+
+            foerderbereich = foundation.get("foerderbereich") or {}
+            matrix[row, 1] = self.area_score(
+                hierarchy, project_regions, project_words, foerderbereich
+            )
+
+            foerderhoehe = get_derived_fields(foundation)["foerderhoehe"]
+            max_amounts[row] = foerderhoehe.get("max_amount") or 0.0
+            text_scores[row] = foundation.get("score") or 0.0
+            past_project_scores[row] = foundation.get("past_project_score") or 0.0
+
+        log_amounts = np.log1p(np.maximum(max_amounts, 0.0))
+        if log_amounts.max() > 0:
+            matrix[:, 2] = log_amounts / log_amounts.max()
+        if text_scores.max() > 0:
+            matrix[:, 3] = np.maximum(text_scores, 0.0) / text_scores.max()
+        if past_project_scores.max() > 0:
+            matrix[:, 4] = np.maximum(past_project_scores, 0.0) / past_project_scores.max()
+        return matrix
+
+    def area_score(
+        self,
+        hierarchy: RegionHierarchy,
+        project_regions: List[str],
+        project_words: set,
+        foerderbereich: Dict[str, Any],
+    ) -> float:
+        """Geographic compatibility of a foundation with the project in [0, 1]."""
+        if project_regions:
+            foundation_regions = hierarchy.foundation_regions(foerderbereich)
+            if foundation_regions:
+                covering = self.covering_regions(hierarchy, project_regions, foundation_regions)
+                if covering:
+                    return max(_LEVEL_AREA_SCORES.get(hierarchy.level(node), 0.5) for node in covering)
+                return _COARSER_LOCATION_AREA_SCORE
+        if self.mentioned_areas(project_words, foerderbereich):
+            return 1.0
+        return _SCOPE_AREA_SCORES.get(str(foerderbereich.get("scope", "")).lower(), 0.0)
+
+    @staticmethod
+    def covering_regions(
+        hierarchy: RegionHierarchy, project_regions: List[str], foundation_regions: List[str]
+    ) -> List[str]:
+        """Foundation regions that contain one of the project's regions."""
+        return [
+            node
+            for node in foundation_regions
+            if any(hierarchy.contains(node, project_node) for project_node in project_regions)
+        ]
+
+    @staticmethod
+    def mentioned_areas(project_words: set, foerderbereich: Dict[str, Any]) -> List[str]:
+        """Return the foundation's specific areas that the project text names."""
+        return [
+            area
+            for area in foerderbereich.get("specific_areas") or []
+            if area and text_words(area) and text_words(area) <= project_words
+        ]
+
+    def rank(
+        self, project: ProjectDescription, candidates: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (foundation, heuristic score) pairs, best first; ties keep retrieval order."""
+        if not candidates:
+            return []
+        scores = self.features(project, candidates) @ self.weights
+        order = np.argsort(-scores, kind="stable")
+        return [(candidates[i], float(scores[i])) for i in order]
+
+    def evaluation(
+        self, project: ProjectDescription, foundation: Dict[str, Any], score: float
+    ) -> FoundationEvaluation:
+        """Build a FoundationEvaluation that explains a heuristic score (LLM fallback)."""
+        project_purposes = {purpose.value for purpose in project.charitable_purpose}
+        project_words = text_words(
+            f"{project.name} {project.description} {project.target_group}"
+        )
+        foerderbereich = foundation.get("foerderbereich") or {}
+        hierarchy = get_region_hierarchy()
+        project_regions = hierarchy.project_regions(project)
+        if project_regions:
+            matching_areas = [
+                hierarchy.name(node)
+                for node in self.covering_regions(
+                    hierarchy, project_regions, hierarchy.foundation_regions(foerderbereich)
+                )
+            ]
+        else:
+            matching_areas = self.mentioned_areas(project_words, foerderbereich)
+
+        fits = [
+            f"Gemeinnütziger Zweck passt: {purpose}"
+            for purpose in foundation.get("gemeinnuetzige_zwecke") or []
+            if purpose in project_purposes
+        ]
+        fits.extend(f"Förderregion passt: {area}" for area in matching_areas)
+
+        mismatches = []
+        if foerderbereich.get("restrictions") and not matching_areas:
+            mismatches.append(f"Einschränkung: {foerderbereich['restrictions']}")
+
+        return FoundationEvaluation(
+            foundation_id=foundation.get("_id") or foundation.get("id"),
+            match_score=round(min(max(score, 0.0), 1.0), 2),
+            fits=fits,
+            mismatches=mismatches,
+            questions=[
+                "Automatische Vorauswahl ohne KI-Bewertung - bitte Passung im Detail prüfen."
+            ],
+        )
+
+
+# Global pre-ranker instance
+_heuristic_preranker = None
+
+
+def get_heuristic_preranker() -> HeuristicPreRanker:
+    """Get or create the global heuristic pre-ranker."""
+    global _heuristic_preranker
+    if _heuristic_preranker is None:
+        _heuristic_preranker = HeuristicPreRanker()
+    return _heuristic_preranker
@@ -0,0 +1,291 @@
+"""
+Near-duplicate project lookup for reusing earlier rankings.
+
+Many sessions describe nearly the same project (e.g. several variants of
+"Hausaufgabenhilfe für Kinder"). Every ranking the full scoring pipeline
+produces is recorded in ``project_rankings`` together with its project
+description. The project texts (name, description, target group) are indexed
+with MinHash signatures over character shingles and banded LSH buckets; the
+bucket keys also contain the charitable purpose set and the location, so only
+projects with the same purposes and location can collide.
+
+When a new project's estimated Jaccard similarity to a recorded one reaches
+PROJECT_REUSE_THRESHOLD, ScoringService takes the earlier ranking's top
+foundations as candidates instead of running retrieval (see
+ScoringService._reuse_similar_ranking). Rankings produced that way are not
+recorded, so reuse never feeds on itself.
+
+The index is rebuilt from MongoDB every PROJECT_REUSE_INDEX_MAX_AGE_SECONDS
+in a worker thread; only the first build is awaited, later ones run in the
+background while the previous build keeps serving.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationScore
+from app.services.scoring_cache_service import project_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# MinHash permutations, split into LSH bands of _NUM_PERM // _BANDS rows. With
+# 16 bands of 8 rows, pairs above a similarity of about 0.7 share a bucket.
+_NUM_PERM = 128
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+
+_SHINGLE_LENGTH = 5
+_PRIME = (1 << 31) - 1
+_SEED = 1
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def project_text(project: ProjectDescription) -> str:
+    """Text a project is compared by."""
+    return f"{project.name} {project.description} {project.target_group}"
+
+
+def project_group(project: ProjectDescription) -> str:
+    """Key of the projects a project can be compared with: same purposes and location."""
+    location = " ".join((project.location or "").lower().split())
+    purposes = sorted(p.value for p in project.charitable_purpose)
+    return json.dumps([purposes, location], ensure_ascii=False)
+
+
+def shingles(text: str) -> Set[str]:
+    """Character shingles of the lowercased words of a text."""
+    normalized = " ".join(_WORD_PATTERN.findall(text.lower()))
+    if len(normalized) <= _SHINGLE_LENGTH:
+        return {normalized} if normalized else set()
+    return {
+        normalized[i : i + _SHINGLE_LENGTH]
+        for i in range(len(normalized) - _SHINGLE_LENGTH + 1)
+    }
+
+
+class MinHasher:
+    """MinHash signatures with universal hash functions (a * x + b) mod p."""
+
+    def __init__(self, num_perm: int = _NUM_PERM, seed: int = _SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, text: str) -> np.ndarray:
+        values = np.array(
+            [
+                int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                % _PRIME
+                for s in shingles(text)
+            ]
+            or [0],
+            dtype=np.int64,
+        )
+        # a, x < 2^31, so a * x + b fits into int64
+        return ((self.a[:, None] * values[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets."""
+        return float(np.mean(left == right))
+
+
+@dataclass
+class SimilarProject:
+    """A recorded project similar to the query and its ranking, best first."""
+    fingerprint: str
+    similarity: float
+    ranking: List[Tuple[str, float]]
+
+
+class ProjectSimilarityIndex:
+    """MinHash LSH index over recorded project rankings, loaded lazily from MongoDB."""
+
+    def __init__(self):
+        self.hasher = MinHasher()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._rankings: Dict[str, List[Tuple[str, float]]] = {}
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        self.built_at: Optional[float] = None
+        self._indexes_ready = False
+        self._lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+        # Rankings recorded while a rebuild runs, re-added to its result
+        self._recorded_during_build: Optional[
+            Dict[str, Tuple[ProjectDescription, List[Tuple[str, float]]]]
+        ] = None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _is_stale(self) -> bool:
+        if self.built_at is None:
+            return True
+        max_age = settings.PROJECT_REUSE_INDEX_MAX_AGE_SECONDS
+        return max_age > 0 and time.monotonic() - self.built_at > max_age
+
+    async def ensure_built(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Build the index on first use and refresh it in the background once it exceeds its max age.
+
+        As with the foundation indexes (see index_refresh_service), only the
+        first build is awaited; a stale index keeps serving until the rebuild
+        is swapped in.
+        """
+        if self.built_at is None:
+            async with self._lock:
+                if self.built_at is None:
+                    await self.rebuild(db)
+            return
+        if self._is_stale() and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.create_task(self._refresh_in_background(db))
+
+    async def _refresh_in_background(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            async with self._lock:
+                await self.rebuild(db)
+        except Exception:
+            logger.exception("Refreshing the project similarity index failed, serving the previous build")
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> None:
+        """Rebuild the whole index from the project_rankings collection and swap it in."""
+        started = time.perf_counter()
+        self._recorded_during_build = {}
+        try:
+            cursor = db.project_rankings.find({"expires_at": {"$gt": datetime.utcnow()}})
+            documents = await cursor.to_list(length=None)
+            # Hashing the shingles of every recorded project is CPU work, keep it off the event loop
+            built = await asyncio.to_thread(self._build, documents)
+            self._signatures, self._rankings, self._buckets = (
+                built._signatures,
+                built._rankings,
+                built._buckets,
+            )
+            for fingerprint, (project, ranking) in self._recorded_during_build.items():
+                self._add(fingerprint, project, ranking)
+        finally:
+            self._recorded_during_build = None
+        self.built_at = time.monotonic()
+        logger.info(
+            f"Built project similarity index over {len(self)} rankings "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def _build(self, documents: List[Dict[str, Any]]) -> "ProjectSimilarityIndex":
+        """Index the recorded rankings into a fresh index (runs in a worker thread)."""
+        built = ProjectSimilarityIndex()
+        built.hasher = self.hasher
+        for document in documents:
+            try:
+                project = ProjectDescription(**document["project"])
+            except (KeyError, TypeError, ValidationError):
+                continue
+            built._add(document["_id"], project, [tuple(item) for item in document["ranking"]])
+        return built
+
+    def _band_keys(self, group: str, signature: np.ndarray) -> List[Tuple[str, int, bytes]]:
+        return [
+            (group, band, signature[band * _ROWS : (band + 1) * _ROWS].tobytes())
+            for band in range(_BANDS)
+        ]
+
+    def _add(
+        self, fingerprint: str, project: ProjectDescription, ranking: List[Tuple[str, float]]
+    ) -> None:
+        self._remove(fingerprint)
+        signature = self.hasher.signature(project_text(project))
+        self._signatures[fingerprint] = signature
+        self._rankings[fingerprint] = ranking
+        for key in self._band_keys(project_group(project), signature):
+            self._buckets.setdefault(key, set()).add(fingerprint)
+
+    def _remove(self, fingerprint: str) -> None:
+        if self._signatures.pop(fingerprint, None) is None:
+            return
+        self._rankings.pop(fingerprint, None)
+        for key in [key for key, members in self._buckets.items() if fingerprint in members]:
+            self._buckets[key].discard(fingerprint)
+            if not self._buckets[key]:
+                del self._buckets[key]
+
+    async def record(
+        self, db: AsyncIOMotorDatabase, project: ProjectDescription, scores: List[FoundationScore]
+    ) -> None:
+        """Store the ranking the full pipeline produced for a project."""
+        if not scores:
+            return
+        fingerprint = project_fingerprint(project)
+        ranking = [(score.id, score.match_score) for score in scores]
+        try:
+            if not self._indexes_ready:
+                await db.project_rankings.create_index("expires_at", expireAfterSeconds=0)
+                self._indexes_ready = True
+            now = datetime.utcnow()
+            await db.project_rankings.replace_one(
+                {"_id": fingerprint},
+                {
+                    "_id": fingerprint,
+                    "project": project.model_dump(mode="json"),
+                    "ranking": [list(item) for item in ranking],
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=settings.SCORING_CACHE_TTL_SECONDS),
+                },
+                upsert=True,
+            )
+        except Exception:
+            # A failing record must never fail the scoring request
+            logger.exception("Failed to record the project ranking")
+            return
+        self._add(fingerprint, project, ranking)
+        if self._recorded_during_build is not None:
+            self._recorded_during_build[fingerprint] = (project, ranking)
+
+    def find(self, project: ProjectDescription) -> Optional[SimilarProject]:
+        """
+        Return the most similar recorded project with the same purposes and location.
+
+        Only projects reaching PROJECT_REUSE_THRESHOLD count; the project itself
+        (same fingerprint) is skipped, its exact repeats are served by the
+        scoring cache.
+        """
+        fingerprint = project_fingerprint(project)
+        signature = self.hasher.signature(project_text(project))
+        candidates: Set[str] = set()
+        for key in self._band_keys(project_group(project), signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(fingerprint)
+
+        best: Optional[SimilarProject] = None
+        for candidate in candidates:
+            similarity = self.hasher.similarity(signature, self._signatures[candidate])
+            if similarity >= settings.PROJECT_REUSE_THRESHOLD and (
+                best is None or similarity > best.similarity
+            ):
+                best = SimilarProject(candidate, similarity, self._rankings[candidate])
+        return best
+
+
+# Global index instance
+_project_similarity_index = None
+
+
+def get_project_similarity_index() -> ProjectSimilarityIndex:
+    """Get or create the global project similarity index."""
+    global _project_similarity_index
+    if _project_similarity_index is None:
+        _project_similarity_index = ProjectSimilarityIndex()
+    return _project_similarity_index
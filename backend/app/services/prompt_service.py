@@ -54,6 +54,7 @@ Continue filling ONLY the `message` field until you have gathered:
    - Expected outcomes and impact
 3. **Target Group** - Who benefits from the project? (age group, demographic, community)
 4. **Charitable Purpose(s)** - Which of the 27 German charitable purposes (§52 AO) the project aligns with
+5. **Location** (optional) - City, district or federal state where the project takes place
 
  Ask SHORT follow-up questions if critical information is missing, but don't interrogate.
  Maximum 1-2 focused questions per response.
@@ -0,0 +1,258 @@
+"""
+Region hierarchy for matching foundation funding areas to project locations.
+
+Loads the bundled dataset ``app/data/regions_de.json`` (International > Europa >
+Deutschland > Bundesland > Landkreis/kreisfreie Stadt > Stadt > Stadtbezirk)
+and resolves free-text area names (``foerderbereich.specific_areas``, the
+project's location or description) to region nodes.
+
+A foundation can fund a project if one of its regions contains the project's
+location. If the project's location is coarser than the foundation's region
+(project "Bayern", foundation "München") the match stays possible. Only
+foundations on a different branch of the hierarchy than the project's explicit
+``location`` are pruned (``location_regions``). Places detected in the project
+text ("Jugendfahrt nach Berlin") may be destinations rather than the project's
+home, so they only feed the soft pre-ranking signals (``project_regions``).
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from app.models.project_description import ProjectDescription
+from app.services.text_index_service import fold_umlauts
+
+logger = logging.getLogger(__name__)
+
+REGION_DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "regions_de.json"
+
+# Regions assumed for a foundation whose specific_areas cannot be resolved
+SCOPE_DEFAULT_REGIONS = {
+    "national": "de",
+    "international": "world",
+}
+
+# Administrative prefixes stripped to derive additional aliases
+_DISTRICT_PREFIXES = ("landkreis ", "kreis ", "lk ", "region ", "regionalverband ", "stadteregion ")
+
+# Words that mark a following place name as a location ("Projekt in Essen")
+_LOCATION_PREPOSITIONS = {"in", "im", "aus", "nach", "bei", "um", "von", "ganz"}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_region_name(text: str) -> str:
+    """Lowercase, fold umlauts and reduce punctuation to single spaces."""
+    return _NON_WORD.sub(" ", fold_umlauts(text.lower())).strip()
+
+
+class RegionHierarchy:
+    """Tree of region nodes with alias lookup and containment checks."""
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes: Dict[str, Dict[str, Any]] = {node["id"]: node for node in nodes}
+        self.parent: Dict[str, Optional[str]] = {
+            node["id"]: node.get("parent") for node in nodes
+        }
+        self.children: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        for node_id, parent in self.parent.items():
+            if parent is not None:
+                self.children[parent].append(node_id)
+
+        # Euler tour: a contains b  <=>  tin[a] <= tin[b] <= tout[a]
+        self.index: Dict[str, int] = {}
+        self.tin = np.zeros(len(self.nodes), dtype=np.int32)
+        self.tout = np.zeros(len(self.nodes), dtype=np.int32)
+        self._number_nodes()
+
+        self.aliases: Dict[str, List[str]] = {}
+        self._common_words: Set[str] = set()
+        self._build_aliases()
+        self._max_alias_tokens = max(
+            (len(alias.split()) for alias in self.aliases), default=1
+        )
+
+    @classmethod
+    def load(cls, path: Path = REGION_DATA_PATH) -> "RegionHierarchy":
+        """Load the hierarchy from a bundled JSON dataset."""
+        with open(path, encoding="utf-8") as data_file:
+            data = json.load(data_file)
+        hierarchy = cls(data["nodes"])
+        logger.info(
+            f"Loaded region hierarchy with {len(hierarchy.nodes)} nodes and {len(hierarchy.aliases)} aliases"
+        )
+        return hierarchy
+
+    def _number_nodes(self) -> None:
+        counter = 0
+        roots = [node_id for node_id, parent in self.parent.items() if parent is None]
+        stack = [(root, False) for root in reversed(roots)]
+        while stack:
+            node_id, finished = stack.pop()
+            if finished:
+                self.tout[self.index[node_id]] = counter - 1
+                continue
+            self.index[node_id] = len(self.index)
+            self.tin[self.index[node_id]] = counter
+            counter += 1
+            stack.append((node_id, True))
+            stack.extend((child, False) for child in reversed(self.children[node_id]))
+
+    def _build_aliases(self) -> None:
+        derived: Dict[str, List[str]] = {}
+        for node_id, node in self.nodes.items():
+            for name in [node["name"], *node.get("aliases", [])]:
+                self._add_alias(self.aliases, normalize_region_name(name), node_id)
+                if node.get("common_word") and len(normalize_region_name(name).split()) == 1:
+                    self._common_words.add(normalize_region_name(name))
+            # "Kempten (Allgäu)" -> "Kempten", "Landkreis Erding" -> "Erding"
+            short_name = re.split(r"\s*[(/]", node["name"])[0]
+            normalized = normalize_region_name(short_name)
+            self._add_alias(derived, normalized, node_id)
+            if node.get("common_word"):
+                self._common_words.add(normalized)
+            for prefix in _DISTRICT_PREFIXES:
+                if normalized.startswith(prefix):
+                    bare = normalized[len(prefix):]
+                    self._add_alias(derived, bare, node_id)
+                    for other_prefix in ("landkreis ", "kreis ", "lk "):
+                        self._add_alias(derived, other_prefix + bare, node_id)
+        # Explicit names and aliases take precedence over derived ones
+        for alias, node_ids in derived.items():
+            if alias not in self.aliases:
+                self.aliases[alias] = node_ids
+        # A name shared by a region and its own sub-region (city-states) means the sub-region
+        for alias, node_ids in self.aliases.items():
+            self.aliases[alias] = [
+                node_id
+                for node_id in node_ids
+                if not any(other != node_id and self.contains(node_id, other) for other in node_ids)
+            ]
+
+    @staticmethod
+    def _add_alias(aliases: Dict[str, List[str]], alias: str, node_id: str) -> None:
+        if alias and node_id not in aliases.setdefault(alias, []):
+            aliases[alias].append(node_id)
+
+    def contains(self, outer: str, inner: str) -> bool:
+        """True if region ``outer`` is ``inner`` or one of its ancestors."""
+        a, b = self.index[outer], self.index[inner]
+        return bool(self.tin[a] <= self.tin[b] <= self.tout[a])
+
+    def level(self, node_id: str) -> str:
+        return self.nodes[node_id]["level"]
+
+    def name(self, node_id: str) -> str:
+        return self.nodes[node_id]["name"]
+
+    def most_specific(self, node_ids: Iterable[str]) -> List[str]:
+        """Drop regions that contain another region of the list."""
+        unique = list(dict.fromkeys(node_ids))
+        return [
+            node_id
+            for node_id in unique
+            if not any(other != node_id and self.contains(node_id, other) for other in unique)
+        ]
+
+    def detect(self, text: str) -> List[str]:
+        """
+        Find region names in free text (gazetteer lookup, longest match first).
+
+        Names that are also common German words ("Essen", "Heide") only count
+        after a location preposition ("in Essen").
+        """
+        tokens = normalize_region_name(text or "").split()
+        found: List[str] = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_alias_tokens, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i : i + n])
+                node_ids = self.aliases.get(phrase)
+                if not node_ids:
+                    continue
+                if phrase in self._common_words and (i == 0 or tokens[i - 1] not in _LOCATION_PREPOSITIONS):
+                    continue
+                found.extend(node_ids)
+                i += n
+                break
+            else:
+                i += 1
+        return found
+
+    def resolve(self, name: str) -> List[str]:
+        """Resolve an area name to region nodes (exact alias first, then gazetteer)."""
+        node_ids = self.aliases.get(normalize_region_name(name or ""))
+        if node_ids:
+            return list(node_ids)
+        return self.most_specific(self.detect(name))
+
+    def foundation_regions(self, foerderbereich: Any) -> List[str]:
+        """
+        Regions a foundation funds, from its specific_areas and scope.
+
+        Returns an empty list if the areas are unknown; such foundations are
+        never pruned.
+        """
+        if not isinstance(foerderbereich, dict):
+            return []
+        node_ids: List[str] = []
+        for area in foerderbereich.get("specific_areas") or []:
+            if isinstance(area, str):
+                node_ids.extend(self.resolve(area))
+        if not node_ids:
+            default = SCOPE_DEFAULT_REGIONS.get(str(foerderbereich.get("scope", "")).lower())
+            if default in self.nodes:
+                node_ids.append(default)
+        return list(dict.fromkeys(node_ids))
+
+    def location_regions(self, project: ProjectDescription) -> List[str]:
+        """
+        Most specific regions of a project's explicit ``location``.
+
+        The only regions foundations are pruned by. Returns an empty list if
+        the location is not set or cannot be resolved.
+        """
+        if not project.location:
+            return []
+        return self.most_specific(self.resolve(project.location))
+
+    def project_regions(self, project: ProjectDescription) -> List[str]:
+        """
+        Most specific regions of a project's location, for soft ranking signals.
+
+        Uses the explicit ``location`` if set, otherwise gazetteer matches in
+        the project text. Returns an empty list if no location is known.
+        """
+        node_ids = self.location_regions(project)
+        if node_ids:
+            return node_ids
+        text = f"{project.name} {project.description} {project.target_group}"
+        return self.most_specific(self.detect(text))
+
+    def can_fund(self, foundation_regions: Iterable[str], project_regions: Iterable[str]) -> bool:
+        """True unless both sides are known and lie on disjoint branches."""
+        foundation_regions = list(foundation_regions)
+        project_regions = list(project_regions)
+        if not foundation_regions or not project_regions:
+            return True
+        return any(
+            self.contains(f, p) or self.contains(p, f)
+            for f in foundation_regions
+            for p in project_regions
+        )
+
+
+# Global hierarchy instance
+_region_hierarchy = None
+
+
+def get_region_hierarchy() -> RegionHierarchy:
+    """Get or load the global region hierarchy."""
+    global _region_hierarchy
+    if _region_hierarchy is None:
+        _region_hierarchy = RegionHierarchy.load()
+    return _region_hierarchy
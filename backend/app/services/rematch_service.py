@@ -0,0 +1,530 @@
+"""
+Batch re-matching of the projects stored in sessions.
+
+Re-scores the ``project_description`` of many sessions at once (e.g. after a
+catalog import) and writes the results to their ``foundation_results``.
+Compared to one score_foundations() call per session the work is amortized:
+- sessions with the same project (same fingerprint) are scored once
+- projects with the same set of charitable purposes share the catalog filter
+  and a single load of their candidate foundations
+- the evaluations of several projects are packed into one LLM call, in which
+  a foundation that is a candidate of several projects is described once
+- results are written back with one bulk_write per chunk of sessions
+
+Run with: python -m app.rematch
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import BatchScoringResponse, FoundationEvaluation, FoundationScore
+from app.services.catalog_version_service import get_catalog_version
+from app.services.context_packing_service import get_context_packer
+from app.services.distilled_ranker_service import get_distilled_ranker
+from app.services.foundation_brief_service import get_foundation_briefs
+from app.services.foundation_catalog_service import get_foundation_catalog
+from app.services.past_project_index_service import get_past_project_index
+from app.services.region_service import get_region_hierarchy
+from app.services.scoring_cache_service import (
+    foundation_content_hash,
+    get_evaluation_memo,
+    get_scoring_cache,
+    project_fingerprint,
+    scoring_cache_key,
+)
+from app.services.scoring_service import ScoringService, get_scoring_service
+from app.services.text_index_service import get_foundation_text_index
+from app.services.vector_index_service import get_foundation_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+def _foundation_id(foundation: Dict[str, Any]) -> str:
+    return foundation.get("_id") or foundation.get("id")
+
+
+@dataclass
+class RematchProject:
+    """A distinct project of a chunk of sessions and its scoring state."""
+
+    fingerprint: str
+    project: ProjectDescription
+    session_ids: List[str] = field(default_factory=list)
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    evaluations: Dict[str, FoundationEvaluation] = field(default_factory=dict)
+    memo_keys: Dict[str, str] = field(default_factory=dict)
+    new_evaluations: List[FoundationEvaluation] = field(default_factory=list)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Candidates without an evaluation yet."""
+        return [f for f in self.candidates if _foundation_id(f) not in self.evaluations]
+
+
+@dataclass
+class RematchReport:
+    """Counters of a batch re-matching run."""
+
+    sessions: int = 0
+    projects: int = 0
+    updated_sessions: int = 0
+    invalid_sessions: int = 0
+    failed_projects: int = 0
+    memoized_evaluations: int = 0
+    llm_calls: int = 0
+    single_project_retries: int = 0
+
+
+class BatchRematchService:
+    """Re-scores the projects of many sessions with shared retrieval and packed LLM calls."""
+
+    def __init__(self, scoring_service: Optional[ScoringService] = None):
+        self.scoring = scoring_service or get_scoring_service()
+        self.structured_llm = self.scoring.llm.with_structured_output(BatchScoringResponse)
+
+    async def rematch(
+        self,
+        db: AsyncIOMotorDatabase,
+        session_ids: Optional[Iterable[str]] = None,
+        limit: int = 5,
+        dry_run: bool = False,
+    ) -> RematchReport:
+        """
+        Re-score sessions and store the top ``limit`` foundations in their foundation_results.
+
+        Args:
+            db: Database instance
+            session_ids: Sessions to re-match (default: all sessions with a project description)
+            limit: Number of foundations stored per session
+            dry_run: Score but write nothing (sessions, evaluation memo, labels, scoring cache)
+
+        Returns:
+            RematchReport with counters of the run
+        """
+        report = RematchReport()
+        catalog_version = await get_catalog_version(db)
+        query: Dict[str, Any] = {"project_description": {"$exists": True, "$ne": None}}
+        if session_ids is not None:
+            query["session_id"] = {"$in": list(session_ids)}
+
+        chunk_size = max(1, settings.REMATCH_SESSION_CHUNK_SIZE)
+        chunk: List[Dict[str, Any]] = []
+        cursor = db.sessions.find(query, {"session_id": 1, "project_description": 1})
+        async for session in cursor:
+            chunk.append(session)
+            if len(chunk) >= chunk_size:
+                await self._rematch_chunk(db, chunk, limit, catalog_version, dry_run, report)
+                chunk = []
+        if chunk:
+            await self._rematch_chunk(db, chunk, limit, catalog_version, dry_run, report)
+
+        logger.info(
+            f"Re-matched {report.updated_sessions}/{report.sessions} sessions "
+            f"({report.projects} distinct projects, {report.llm_calls} batched LLM calls)"
+        )
+        return report
+
+    async def _rematch_chunk(
+        self,
+        db: AsyncIOMotorDatabase,
+        sessions: List[Dict[str, Any]],
+        limit: int,
+        catalog_version: int,
+        dry_run: bool,
+        report: RematchReport,
+    ) -> None:
+        report.sessions += len(sessions)
+        projects = self._distinct_projects(sessions, report)
+        report.projects += len(projects)
+
+        groups: Dict[Tuple[str, ...], List[RematchProject]] = {}
+        for item in projects:
+            purposes = tuple(sorted(p.value for p in item.project.charitable_purpose))
+            groups.setdefault(purposes, []).append(item)
+        logger.info(
+            f"Re-matching {len(sessions)} sessions: {len(projects)} distinct projects "
+            f"in {len(groups)} purpose groups"
+        )
+
+        for purposes, group in groups.items():
+            await self._retrieve_group(db, list(purposes), group, limit, catalog_version)
+        await self._load_memoized(db, projects, report)
+
+        calls = [call for group in groups.values() for call in self._pack_calls(group)]
+        await asyncio.gather(*(self._evaluate_call(call, report) for call in calls))
+
+        now = datetime.utcnow().isoformat()
+        operations = []
+        for item in projects:
+            scores = self._rank(item, limit)
+            if scores is not None:
+                if not dry_run:
+                    await self._store_project_results(db, item, scores, limit, catalog_version)
+            elif settings.SCORING_HEURISTIC_FALLBACK:
+                # Not cached, like on the request path
+                logger.warning(f"Serving the heuristic pre-ranking for project {item.project.name!r}")
+                scores = self.scoring._heuristic_scores(item.project, item.candidates, limit)
+            else:
+                report.failed_projects += 1
+                logger.error(
+                    f"No evaluations for project {item.project.name!r}, "
+                    f"keeping the results of {len(item.session_ids)} sessions"
+                )
+                continue
+            foundation_results = [score.model_dump() for score in scores]
+            operations.extend(
+                UpdateOne(
+                    {"session_id": session_id},
+                    {"$set": {"foundation_results": foundation_results, "updated_at": now}},
+                )
+                for session_id in item.session_ids
+            )
+
+        if operations and not dry_run:
+            await db.sessions.bulk_write(operations, ordered=False)
+        report.updated_sessions += len(operations)
+
+    @staticmethod
+    def _distinct_projects(
+        sessions: List[Dict[str, Any]], report: RematchReport
+    ) -> List[RematchProject]:
+        """Parse the sessions' projects and merge sessions with the same project."""
+        projects: Dict[str, RematchProject] = {}
+        for session in sessions:
+            try:
+                project = ProjectDescription(**session["project_description"])
+            except (TypeError, ValidationError):
+                report.invalid_sessions += 1
+                logger.warning(f"Skipping session {session.get('session_id')} with an invalid project description")
+                continue
+            fingerprint = project_fingerprint(project)
+            item = projects.setdefault(fingerprint, RematchProject(fingerprint, project))
+            item.session_ids.append(session["session_id"])
+        return list(projects.values())
+
+    async def _retrieve_group(
+        self,
+        db: AsyncIOMotorDatabase,
+        purposes: List[str],
+        group: List[RematchProject],
+        limit: int,
+        catalog_version: int,
+    ) -> None:
+        """
+        Retrieve the candidates of projects with the same purposes.
+
+        The purpose filter runs once per group (and once per distinct project
+        location) and the candidate documents of all projects are loaded in a
+        single query. With SCORING_RETRIEVAL_MODE=mongo_text every project runs
+        its own $text aggregation.
+        """
+        if settings.SCORING_DISTILLED_RANKER != "off":
+            await get_distilled_ranker().ensure_loaded(db)
+        if settings.SCORING_RETRIEVAL_MODE == "mongo_text":
+            for item in group:
+                item.candidates = await self.scoring._retrieve_candidates(
+                    item.project, limit, db, catalog_version
+                )
+            return
+
+        catalog = get_foundation_catalog()
+        await catalog.ensure_built(db, catalog_version)
+        if settings.SCORING_RETRIEVAL_MODE == "tfidf":
+            text_index = get_foundation_vector_index()
+        else:
+            text_index = get_foundation_text_index()
+        await text_index.ensure_built(db, catalog_version)
+        if settings.SCORING_PAST_PROJECT_MATCHING:
+            await get_past_project_index().ensure_built(db, catalog_version)
+
+        hierarchy = get_region_hierarchy()
+        pool_size = self.scoring._pool_size(limit)
+        ids_by_regions: Dict[Tuple[str, ...], List[str]] = {}
+        hits_by_project: Dict[str, List[Tuple[str, float]]] = {}
+        for item in group:
+            regions = (
+                tuple(hierarchy.location_regions(item.project))
+                if settings.SCORING_REGION_PRUNING
+                else ()
+            )
+            if regions not in ids_by_regions:
+                ids_by_regions[regions] = catalog.filter_ids(
+                    purposes=purposes, regions=list(regions), open_on=self.scoring._open_on()
+                )
+            foundation_ids = ids_by_regions[regions]
+            if not foundation_ids:
+                hits_by_project[item.fingerprint] = []
+                continue
+            search_text = self.scoring._search_text(item.project)
+            hits = text_index.search(search_text, foundation_ids, pool_size)
+            if settings.SCORING_PAST_PROJECT_MATCHING:
+                hits = self.scoring._add_past_project_hits(search_text, foundation_ids, hits)
+            hits_by_project[item.fingerprint] = hits
+
+        documents = await self.scoring._load_scoring_documents(
+            db, {f_id for hits in hits_by_project.values() for f_id, _ in hits}
+        )
+        for item in group:
+            pool = [
+                {**documents[f_id], "score": score}
+                for f_id, score in hits_by_project[item.fingerprint]
+                if f_id in documents
+            ]
+            if settings.SCORING_PAST_PROJECT_MATCHING:
+                get_past_project_index().annotate(self.scoring._search_text(item.project), pool)
+            item.candidates = (
+                self.scoring._select_candidates(item.project, pool, limit) if pool else []
+            )
+        if settings.SCORING_PROMPT_BRIEFS:
+            await get_foundation_briefs().attach(
+                db, [foundation for item in group for foundation in item.candidates]
+            )
+
+    async def _load_memoized(
+        self, db: AsyncIOMotorDatabase, projects: List[RematchProject], report: RematchReport
+    ) -> None:
+        """Fill in evaluations memoized for the current content of the candidates."""
+        if not settings.SCORING_EVALUATION_MEMO_ENABLED:
+            return
+        memo = get_evaluation_memo()
+        for item in projects:
+            item.memo_keys = {
+                _foundation_id(f): memo.key(item.fingerprint, _foundation_id(f), foundation_content_hash(f))
+                for f in item.candidates
+            }
+        try:
+            found = await memo.get_many(
+                db, [key for item in projects for key in item.memo_keys.values()]
+            )
+        except Exception:
+            logger.exception("Failed to read memoized evaluations, evaluating all candidates")
+            return
+        for item in projects:
+            for foundation_id, key in item.memo_keys.items():
+                if key in found:
+                    item.evaluations[foundation_id] = found[key]
+                    report.memoized_evaluations += 1
+
+    @staticmethod
+    def _pack_calls(group: List[RematchProject]) -> List[List[RematchProject]]:
+        """
+        Pack projects with pending candidates into LLM calls.
+
+        A call takes up to REMATCH_PROJECTS_PER_CALL projects while their
+        candidates together stay within REMATCH_FOUNDATIONS_PER_CALL distinct
+        foundations. Projects are sorted by their candidate ids first so that
+        projects with overlapping candidates end up in the same call.
+        """
+        pending = sorted(
+            (item for item in group if item.pending()),
+            key=lambda item: sorted(_foundation_id(f) for f in item.pending()),
+        )
+        calls: List[List[RematchProject]] = []
+        current: List[RematchProject] = []
+        current_ids: set = set()
+        for item in pending:
+            item_ids = {_foundation_id(f) for f in item.pending()}
+            if current and (
+                len(current) >= settings.REMATCH_PROJECTS_PER_CALL
+                or len(current_ids | item_ids) > settings.REMATCH_FOUNDATIONS_PER_CALL
+            ):
+                calls.append(current)
+                current, current_ids = [], set()
+            current.append(item)
+            current_ids |= item_ids
+        if current:
+            calls.append(current)
+        return calls
+
+    async def _evaluate_call(self, call: List[RematchProject], report: RematchReport) -> None:
+        """Evaluate a packed call; projects with missing evaluations are retried on their own."""
+        pending = {f"P{i}": item for i, item in enumerate(call, 1)}
+        try:
+            async with self.scoring._llm_semaphore:
+                response = await self._invoke_batch_llm(pending)
+            report.llm_calls += 1
+            for project_evaluations in response.projects:
+                item = pending.get(project_evaluations.project_id)
+                if item is None:
+                    continue
+                pending_ids = {_foundation_id(f) for f in item.pending()}
+                for evaluation in project_evaluations.evaluations:
+                    if evaluation.foundation_id in pending_ids:
+                        item.evaluations[evaluation.foundation_id] = evaluation
+                        item.new_evaluations.append(evaluation)
+        except Exception:
+            logger.exception(f"Batched LLM evaluation of {len(call)} projects failed")
+
+        for item in call:
+            missing = item.pending()
+            if not missing:
+                continue
+            report.single_project_retries += 1
+            for evaluation in await self.scoring._evaluate_shard(item.project, missing):
+                item.evaluations[evaluation.foundation_id] = evaluation
+                item.new_evaluations.append(evaluation)
+
+    async def _invoke_batch_llm(self, projects: Dict[str, RematchProject]) -> BatchScoringResponse:
+        """Run one structured-output scoring call for several projects."""
+        foundations: Dict[str, Dict[str, Any]] = {}
+        for item in projects.values():
+            for foundation in item.pending():
+                foundations.setdefault(_foundation_id(foundation), foundation)
+
+        logger.info(
+            f"Invoking LLM for evaluation of {len(projects)} projects "
+            f"and {len(foundations)} foundations..."
+        )
+        chain = self._create_batch_prompt() | self.structured_llm
+        return await chain.ainvoke(
+            {
+                "projects": self._format_projects_for_prompt(projects),
+                "foundations": self.scoring._format_foundations_for_prompt(
+                    list(foundations.values())
+                ),
+            }
+        )
+
+    @staticmethod
+    def _format_projects_for_prompt(projects: Dict[str, RematchProject]) -> str:
+        """Format the projects of a call with the ids of the foundations to evaluate."""
+        packer = get_context_packer()
+        formatted = []
+        for project_id, item in projects.items():
+            project = item.project
+            description = packer.truncate(project.description, settings.SCORING_PROMPT_PROJECT_TOKENS)
+            formatted.append(
+                f"\nPROJEKT {project_id}:\n"
+                f"Name: {project.name}\n"
+                f"Beschreibung: {description}\n"
+                f"Zielgruppe: {project.target_group}\n"
+                f"Gemeinnützige Zwecke: {', '.join(p.value for p in project.charitable_purpose)}\n"
+                f"Zu bewerten: {', '.join(_foundation_id(f) for f in item.pending())}\n"
+            )
+        return "\n".join(formatted)
+
+    @staticmethod
+    def _create_batch_prompt() -> ChatPromptTemplate:
+        """Create the prompt template for scoring several projects in one call."""
+
+        system_message = """Du bist ein erfahrener Experte für die Bewertung von Stiftungsanträgen in Deutschland.
+Deine Aufgabe ist es, mehrere Projekte mit passenden Stiftungen zu matchen und eine detaillierte Bewertung zu erstellen.
+
+RICHTLINIEN:
+1. Analysiere die Kompatibilität zwischen jedem Projekt und seinen Stiftungen sorgfältig
+2. Berücksichtige: gemeinnützige Zwecke, Förderbereich, Förderhöhe, Antragsprozess, vergangene Projekte
+3. Vergib Match-Scores zwischen 0.0 (kein Match) und 1.0 (perfekter Match)
+4. Identifiziere konkrete Fits (positive Aspekte), Mismatches (Probleme) und Fragen (Unklarheiten)
+5. Bewerte jedes Projekt unabhängig von den anderen Projekten
+6. Antworte auf Deutsch"""
+
+        human_message = """Bewerte die folgenden Stiftungen für die folgenden Projekte:
+
+PROJEKTE:
+{projects}
+
+KANDIDATEN-STIFTUNGEN:
+{foundations}
+
+AUFGABE:
+Gib für JEDES Projekt die project_id (z.B. P1) an und bewerte jede Stiftung, die unter "Zu bewerten" für dieses Projekt aufgeführt ist:
+1. foundation_id: Die ID der Stiftung
+2. match_score: Ein Score zwischen 0.0 und 1.0 (1.0 = perfekter Match)
+3. fits: Liste von positiven Aspekten (warum passt diese Stiftung zum Projekt?)
+4. mismatches: Liste von potenziellen Problemen (warum könnte es nicht passen?)
+5. questions: Liste von Fragen oder Unklarheiten (was sollte geklärt werden?)
+
+WICHTIG:
+- Bewerte ALLE Projekte und für jedes Projekt ALLE aufgeführten Stiftungen
+- Sei konkret und spezifisch in deinen Bewertungen
+- Der match_score sollte die Gesamtkompatibilität widerspiegeln
+- Fits, Mismatches und Questions sollten hilfreiche, konkrete Informationen enthalten"""
+
+        return ChatPromptTemplate.from_messages(
+            [("system", system_message), ("human", human_message)]
+        )
+
+    def _rank(self, item: RematchProject, limit: int) -> Optional[List[FoundationScore]]:
+        """Top ``limit`` scores of a project, or None if it could not be evaluated."""
+        if not item.candidates:
+            return []
+        model_scores: Dict[str, float] = {}
+        distilled_ranker = get_distilled_ranker()
+        if settings.SCORING_DISTILLED_RANKER == "score" and distilled_ranker.ready:
+            model_scores = dict(
+                zip(
+                    (_foundation_id(f) for f in item.candidates),
+                    distilled_ranker.predict(item.project, item.candidates).tolist(),
+                )
+            )
+        scored = [
+            self.scoring._convert_to_foundation_score(
+                f,
+                self.scoring._with_model_score(item.evaluations[_foundation_id(f)], model_scores),
+            )
+            for f in item.candidates
+            if _foundation_id(f) in item.evaluations
+        ]
+        if not scored:
+            return None
+        scored.sort(key=lambda x: x.match_score, reverse=True)
+        return scored[:limit]
+
+    async def _store_project_results(
+        self,
+        db: AsyncIOMotorDatabase,
+        item: RematchProject,
+        scores: List[FoundationScore],
+        limit: int,
+        catalog_version: int,
+    ) -> None:
+        """Share the new evaluations and results with the request path (memo, labels and cache)."""
+        if settings.SCORING_LABEL_LOGGING and item.new_evaluations:
+            foundations = {_foundation_id(f): f for f in item.candidates}
+            await get_distilled_ranker().log_labels(
+                db,
+                item.project,
+                item.fingerprint,
+                [
+                    (foundations[evaluation.foundation_id], evaluation)
+                    for evaluation in item.new_evaluations
+                    if evaluation.foundation_id in foundations
+                ],
+            )
+        if item.memo_keys and item.new_evaluations:
+            await get_evaluation_memo().put_many(
+                db,
+                item.fingerprint,
+                [
+                    (item.memo_keys[evaluation.foundation_id], evaluation.foundation_id, evaluation)
+                    for evaluation in item.new_evaluations
+                ],
+            )
+        if settings.SCORING_CACHE_ENABLED:
+            await get_scoring_cache().put(
+                db,
+                scoring_cache_key(item.fingerprint, limit, catalog_version),
+                scores,
+                catalog_version,
+            )
+
+
+# Global service instance
+_batch_rematch_service = None
+
+
+def get_batch_rematch_service() -> BatchRematchService:
+    """Get or create the global batch re-matching service."""
+    global _batch_rematch_service
+    if _batch_rematch_service is None:
+        _batch_rematch_service = BatchRematchService()
+    return _batch_rematch_service
@@ -0,0 +1,243 @@
+"""
+Caches for foundation scoring.
+
+- ScoringCache: exact-match cache of whole result lists. A scoring result only
+  depends on the project description, the requested limit and the foundation
+  catalog, so results are stored in MongoDB (with a TTL index) under a hash of
+  those three inputs and fronted by a small in-process LRU.
+- EvaluationMemo: individual LLM evaluations per (project, foundation), keyed
+  by the foundation's content hash, so overlapping candidate sets only send the
+  foundations without a memoized evaluation to the LLM.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.models.project_description import ProjectDescription
+from app.models.scores import FoundationEvaluation, FoundationScore
+
+logger = logging.getLogger(__name__)
+
+
+def project_fingerprint(project: ProjectDescription) -> str:
+    """
+    Canonical hash of a project description.
+
+    Whitespace differences and the order of charitable purposes do not change
+    the fingerprint.
+    """
+    canonical = {
+        "name": " ".join(project.name.split()),
+        "description": " ".join(project.description.split()),
+        "target_group": " ".join(project.target_group.split()),
+        "charitable_purpose": sorted(p.value for p in project.charitable_purpose),
+    }
+    if project.location:
+        canonical["location"] = " ".join(project.location.split())
+    payload = json.dumps(canonical, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Fields the scoring pipeline sets on candidate documents for a single request
+PER_REQUEST_FIELDS = frozenset(
+    {
+        "score",
+        "past_project_score",
+        "past_project_order",
+        "prior_score",
+        "brief",
+        "reused_ranking",
+        "reused_from",
+    }
+)
+
+
+def foundation_content_hash(foundation: Dict[str, Any]) -> str:
+    """Hash of a foundation document's content (ignores PER_REQUEST_FIELDS like "score")."""
+    content = {key: value for key, value in foundation.items() if key not in PER_REQUEST_FIELDS}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def scoring_cache_key(fingerprint: str, limit: int, catalog_version: int) -> str:
+    """Build the cache key for a project fingerprint, limit and catalog version."""
+    return hashlib.sha256(f"{fingerprint}:{limit}:{catalog_version}".encode("utf-8")).hexdigest()
+
+
+class ScoringCache:
+    """Two-level (in-process LRU + MongoDB TTL collection) cache of scoring results."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lru: "OrderedDict[str, Tuple[float, List[FoundationScore]]]" = OrderedDict()
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self, db: AsyncIOMotorDatabase) -> None:
+        if self._indexes_ready:
+            return
+        await db.scoring_cache.create_index("expires_at", expireAfterSeconds=0)
+        await db.scoring_cache.create_index("catalog_version")
+        self._indexes_ready = True
+
+    def _remember(self, key: str, scores: List[FoundationScore], expires_at: float) -> None:
+        self._lru[key] = (expires_at, scores)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, db: AsyncIOMotorDatabase, key: str) -> Optional[List[FoundationScore]]:
+        """Return the cached scores for ``key`` or None on a miss."""
+        entry = self._lru.get(key)
+        if entry is not None:
+            expires_at, scores = entry
+            if expires_at > time.time():
+                self._lru.move_to_end(key)
+                return scores
+            del self._lru[key]
+
+        document = await db.scoring_cache.find_one({"_id": key})
+        if not document:
+            return None
+        expires_at = document["expires_at"]
+        if expires_at <= datetime.utcnow():
+            # TTL monitor has not removed it yet
+            return None
+
+        scores = [FoundationScore(**score) for score in document.get("foundations", [])]
+        self._remember(key, scores, time.time() + (expires_at - datetime.utcnow()).total_seconds())
+        return scores
+
+    async def put(
+        self,
+        db: AsyncIOMotorDatabase,
+        key: str,
+        scores: List[FoundationScore],
+        catalog_version: int,
+    ) -> None:
+        """Store ``scores`` under ``key`` in both cache levels."""
+        self._remember(key, scores, time.time() + self.ttl_seconds)
+        try:
+            await self._ensure_indexes(db)
+            now = datetime.utcnow()
+            await db.scoring_cache.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "catalog_version": catalog_version,
+                    "foundations": [score.model_dump() for score in scores],
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True,
+            )
+        except Exception:
+            # A failing cache write must never fail the scoring request
+            logger.exception("Failed to persist scoring result to cache")
+
+    async def invalidate(self, db: AsyncIOMotorDatabase, catalog_version: int) -> None:
+        """Drop all entries computed against a catalog version older than ``catalog_version``."""
+        self._lru.clear()
+        await db.scoring_cache.delete_many({"catalog_version": {"$lt": catalog_version}})
+
+
+class EvaluationMemo:
+    """MongoDB store of single LLM evaluations per (project, foundation content)."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._indexes_ready = False
+
+    @staticmethod
+    def key(fingerprint: str, foundation_id: str, content_hash: str) -> str:
+        """Build the memo key for a project fingerprint and a foundation version."""
+        return hashlib.sha256(
+            f"{fingerprint}:{foundation_id}:{content_hash}".encode("utf-8")
+        ).hexdigest()
+
+    async def _ensure_indexes(self, db: AsyncIOMotorDatabase) -> None:
+        if self._indexes_ready:
+            return
+        await db.foundation_evaluations.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def get_many(
+        self, db: AsyncIOMotorDatabase, keys: Iterable[str]
+    ) -> Dict[str, FoundationEvaluation]:
+        """Return the memoized evaluations for ``keys`` (missing keys are omitted)."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        cursor = db.foundation_evaluations.find(
+            {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.utcnow()}},
+            {"evaluation": 1},
+        )
+        return {
+            document["_id"]: FoundationEvaluation(**document["evaluation"])
+            for document in await cursor.to_list(length=None)
+        }
+
+    async def put_many(
+        self,
+        db: AsyncIOMotorDatabase,
+        fingerprint: str,
+        entries: Iterable[Tuple[str, str, FoundationEvaluation]],
+    ) -> None:
+        """Store (key, foundation_id, evaluation) entries for a project fingerprint."""
+        try:
+            await self._ensure_indexes(db)
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=self.ttl_seconds)
+            operations = [
+                ReplaceOne(
+                    {"_id": key},
+                    {
+                        "_id": key,
+                        "project_fingerprint": fingerprint,
+                        "foundation_id": foundation_id,
+                        "evaluation": evaluation.model_dump(),
+                        "created_at": now,
+                        "expires_at": expires_at,
+                    },
+                    upsert=True,
+                )
+                for key, foundation_id, evaluation in entries
+            ]
+            if operations:
+                await db.foundation_evaluations.bulk_write(operations, ordered=False)
+        except Exception:
+            # A failing memo write must never fail the scoring request
+            logger.exception("Failed to persist foundation evaluations")
+
+
+# Global cache instances
+_scoring_cache = None
+_evaluation_memo = None
+
+
+def get_scoring_cache() -> ScoringCache:
+    """Get or create the global scoring cache."""
+    global _scoring_cache
+    if _scoring_cache is None:
+        _scoring_cache = ScoringCache(
+            max_entries=settings.SCORING_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SCORING_CACHE_TTL_SECONDS,
+        )
+    return _scoring_cache
+
+
+def get_evaluation_memo() -> EvaluationMemo:
+    """Get or create the global evaluation memo store."""
+    global _evaluation_memo
+    if _evaluation_memo is None:
+        _evaluation_memo = EvaluationMemo(ttl_seconds=settings.SCORING_CACHE_TTL_SECONDS)
+    return _evaluation_memo
@@ -2,8 +2,11 @@
 Service for scoring and matching foundations to user projects using AI.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from datetime import date, datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
@@ -13,21 +16,61 @@ from app.models.scores import (
     MatchItem,
     FoundationScore,
     FoundationEvaluation,
+    RankingResponse,
+    ScoringExplain,
     ScoringResponse,
 )
 from app.models.project_description import ProjectDescription
 from app.core.config import settings
 from app.core.database import get_database
+from app.services.catalog_version_service import get_catalog_version
+from app.services.context_packing_service import ContextSegment, get_context_packer
+from app.services.derivation_service import get_derived_fields, is_deadline_expired
+from app.services.distilled_ranker_service import get_distilled_ranker
+from app.services.foundation_brief_service import get_foundation_briefs
+from app.services.foundation_catalog_service import get_foundation_catalog
+from app.services.mongo_text_index_service import MONGO_TEXT_INDEX_LANGUAGE, get_mongo_text_index
+from app.services.past_project_index_service import get_past_project_index
+from app.services.prerank_service import get_heuristic_preranker
+from app.services.project_similarity_service import get_project_similarity_index
+from app.services.region_service import get_region_hierarchy
+from app.services.scoring_cache_service import (
+    foundation_content_hash,
+    get_evaluation_memo,
+    get_scoring_cache,
+    project_fingerprint,
+    scoring_cache_key,
+)
+from app.services.scoring_trace_service import current_trace, stage, trace_scoring
+from app.services.text_index_service import get_foundation_text_index
+from app.services.vector_index_service import get_foundation_vector_index
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Fields read by _format_foundations_for_prompt and _convert_to_foundation_score.
+# Candidate queries load only these instead of the full foundation documents.
+FOUNDATION_SCORING_PROJECTION = {
+    "derived": 1,
+    "name": 1,
+    "short_description": 1,
+    "long_description": 1,
+    "legal_form": 1,
+    "gemeinnuetzige_zwecke": 1,
+    "foerderbereich": 1,
+    "foerderhoehe": 1,
+    "antragsprozess": 1,
+    "contact": 1,
+    "past_projects": 1,
+    "website": 1,
+}
+
 
 class ScoringService:
     """Service for AI-powered foundation scoring and matching."""
 
     def __init__(self):
-        """Initialize the Requesty AI model with structured output."""
+        """Initialize the Requesty AI models with structured output."""
         if not settings.REQUESTY_API_KEY:
             logger.warning("REQUESTY_API_KEY is not set!")
         else:
@@ -37,17 +80,29 @@ class ScoringService:
 
         try:
             self.llm = ChatOpenAI(
-                model="anthropic/claude-haiku-4-5",
+                model=settings.SCORING_MODEL,
                 api_key=SecretStr(settings.REQUESTY_API_KEY),
                 base_url=settings.REQUESTY_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+            )
+            logger.info(f"Requesty AI model initialized: {settings.SCORING_MODEL}")
+            # Ranking tier of the cascade (SCORING_CASCADE)
+            self.ranking_llm = ChatOpenAI(
+                model=settings.SCORING_RANKING_MODEL,
+                api_key=SecretStr(settings.REQUESTY_API_KEY),
+                base_url=settings.REQUESTY_BASE_URL,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
             )
-            logger.info("Requesty AI model initialized: anthropic/claude-haiku-4-5")
         except Exception as e:
             logger.exception("Failed to initialize Requesty AI")
             raise
 
         # Set up structured output using modern LangChain pattern
         self.structured_llm = self.llm.with_structured_output(ScoringResponse)
+        self.structured_ranking_llm = self.ranking_llm.with_structured_output(RankingResponse)
+
+        # Bounds concurrent scoring calls across all requests of this worker
+        self._llm_semaphore = asyncio.Semaphore(max(1, settings.SCORING_MAX_CONCURRENCY))
 
     async def score_foundations(
         self,
@@ -66,57 +121,108 @@ class ScoringService:
         Returns:
             List of FoundationScore objects, sorted by match score (highest first)
         """
-        logger.info(
-            "Starting foundation scoring process in STRICT mode (fallbacks disabled)..."
-        )
         if db is None:
             db = get_database()
 
-        # Step 1: Filter by charitable purpose (exact match)
-        # Project can have multiple charitable purposes - match if ANY of them match
-        charitable_purpose_strings = [
-            purpose.value for purpose in project.charitable_purpose
-        ]
-        matching_foundations = await self._filter_by_charitable_purpose(
-            db, charitable_purpose_strings
-        )
-
-        if not matching_foundations:
+        catalog_version = await get_catalog_version(db)
+        cache = get_scoring_cache() if settings.SCORING_CACHE_ENABLED else None
+        cache_key = scoring_cache_key(project_fingerprint(project), limit, catalog_version)
+        if cache:
+            with stage("cache"):
+                cached = self._drop_stale_deadlines(await cache.get(db, cache_key))
+            if cached is not None:
+                logger.info(
+                    f"Scoring cache hit for catalog version {catalog_version}, returning {len(cached)} foundations."
+                )
+                if current_trace():
+                    current_trace().cache_hit = True
+                return list(cached)
+
+        # Candidates the LLM failed to score; a partial ranking is not cached
+        missing: Set[str] = set()
+        # Retrieved candidates, kept for the heuristic fallback
+        candidate_foundations: List[Dict[str, Any]] = []
+        try:
+            scored_foundations = await self._score_foundations_uncached(
+                project, limit, db, catalog_version, missing, candidate_foundations
+            )
+        except Exception:
+            if not settings.SCORING_HEURISTIC_FALLBACK or not candidate_foundations:
+                # Nothing to fall back to when retrieval itself failed
+                raise
+            logger.exception("LLM scoring failed, serving the heuristic pre-ranking instead")
+            # Not cached, so the next request tries the LLM again
+            return self._heuristic_scores(project, candidate_foundations, limit)
+
+        if missing:
             logger.warning(
-                f"No foundations found matching charitable purposes: {charitable_purpose_strings}"
+                f"LLM failed to score {len(missing)} candidates, not caching the partial ranking"
             )
-            return []
+        elif cache:
+            await cache.put(db, cache_key, scored_foundations, catalog_version)
+        return scored_foundations
 
-        logger.info(
-            f"Found {len(matching_foundations)} foundations matching charitable purposes: {charitable_purpose_strings}"
-        )
+    async def score_foundations_explained(
+        self,
+        project: ProjectDescription,
+        limit: int = 5,
+        db: AsyncIOMotorDatabase = None,
+    ) -> Tuple[List[FoundationScore], ScoringExplain]:
+        """
+        Score foundations like score_foundations and explain how the result came about.
 
-        # Step 2: Text search on long_description + past_projects
-        search_text = f"{project.name} {project.description} {project.target_group}"
-        scored_candidates = await self._text_search_foundations(
-            db,
-            matching_foundations,
-            search_text,
-            limit * 2,  # Get more candidates for LLM evaluation
-        )
+        Returns the scores and a ScoringExplain with the candidate funnel (filter
+        count, text hits, LLM candidates, prompt sizes) and per-stage timings.
+        """
+        with trace_scoring() as trace:
+            scored_foundations = await self.score_foundations(project, limit, db)
+        return scored_foundations, trace
+
+    @staticmethod
+    def _drop_stale_deadlines(
+        cached: Optional[List[FoundationScore]],
+    ) -> Optional[List[FoundationScore]]:
+        """
+        Treat cached results listing a foundation whose deadline passed since as a miss.
 
-        if not scored_candidates:
-            logger.warning("No foundations found after text search")
-            return []
+        The cache key only changes with the catalog, not with the date; the
+        re-run reuses the memoized evaluations of the remaining foundations.
+        """
+        if cached is None or settings.SCORING_EXPIRED_DEADLINES == "keep":
+            return cached
+        if any(is_deadline_expired(score.antragsprozess) for score in cached):
+            logger.info("Cached scoring result lists an expired deadline, scoring again")
+            return None
+        return cached
+
+    async def _score_foundations_uncached(
+        self,
+        project: ProjectDescription,
+        limit: int,
+        db: AsyncIOMotorDatabase,
+        catalog_version: Optional[int] = None,
+        missing: Optional[Set[str]] = None,
+        retrieved: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[FoundationScore]:
+        """
+        Run the full retrieval and LLM evaluation pipeline (see score_foundations).
 
-        # Limit to top candidates for LLM evaluation
-        candidate_foundations = scored_candidates[
-            : min(limit * 2, len(scored_candidates))
-        ]
-        logger.info(
-            f"Selected {len(candidate_foundations)} candidate foundations for LLM evaluation"
+        The ids of candidates the LLM failed to score are added to ``missing``,
+        the retrieved candidates to ``retrieved``.
+        """
+        candidate_foundations = await self._retrieve_candidates(
+            project, limit, db, catalog_version
         )
+        if retrieved is not None:
+            retrieved.extend(candidate_foundations)
+        if not candidate_foundations:
+            return []
 
         # Step 3: Use LLM to score and analyze foundations
         logger.info("Step 3: Evaluating with LLM...")
         try:
             scored_foundations = await self._evaluate_with_llm(
-                project, candidate_foundations
+                project, candidate_foundations, db, limit, missing
             )
 
             # Sort by match score and limit
@@ -124,24 +230,471 @@ class ScoringService:
             logger.info(
                 f"LLM evaluation successful, returning {len(scored_foundations)} sorted foundations."
             )
+            if not missing:
+                await self._record_ranking(
+                    project, candidate_foundations, scored_foundations[:limit], db
+                )
             return scored_foundations[:limit]
 
         except Exception as e:
             logger.exception("FATAL: Error in LLM evaluation")
-            # Re-raise the exception to avoid fallback
+            # score_foundations decides whether to fall back to the pre-ranking
             raise
 
+    async def stream_foundation_scores(
+        self,
+        project: ProjectDescription,
+        limit: int = 5,
+        db: AsyncIOMotorDatabase = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Score foundations like score_foundations, yielding progress events.
+
+        Events are yielded in this order:
+        - ``{"event": "candidates", "candidates": [...]}`` once retrieval is done
+          (id, name and retrieval score of every candidate sent to the LLM; with
+          SCORING_PROGRESSIVE, of every candidate that may be evaluated)
+        - ``{"event": "score", "foundation": {...}}`` for every FoundationScore as
+          soon as its evaluation is available (memoized ones first); with
+          SCORING_CASCADE only for the top ``limit`` of the ranking tier
+        - ``{"event": "ranking", "foundation_ids": [...]}`` with the final top
+          ``limit`` ids, sorted by match score
+
+        Closing the generator early cancels the LLM calls that are still running.
+
+        Raises:
+            ValueError: If the LLM fails to evaluate any of the candidate foundations.
+        """
+        if db is None:
+            db = get_database()
+
+        catalog_version = await get_catalog_version(db)
+        cache = get_scoring_cache() if settings.SCORING_CACHE_ENABLED else None
+        cache_key = scoring_cache_key(project_fingerprint(project), limit, catalog_version)
+        cached = self._drop_stale_deadlines(await cache.get(db, cache_key)) if cache else None
+        if cached is not None:
+            logger.info(
+                f"Scoring cache hit for catalog version {catalog_version}, streaming {len(cached)} foundations."
+            )
+            yield {
+                "event": "candidates",
+                "candidates": [
+                    {"id": score.id, "name": score.name, "score": None} for score in cached
+                ],
+            }
+            for score in cached:
+                yield {"event": "score", "foundation": score.model_dump()}
+            yield {"event": "ranking", "foundation_ids": [score.id for score in cached]}
+            return
+
+        candidate_foundations = await self._retrieve_candidates(
+            project, limit, db, catalog_version
+        )
+        yield {
+            "event": "candidates",
+            "candidates": [
+                {
+                    "id": foundation.get("_id") or foundation.get("id"),
+                    "name": foundation.get("name", ""),
+                    "score": foundation.get("score"),
+                }
+                for foundation in candidate_foundations
+            ],
+        }
+
+        missing: Set[str] = set()
+        if settings.SCORING_CASCADE:
+            candidate_foundations = await self._rank_with_cascade(
+                project, candidate_foundations, db, limit, missing
+            )
+        scored_foundations: List[FoundationScore] = []
+        async for scored in self._iter_scores(project, candidate_foundations, db, limit, missing):
+            scored_foundations.append(scored)
+            yield {"event": "score", "foundation": scored.model_dump()}
+
+        if candidate_foundations and not scored_foundations:
+            error_msg = "FATAL: LLM failed to evaluate any of the candidate foundations. Halting process."
+            logger.error(error_msg)
+            if not settings.SCORING_HEURISTIC_FALLBACK:
+                raise ValueError(error_msg)
+            logger.warning("Serving the heuristic pre-ranking instead")
+            ranked = self._heuristic_scores(project, candidate_foundations, limit)
+            for scored in ranked:
+                yield {"event": "score", "foundation": scored.model_dump()}
+            yield {"event": "ranking", "foundation_ids": [score.id for score in ranked]}
+            return
+
+        scored_foundations.sort(key=lambda x: x.match_score, reverse=True)
+        ranked = scored_foundations[:limit]
+        if missing:
+            logger.warning(
+                f"LLM failed to score {len(missing)} candidates, not caching the partial ranking"
+            )
+        else:
+            if cache:
+                await cache.put(db, cache_key, ranked, catalog_version)
+            await self._record_ranking(project, candidate_foundations, ranked, db)
+        yield {"event": "ranking", "foundation_ids": [score.id for score in ranked]}
+
+    async def evaluate_foundation(
+        self,
+        project: ProjectDescription,
+        foundation: Dict[str, Any],
+        db: AsyncIOMotorDatabase = None,
+    ) -> Optional[FoundationScore]:
+        """
+        Evaluate a single foundation for a project, reusing a memoized evaluation.
+
+        Used to patch stored results when a foundation changes; ``foundation``
+        should hold the FOUNDATION_SCORING_PROJECTION fields so memo keys match
+        the request path.
+
+        Returns:
+            The FoundationScore, or None if the LLM failed to evaluate the foundation
+        """
+        if db is None:
+            db = get_database()
+
+        foundation_id = foundation.get("_id") or foundation.get("id")
+        fingerprint = project_fingerprint(project)
+        memo_keys, memoized = await self._memoized_evaluations(
+            fingerprint, {foundation_id: foundation}, db
+        )
+        if foundation_id in memoized:
+            return self._convert_to_foundation_score(foundation, memoized[foundation_id])
+
+        evaluations = await self._evaluate_shard(project, [foundation])
+        if not evaluations:
+            return None
+        if memo_keys:
+            await get_evaluation_memo().put_many(
+                db, fingerprint, [(memo_keys[foundation_id], foundation_id, evaluations[0])]
+            )
+        return self._convert_to_foundation_score(foundation, evaluations[0])
+
+    async def _retrieve_candidates(
+        self,
+        project: ProjectDescription,
+        limit: int,
+        db: AsyncIOMotorDatabase,
+        catalog_version: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieval stage of the pipeline: purpose filter, text ranking and
+        heuristic pre-ranking.
+
+        With SCORING_PRERANK_ENABLED the top SCORING_PRERANK_POOL_SIZE text
+        matches are re-ranked by the heuristic pre-ranker and the best
+        max(limit, SCORING_LLM_CANDIDATES) are returned. Otherwise returns up to
+        ``limit * 2`` candidates, best text match first. With SCORING_PROGRESSIVE
+        a deeper ranked list is returned for _iter_progressive. With
+        SCORING_PROJECT_REUSE, the ranking of a near-duplicate project replaces
+        all of this (see _reuse_similar_ranking).
+        """
+        logger.info(
+            "Starting foundation scoring process (heuristic fallback "
+            f"{'enabled' if settings.SCORING_HEURISTIC_FALLBACK else 'disabled'})..."
+        )
+        if settings.SCORING_PROJECT_REUSE:
+            reused = await self._reuse_similar_ranking(project, limit, db, catalog_version)
+            if reused:
+                self._trace_candidates(reused)
+                return reused
+
+        scored_candidates = await self._retrieve_pool(
+            project, self._pool_size(limit), db, catalog_version
+        )
+        if not scored_candidates:
+            return []
+
+        with stage("candidate_selection"):
+            if settings.SCORING_DISTILLED_RANKER != "off":
+                await get_distilled_ranker().ensure_loaded(db)
+            candidate_foundations = self._select_candidates(
+                project, scored_candidates, limit, progressive=settings.SCORING_PROGRESSIVE
+            )
+        self._trace_candidates(candidate_foundations)
+        return candidate_foundations
+
+    @staticmethod
+    def _trace_candidates(candidate_foundations: List[Dict[str, Any]]) -> None:
+        """Record the candidates sent to the LLM in the explain trace."""
+        trace = current_trace()
+        if trace is None:
+            return
+        trace.candidates = [
+            {
+                "id": foundation.get("_id") or foundation.get("id"),
+                "name": foundation.get("name", ""),
+                "score": foundation.get("score"),
+                "prior_score": foundation.get("prior_score"),
+            }
+            for foundation in candidate_foundations
+        ]
+
+    async def _reuse_similar_ranking(
+        self,
+        project: ProjectDescription,
+        limit: int,
+        db: AsyncIOMotorDatabase,
+        catalog_version: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Candidates from the ranking of a near-duplicate project (see project_similarity_service).
+
+        The top ``limit`` foundations of the earlier ranking that still pass the
+        purpose, region and deadline filters are returned with their earlier
+        match score as "prior_score" and flagged with "reused_ranking". They
+        have no retrieval relevance ("score"). Only the first
+        PROJECT_REUSE_RECHECK are re-evaluated by the LLM; the others carry the
+        similar project's fingerprint in "reused_from" and are served with its
+        memoized evaluation as a provisional answer (evaluated only if that is
+        missing, e.g. because the foundation changed). Returns an empty list
+        when there is no similar project or fewer than ``limit`` of its
+        foundations remain.
+        """
+        similarity_index = get_project_similarity_index()
+        try:
+            await similarity_index.ensure_built(db)
+        except Exception:
+            logger.exception("Failed to load the project similarity index, running full retrieval")
+            return []
+        similar = similarity_index.find(project)
+        if similar is None:
+            return []
+
+        project_regions = (
+            get_region_hierarchy().location_regions(project)
+            if settings.SCORING_REGION_PRUNING
+            else []
+        )
+        allowed = set(
+            await self._filter_by_charitable_purpose(
+                db,
+                [purpose.value for purpose in project.charitable_purpose],
+                catalog_version,
+                project_regions,
+            )
+        )
+        ranking = [
+            (foundation_id, match_score)
+            for foundation_id, match_score in similar.ranking
+            if foundation_id in allowed
+        ][:limit]
+        documents = await self._load_scoring_documents(db, [f_id for f_id, _ in ranking])
+
+        candidates = []
+        for foundation_id, match_score in ranking:
+            foundation = documents.get(foundation_id)
+            if foundation is None:
+                continue
+            foundation["prior_score"] = match_score
+            foundation["reused_ranking"] = True
+            if len(candidates) >= settings.PROJECT_REUSE_RECHECK:
+                foundation["reused_from"] = similar.fingerprint
+            candidates.append(foundation)
+        if len(candidates) < limit:
+            logger.info(
+                f"Similar project found (similarity {similar.similarity:.2f}), "
+                f"but only {len(candidates)} of its foundations remain; running full retrieval"
+            )
+            return []
+
+        logger.info(
+            f"Reusing the ranking of a similar project (similarity {similar.similarity:.2f}): "
+            f"re-evaluating its top {min(len(candidates), settings.PROJECT_REUSE_RECHECK)} "
+            f"of {len(candidates)} foundations"
+        )
+        if current_trace():
+            current_trace().reused_similarity = similar.similarity
+        return candidates
+
+    async def _record_ranking(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        ranked: List[FoundationScore],
+        db: AsyncIOMotorDatabase,
+    ) -> None:
+        """Record a full-pipeline ranking for reuse by near-duplicate projects."""
+        if not settings.SCORING_PROJECT_REUSE or not ranked:
+            return
+        if any(foundation.get("reused_ranking") for foundation in candidate_foundations):
+            return
+        await get_project_similarity_index().record(db, project, ranked)
+
+    async def _retrieve_pool(
+        self,
+        project: ProjectDescription,
+        pool_size: Optional[int],
+        db: AsyncIOMotorDatabase,
+        catalog_version: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Purpose filter and text ranking: the pool the candidates are selected from.
+
+        Returns up to ``pool_size`` foundations, best text match first, each
+        with its relevance in the "score" field. With ``pool_size=None`` every
+        foundation passing the filters is returned; those without a text match
+        follow with a score of 0 (with SCORING_RETRIEVAL_MODE=mongo_text only
+        text matches are found).
+        """
+        # Project can have multiple charitable purposes - match if ANY of them match
+        charitable_purpose_strings = [
+            purpose.value for purpose in project.charitable_purpose
+        ]
+        search_text = self._search_text(project)
+        project_regions = (
+            get_region_hierarchy().location_regions(project)
+            if settings.SCORING_REGION_PRUNING
+            else []
+        )
+        if project_regions:
+            logger.info(f"Project location resolved to regions: {project_regions}")
+
+        if settings.SCORING_RETRIEVAL_MODE == "mongo_text":
+            # Steps 1 + 2 in a single aggregation: purpose filter, text ranking, projection
+            with stage("text_search"):
+                scored_candidates = await self._text_search_foundations(
+                    db,
+                    charitable_purpose_strings,
+                    search_text,
+                    pool_size,
+                )
+            if project_regions:
+                hierarchy = get_region_hierarchy()
+                scored_candidates = [
+                    foundation
+                    for foundation in scored_candidates
+                    if hierarchy.can_fund(
+                        hierarchy.foundation_regions(foundation.get("foerderbereich")),
+                        project_regions,
+                    )
+                ]
+            if settings.SCORING_PAST_PROJECT_MATCHING:
+                await get_past_project_index().ensure_built(db, catalog_version)
+                get_past_project_index().annotate(search_text, scored_candidates)
+        else:
+            # Step 1: Filter by charitable purpose (exact match)
+            matching_foundations = await self._filter_by_charitable_purpose(
+                db, charitable_purpose_strings, catalog_version, project_regions
+            )
+
+            if not matching_foundations:
+                logger.warning(
+                    f"No foundations found matching charitable purposes: {charitable_purpose_strings}"
+                )
+                return []
+
+            logger.info(
+                f"Found {len(matching_foundations)} foundations matching charitable purposes: {charitable_purpose_strings}"
+            )
+
+            # Step 2: Text search on long_description + past_projects, joined by
+            # the foundations whose past projects are most similar to the project
+            with stage("text_search"):
+                scored_candidates = await self._index_search_foundations(
+                    db,
+                    matching_foundations,
+                    search_text,
+                    pool_size,
+                    catalog_version,
+                )
+
+        if not scored_candidates:
+            logger.warning("No foundations found after text search")
+            return []
+        trace = current_trace()
+        if trace is not None:
+            trace.text_hits = [
+                {
+                    "id": foundation.get("_id") or foundation.get("id"),
+                    "name": foundation.get("name", ""),
+                    "score": foundation.get("score"),
+                    "past_project_score": foundation.get("past_project_score"),
+                }
+                for foundation in scored_candidates
+            ]
+        return scored_candidates
+
+    @staticmethod
+    def _search_text(project: ProjectDescription) -> str:
+        """Query text used to rank foundations for a project."""
+        return f"{project.name} {project.description} {project.target_group}"
+
+    @staticmethod
+    def _pool_size(limit: int) -> int:
+        """Number of text matches retrieved before the candidates are selected."""
+        pool_size = limit * 2  # Get more candidates for LLM evaluation
+        if settings.SCORING_PRERANK_ENABLED:
+            pool_size = max(pool_size, settings.SCORING_PRERANK_POOL_SIZE)
+        return pool_size
+
+    def _select_candidates(
+        self,
+        project: ProjectDescription,
+        scored_candidates: List[Dict[str, Any]],
+        limit: int,
+        progressive: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Limit the text-ranked pool to the candidates sent to the LLM (see _retrieve_candidates).
+
+        A loaded distilled ranker takes the place of the heuristic pre-ranker;
+        with SCORING_DISTILLED_RANKER=score only the top ``limit`` are kept.
+        With ``progressive``, up to SCORING_PROGRESSIVE_MAX_CANDIDATES are kept
+        for _iter_progressive, each with its prior score in "prior_score".
+        """
+        distilled_ranker = get_distilled_ranker()
+        if settings.SCORING_DISTILLED_RANKER != "off" and distilled_ranker.ready:
+            if settings.SCORING_DISTILLED_RANKER == "score":
+                n_candidates = limit
+            else:
+                n_candidates = max(limit, settings.SCORING_LLM_CANDIDATES)
+            ranked = distilled_ranker.rank(project, scored_candidates)
+        elif settings.SCORING_PRERANK_ENABLED:
+            n_candidates = max(limit, settings.SCORING_LLM_CANDIDATES)
+            ranked = get_heuristic_preranker().rank(project, scored_candidates)
+        else:
+            n_candidates = limit * 2
+            # Text scores scaled to the best match, so the prior lies in [0, 1] like the others
+            top_score = max((foundation.get("score") or 0.0 for foundation in scored_candidates), default=0.0)
+            ranked = [
+                (foundation, (foundation.get("score") or 0.0) / top_score if top_score > 0 else 0.0)
+                for foundation in scored_candidates
+            ]
+
+        if progressive and settings.SCORING_DISTILLED_RANKER != "score":
+            n_candidates = max(limit, settings.SCORING_PROGRESSIVE_MAX_CANDIDATES)
+            for foundation, prior in ranked[:n_candidates]:
+                foundation["prior_score"] = prior
+        candidate_foundations = [foundation for foundation, _ in ranked[:n_candidates]]
+        logger.info(
+            f"Selected {len(candidate_foundations)} candidate foundations for LLM evaluation"
+        )
+        return candidate_foundations
+
     async def _filter_by_charitable_purpose(
-        self, db: AsyncIOMotorDatabase, charitable_purposes: List[str]
+        self,
+        db: AsyncIOMotorDatabase,
+        charitable_purposes: List[str],
+        catalog_version: Optional[int] = None,
+        project_regions: Optional[List[str]] = None,
     ) -> List[str]:
         """
         Filter foundations by exact match on charitable purpose(s).
 
         Matches foundations where ANY of the provided charitable purposes
-        appears in the foundation's gemeinnuetzige_zwecke list.
+        appears in the foundation's gemeinnuetzige_zwecke list. Runs as a
+        bitmask test on the in-memory foundation catalog. With
+        ``project_regions``, foundations that cannot fund that location are
+        dropped as well, and with SCORING_EXPIRED_DEADLINES=exclude those whose
+        fixed deadline has passed.
 
         Args:
             charitable_purposes: List of charitable purpose strings to match
+            catalog_version: Current catalog version (reloads a stale catalog)
+            project_regions: Region nodes of the project location (optional)
 
         Returns:
             List of foundation IDs that match at least one purpose
@@ -150,31 +703,18 @@ class ScoringService:
             f"Filtering foundations by charitable purposes: {charitable_purposes}..."
         )
         try:
-            # Find foundations where ANY of the charitable purposes appears in gemeinnuetzige_zwecke
-            cursor = db.foundations.find(
-                {"gemeinnuetzige_zwecke": {"$in": charitable_purposes}}
-            )
-
-            foundations = await cursor.to_list(length=None)
-            logger.debug(f"Found {len(foundations)} raw documents from database.")
-
-            foundation_ids = []
-            for foundation in foundations:
-                if foundation is None:
-                    logger.debug("Skipping a None foundation document.")
-                    continue
-
-                f_id = foundation.get("_id") or foundation.get("id")
-                if f_id:
-                    foundation_ids.append(f_id)
-                else:
-                    logger.warning(
-                        f"Found foundation document without _id or id: {foundation}"
-                    )
+            with stage("purpose_filter"):
+                catalog = get_foundation_catalog()
+                await catalog.ensure_built(db, catalog_version)
+                foundation_ids = catalog.filter_ids(
+                    purposes=charitable_purposes, regions=project_regions, open_on=self._open_on()
+                )
 
             logger.info(
                 f"Successfully filtered and found {len(foundation_ids)} foundation IDs."
             )
+            if current_trace():
+                current_trace().purpose_filter_count = len(foundation_ids)
             return foundation_ids
         except Exception as e:
             logger.exception("FATAL: Error filtering by charitable purpose")
@@ -183,34 +723,50 @@ class ScoringService:
     async def _text_search_foundations(
         self,
         db: AsyncIOMotorDatabase,
-        foundation_ids: List[str],
+        charitable_purposes: List[str],
         search_text: str,
-        limit: int,
+        limit: Optional[int],
     ) -> List[Dict[str, Any]]:
         """
         Perform text search on foundations using MongoDB's $text operator.
 
+        Filters by charitable purpose, ranks by text relevance and projects the
+        fields in FOUNDATION_SCORING_PROJECTION in one aggregation pipeline.
+
         Returns list of foundation documents sorted by relevance.
         Raises:
             Exception: If the MongoDB text search fails.
         """
         logger.info(f"Performing MongoDB text search for: '{search_text[:100]}...'")
-        if not foundation_ids:
+        if not charitable_purposes:
             logger.warning(
-                "No foundation IDs provided for text search. Returning empty list."
+                "No charitable purposes provided for text search. Returning empty list."
             )
             return []
 
         try:
-            # Note: $text must be at top level
-            query = {"$text": {"$search": search_text}, "_id": {"$in": foundation_ids}}
-
-            cursor = (
-                db.foundations.find(query, {"score": {"$meta": "textScore"}})
-                .sort([("score", {"$meta": "textScore"})])
-                .limit(limit)
-            )
-
+            # Weighted index over names, descriptions, purposes and past projects
+            await get_mongo_text_index().ensure(db)
+            # Note: a $match with $text must be the first stage of the pipeline
+            pipeline = [
+                {
+                    "$match": {
+                        "$text": {"$search": search_text, "$language": MONGO_TEXT_INDEX_LANGUAGE},
+                        "gemeinnuetzige_zwecke": {"$in": charitable_purposes},
+                        **self._open_deadline_filter(),
+                    }
+                },
+                {"$sort": {"score": {"$meta": "textScore"}}},
+                *([{"$limit": limit}] if limit is not None else []),
+                {
+                    "$project": {
+                        **FOUNDATION_SCORING_PROJECTION,
+                        "score": {"$meta": "textScore"},
+                    }
+                },
+            ]
+
+            cursor = db.foundations.aggregate(pipeline)
             text_results = await cursor.to_list(length=limit)
 
             if text_results:
@@ -224,76 +780,637 @@ class ScoringService:
 
         except Exception as e:
             logger.exception(
-                "FATAL: MongoDB text search failed. Ensure a text index exists on the 'foundations' collection."
+                "FATAL: MongoDB text search failed. Check the 'foundations' text index (see mongo_text_index_service)."
             )
             # Raising the exception is critical to avoid silent failures.
             # A text index is required for this functionality.
             raise
 
+    @staticmethod
+    def _open_deadline_filter() -> Dict[str, Any]:
+        """MongoDB filter dropping expired fixed deadlines (empty unless SCORING_EXPIRED_DEADLINES=exclude)."""
+        if settings.SCORING_EXPIRED_DEADLINES != "exclude":
+            return {}
+        today = datetime.combine(date.today(), datetime.min.time())
+        return {
+            "$nor": [
+                {"antragsprozess.deadline_type": "fixed", "derived.deadline": {"$lt": today}}
+            ]
+        }
+
+    @staticmethod
+    def _open_on() -> Optional[date]:
+        """Date for the catalog's deadline filter (None unless SCORING_EXPIRED_DEADLINES=exclude)."""
+        return date.today() if settings.SCORING_EXPIRED_DEADLINES == "exclude" else None
+
+    async def _index_search_foundations(
+        self,
+        db: AsyncIOMotorDatabase,
+        foundation_ids: List[str],
+        search_text: str,
+        limit: Optional[int],
+        catalog_version: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank foundations with an in-process index and load the top hits.
+
+        Uses the BM25 index or, with SCORING_RETRIEVAL_MODE=tfidf, the hashed
+        TF-IDF matrix. Returns list of foundation documents sorted by relevance,
+        each carrying its relevance in the "score" field (like MongoDB's textScore).
+        With ``limit=None`` all ``foundation_ids`` are loaded, unmatched ones last.
+        """
+        mode = settings.SCORING_RETRIEVAL_MODE
+        logger.info(f"Performing {mode} index search for: '{search_text[:100]}...'")
+        if not foundation_ids:
+            logger.warning(
+                "No foundation IDs provided for text search. Returning empty list."
+            )
+            return []
+
+        if mode == "tfidf":
+            text_index = get_foundation_vector_index()
+        else:
+            text_index = get_foundation_text_index()
+        await text_index.ensure_built(db, catalog_version)
+        hits = text_index.search(search_text, foundation_ids, limit)
+        if settings.SCORING_PAST_PROJECT_MATCHING:
+            past_project_index = get_past_project_index()
+            await past_project_index.ensure_built(db, catalog_version)
+            hits = self._add_past_project_hits(search_text, foundation_ids, hits)
+        if limit is None:
+            found = {f_id for f_id, _ in hits}
+            hits = hits + [(f_id, 0.0) for f_id in foundation_ids if f_id not in found]
+        if not hits:
+            logger.warning(f"{mode} index search returned no results.")
+            return []
+
+        documents = await self._load_scoring_documents(db, [f_id for f_id, _ in hits])
+
+        results = []
+        for f_id, score in hits:
+            foundation = documents.get(f_id)
+            if foundation is None:
+                # Index is behind the collection (foundation deleted meanwhile); the
+                # watcher's catalog version bump refreshes the index
+                continue
+            foundation["score"] = score
+            results.append(foundation)
+        if settings.SCORING_PAST_PROJECT_MATCHING:
+            past_project_index.annotate(search_text, results)
+
+        logger.info(f"{mode} index search successful, found {len(results)} results.")
+        return results
+
+    @staticmethod
+    def _add_past_project_hits(
+        search_text: str, foundation_ids: List[str], hits: List[Tuple[str, float]]
+    ) -> List[Tuple[str, float]]:
+        """
+        Append the foundations with the most similar past projects to the text hits.
+
+        Up to SCORING_PAST_PROJECT_CANDIDATES foundations are looked up in the
+        past project index; those the text search missed join the pool with a
+        text relevance of 0.
+        """
+        past_hits = get_past_project_index().search(
+            search_text, foundation_ids, settings.SCORING_PAST_PROJECT_CANDIDATES
+        )
+        found = {f_id for f_id, _ in hits}
+        added = [(f_id, 0.0) for f_id, _ in past_hits if f_id not in found]
+        if added:
+            logger.info(f"Added {len(added)} foundations with similar past projects to the pool")
+        return hits + added
+
+    async def _load_scoring_documents(
+        self, db: AsyncIOMotorDatabase, foundation_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Load the FOUNDATION_SCORING_PROJECTION of the given foundations, keyed by id."""
+        cursor = db.foundations.find(
+            {"_id": {"$in": list(foundation_ids)}}, FOUNDATION_SCORING_PROJECTION
+        )
+        return {doc["_id"]: doc for doc in await cursor.to_list(length=None)}
+
     async def _evaluate_with_llm(
-        self, project: ProjectDescription, candidate_foundations: List[Dict[str, Any]]
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        db: AsyncIOMotorDatabase = None,
+        limit: Optional[int] = None,
+        missing: Optional[Set[str]] = None,
     ) -> List[FoundationScore]:
         """
         Use LLM to evaluate and score candidate foundations.
+
+        Collects the evaluations of _iter_scores in candidate order. Candidates
+        that still have no evaluation after retries, or that progressive
+        evaluation never reached, are dropped from the result. With
+        SCORING_CASCADE and a ``limit``, only the top ``limit`` of the ranking
+        tier are evaluated in detail. The ids of candidates the LLM failed to
+        score are added to ``missing``.
+
         Raises:
-            ValueError: If the LLM fails to evaluate one of the candidate foundations.
+            ValueError: If the LLM fails to evaluate any of the candidate foundations.
         """
-        logger.info(f"Evaluating {len(candidate_foundations)} candidates with LLM...")
-        # Build prompt with project and foundation details
-        prompt = self._create_scoring_prompt()
+        if missing is None:
+            missing = set()
+        with stage("llm"):
+            if settings.SCORING_CASCADE and limit:
+                candidate_foundations = await self._rank_with_cascade(
+                    project, candidate_foundations, db, limit, missing
+                )
+            scored_by_id = {
+                scored.id: scored
+                async for scored in self._iter_scores(
+                    project, candidate_foundations, db, limit, missing
+                )
+            }
 
-        # Format foundations for prompt
-        foundations_text = self._format_foundations_for_prompt(candidate_foundations)
-        logger.debug(f"Formatted prompt text length: {len(foundations_text)}")
+        # Keep retrieval order for the caller
+        scored_foundations = []
+        for foundation in candidate_foundations:
+            foundation_id = foundation.get("_id") or foundation.get("id")
+            if not foundation_id:
+                continue
 
-        # Invoke LLM with structured output
-        chain = prompt | self.structured_llm
-        charitable_purposes_str = ", ".join(
-            [p.value for p in project.charitable_purpose]
+            scored = scored_by_id.get(foundation_id)
+            if scored:
+                scored_foundations.append(scored)
+            elif foundation_id in missing:
+                logger.error(
+                    f"LLM failed to return an evaluation for foundation ID: {foundation_id} after retries. Dropping it."
+                )
+
+        if candidate_foundations and not scored_foundations:
+            error_msg = "FATAL: LLM failed to evaluate any of the candidate foundations. Halting process."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        return scored_foundations
+
+    def _iter_scores(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        db: AsyncIOMotorDatabase,
+        limit: Optional[int],
+        missing: Optional[Set[str]] = None,
+    ) -> AsyncIterator[FoundationScore]:
+        """Progressive evaluation for candidates with prior scores, otherwise all at once."""
+        if (
+            settings.SCORING_PROGRESSIVE
+            and limit
+            and candidate_foundations
+            and "prior_score" in candidate_foundations[0]
+        ):
+            return self._iter_progressive(project, candidate_foundations, db, limit, missing)
+        return self._iter_evaluations(project, candidate_foundations, db, missing)
+
+    async def _iter_progressive(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        db: AsyncIOMotorDatabase,
+        limit: int,
+        missing: Optional[Set[str]] = None,
+    ) -> AsyncIterator[FoundationScore]:
+        """
+        Evaluate the ranked candidates in rounds until the top ``limit`` is settled.
+
+        The first round evaluates max(limit, SCORING_PROGRESSIVE_ROUND_SIZE)
+        candidates, later rounds SCORING_PROGRESSIVE_ROUND_SIZE each, in rank
+        order (best prior score first). After a round, the remaining candidates
+        can at best reach the next one's prior plus the largest lift of a match
+        score over its prior seen so far, plus SCORING_PROGRESSIVE_MARGIN; once
+        that bound does not exceed the k-th best match score, the rest is skipped.
+        """
+        first_round = max(limit, settings.SCORING_PROGRESSIVE_ROUND_SIZE)
+        round_size = max(1, settings.SCORING_PROGRESSIVE_ROUND_SIZE)
+        priors = {
+            foundation.get("_id") or foundation.get("id"): foundation.get("prior_score") or 0.0
+            for foundation in candidate_foundations
+        }
+        match_scores: List[float] = []
+        max_lift = 0.0
+        start = 0
+        while start < len(candidate_foundations):
+            end = start + (first_round if start == 0 else round_size)
+            async for scored in self._iter_evaluations(
+                project, candidate_foundations[start:end], db, missing
+            ):
+                match_scores.append(scored.match_score)
+                max_lift = max(max_lift, scored.match_score - priors.get(scored.id, 0.0))
+                yield scored
+            start = end
+
+            if start >= len(candidate_foundations) or len(match_scores) < limit:
+                continue
+            kth_score = sorted(match_scores, reverse=True)[limit - 1]
+            bound = (
+                (candidate_foundations[start].get("prior_score") or 0.0)
+                + max_lift
+                + settings.SCORING_PROGRESSIVE_MARGIN
+            )
+            if bound <= kth_score:
+                logger.info(
+                    f"Top {limit} settled after {start} of {len(candidate_foundations)} candidates "
+                    f"(bound {bound:.2f} <= k-th score {kth_score:.2f})"
+                )
+                return
+        logger.info(f"Evaluated all {len(candidate_foundations)} progressive candidates")
+
+    async def _memoized_evaluations(
+        self,
+        fingerprint: str,
+        foundations_by_id: Dict[str, Dict[str, Any]],
+        db: AsyncIOMotorDatabase,
+    ) -> Tuple[Dict[str, str], Dict[str, FoundationEvaluation]]:
+        """
+        Look up memoized evaluations of the candidates.
+
+        Candidates taken from a near-duplicate project's ranking with a
+        "reused_from" fingerprint fall back to that project's evaluation (see
+        _reuse_similar_ranking). Returns the memo key per foundation id (empty
+        with SCORING_EVALUATION_MEMO_ENABLED off) and the evaluations found.
+        """
+        if not settings.SCORING_EVALUATION_MEMO_ENABLED:
+            return {}, {}
+        memo = get_evaluation_memo()
+        content_hashes = {
+            foundation_id: foundation_content_hash(foundation)
+            for foundation_id, foundation in foundations_by_id.items()
+        }
+        memo_keys = {
+            foundation_id: memo.key(fingerprint, foundation_id, content_hash)
+            for foundation_id, content_hash in content_hashes.items()
+        }
+        reused_keys = {
+            foundation_id: memo.key(foundation["reused_from"], foundation_id, content_hashes[foundation_id])
+            for foundation_id, foundation in foundations_by_id.items()
+            if foundation.get("reused_from")
+        }
+        try:
+            found = await memo.get_many(db, [*memo_keys.values(), *reused_keys.values()])
+        except Exception:
+            logger.exception("Failed to read memoized evaluations, evaluating all candidates")
+            found = {}
+        memoized = {
+            foundation_id: found[key]
+            for foundation_id, key in reused_keys.items()
+            if key in found
+        }
+        # The project's own evaluations take precedence
+        memoized.update(
+            (foundation_id, found[key])
+            for foundation_id, key in memo_keys.items()
+            if key in found
         )
+        return memo_keys, memoized
 
-        logger.info("Invoking LLM for foundation evaluation...")
-        parsed_output: ScoringResponse = chain.invoke(
-            {
-                "project_name": project.name,
-                "project_description": project.description,
-                "target_group": project.target_group,
-                "charitable_purpose": charitable_purposes_str,
-                "foundations": foundations_text,
-            }
+    async def _rank_with_cascade(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        db: AsyncIOMotorDatabase,
+        limit: int,
+        missing: Optional[Set[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ranking tier of the cascade: keep the ``limit`` candidates with the best match score.
+
+        SCORING_RANKING_MODEL scores the candidates in concurrent shards with a
+        score-only schema, so each call outputs a few tokens per foundation;
+        memoized detailed evaluations supply their score without a call.
+        Candidates the ranking tier could not score rank after the scored ones,
+        in retrieval order; their ids are added to ``missing``.
+        """
+        if len(candidate_foundations) <= limit:
+            return candidate_foundations
+        foundations_by_id = {
+            foundation.get("_id") or foundation.get("id"): foundation
+            for foundation in candidate_foundations
+            if foundation.get("_id") or foundation.get("id")
+        }
+        _, memoized = await self._memoized_evaluations(
+            project_fingerprint(project), foundations_by_id, db
         )
+        match_scores = {
+            foundation_id: evaluation.match_score for foundation_id, evaluation in memoized.items()
+        }
 
-        logger.info(f"LLM evaluated {len(parsed_output.evaluations)} foundations.")
-        if len(parsed_output.evaluations) != len(candidate_foundations):
-            logger.warning(
-                f"LLM returned a different number of evaluations ({len(parsed_output.evaluations)}) than candidates provided ({len(candidate_foundations)})."
+        to_rank = [
+            foundation
+            for foundation_id, foundation in foundations_by_id.items()
+            if foundation_id not in match_scores
+        ]
+        if settings.SCORING_PROMPT_BRIEFS:
+            await get_foundation_briefs().attach(db, to_rank)
+        shard_size = max(1, settings.SCORING_SHARD_SIZE)
+        logger.info(
+            f"Ranking {len(to_rank)} candidates with {settings.SCORING_RANKING_MODEL} "
+            f"({len(match_scores)} memoized)..."
+        )
+        for shard_scores in await asyncio.gather(
+            *(
+                self._rank_shard(project, to_rank[i : i + shard_size])
+                for i in range(0, len(to_rank), shard_size)
             )
+        ):
+            match_scores.update(shard_scores)
+
+        unranked = [f_id for f_id in foundations_by_id if f_id not in match_scores]
+        if unranked:
+            logger.warning(f"Ranking tier returned no score for {len(unranked)} candidates")
+            if missing is not None:
+                missing.update(unranked)
+        order = sorted(
+            range(len(candidate_foundations)),
+            key=lambda i: -match_scores.get(
+                candidate_foundations[i].get("_id") or candidate_foundations[i].get("id"), -1.0
+            ),
+        )
+        return [candidate_foundations[i] for i in order[:limit]]
 
-        # Create a mapping from foundation_id to evaluation
-        evaluation_map = {
-            eval.foundation_id: eval for eval in parsed_output.evaluations
+    async def _rank_shard(
+        self, project: ProjectDescription, shard: List[Dict[str, Any]]
+    ) -> Dict[str, float]:
+        """
+        Score one shard with the ranking model, retrying failed calls and missing foundations.
+
+        Returns the match scores that could be obtained; never raises for LLM errors.
+        """
+        pending = [f for f in shard if f.get("_id") or f.get("id")]
+        match_scores: Dict[str, float] = {}
+
+        for attempt in range(settings.SCORING_SHARD_RETRIES + 1):
+            if not pending:
+                break
+            try:
+                async with self._llm_semaphore:
+                    parsed_output = await self._invoke_ranking_llm(project, pending)
+            except Exception:
+                logger.exception("LLM ranking of a candidate shard failed")
+                continue
+
+            pending_ids = {f.get("_id") or f.get("id") for f in pending}
+            for ranking in parsed_output.rankings:
+                if ranking.foundation_id in pending_ids:
+                    match_scores[ranking.foundation_id] = ranking.match_score
+            pending = [f for f in pending if (f.get("_id") or f.get("id")) not in match_scores]
+
+        return match_scores
+
+    async def _iter_evaluations(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        db: AsyncIOMotorDatabase = None,
+        missing: Optional[Set[str]] = None,
+    ) -> AsyncIterator[FoundationScore]:
+        """
+        Yield a FoundationScore for every candidate as soon as it is evaluated.
+
+        Evaluations memoized for this project and the current content of a
+        foundation are yielded first, without an LLM call. The remaining
+        candidates are split into shards of SCORING_SHARD_SIZE that are evaluated
+        concurrently (at most SCORING_MAX_CONCURRENCY calls in flight); each
+        shard's scores are yielded when that shard finishes. A shard that fails or
+        misses evaluations is retried on its own; candidates that still have no
+        evaluation are not yielded and their ids are added to ``missing``.
+        Closing the iterator cancels pending shards.
+        """
+        if db is None:
+            db = get_database()
+
+        foundations_by_id = {
+            foundation.get("_id") or foundation.get("id"): foundation
+            for foundation in candidate_foundations
+            if foundation.get("_id") or foundation.get("id")
         }
 
-        # Convert to FoundationScore objects, ensuring all candidates were evaluated
-        scored_foundations = []
-        for foundation in candidate_foundations:
-            foundation_id = foundation.get("_id") or foundation.get("id")
-            if not foundation_id:
+        fingerprint = project_fingerprint(project)
+        memo_keys, memoized = await self._memoized_evaluations(
+            fingerprint, foundations_by_id, db
+        )
+        if current_trace():
+            current_trace().memoized += len(memoized)
+
+        to_evaluate = [
+            foundation
+            for foundation_id, foundation in foundations_by_id.items()
+            if foundation_id not in memoized
+        ]
+        if settings.SCORING_PROMPT_BRIEFS:
+            await get_foundation_briefs().attach(db, to_evaluate)
+        shard_size = max(1, settings.SCORING_SHARD_SIZE)
+        shards = [
+            to_evaluate[i : i + shard_size]
+            for i in range(0, len(to_evaluate), shard_size)
+        ]
+        logger.info(
+            f"Evaluating {len(to_evaluate)} candidates with LLM in {len(shards)} shards "
+            f"({len(memoized)} memoized)..."
+        )
+
+        # With SCORING_DISTILLED_RANKER=score the LLM only explains the model's scores
+        model_scores: Dict[str, float] = {}
+        distilled_ranker = get_distilled_ranker()
+        if settings.SCORING_DISTILLED_RANKER == "score" and distilled_ranker.ready:
+            model_scores = dict(
+                zip(
+                    foundations_by_id,
+                    distilled_ranker.predict(project, list(foundations_by_id.values())).tolist(),
+                )
+            )
+
+        for foundation_id, evaluation in memoized.items():
+            with stage("conversion"):
+                scored = self._convert_to_foundation_score(
+                    foundations_by_id[foundation_id], self._with_model_score(evaluation, model_scores)
+                )
+            yield scored
+
+        tasks = [
+            asyncio.create_task(self._evaluate_shard(project, shard)) for shard in shards
+        ]
+        evaluated_ids: Set[str] = set()
+        try:
+            for next_shard in asyncio.as_completed(tasks):
+                evaluations = [
+                    evaluation
+                    for evaluation in await next_shard
+                    if evaluation.foundation_id in foundations_by_id
+                ]
+                evaluated_ids.update(evaluation.foundation_id for evaluation in evaluations)
+                if memo_keys and evaluations:
+                    await get_evaluation_memo().put_many(
+                        db,
+                        fingerprint,
+                        [
+                            (memo_keys[evaluation.foundation_id], evaluation.foundation_id, evaluation)
+                            for evaluation in evaluations
+                        ],
+                    )
+                if settings.SCORING_LABEL_LOGGING and evaluations:
+                    # Reused candidates skipped retrieval, their features are not comparable
+                    await distilled_ranker.log_labels(
+                        db,
+                        project,
+                        fingerprint,
+                        [
+                            (foundations_by_id[evaluation.foundation_id], evaluation)
+                            for evaluation in evaluations
+                            if not foundations_by_id[evaluation.foundation_id].get("reused_ranking")
+                        ],
+                    )
+                for evaluation in evaluations:
+                    with stage("conversion"):
+                        scored = self._convert_to_foundation_score(
+                            foundations_by_id[evaluation.foundation_id],
+                            self._with_model_score(evaluation, model_scores),
+                        )
+                    yield scored
+        finally:
+            # Consumer stopped early (e.g. a streaming client disconnected)
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"LLM evaluated {len(evaluated_ids)} foundations.")
+        if missing is not None:
+            missing.update(
+                foundation_id
+                for foundation_id in foundations_by_id
+                if foundation_id not in memoized and foundation_id not in evaluated_ids
+            )
+
+    @staticmethod
+    def _with_model_score(
+        evaluation: FoundationEvaluation, model_scores: Dict[str, float]
+    ) -> FoundationEvaluation:
+        """Replace the LLM's match_score with the distilled ranker's score, if any."""
+        if evaluation.foundation_id not in model_scores:
+            return evaluation
+        return evaluation.model_copy(
+            update={"match_score": round(model_scores[evaluation.foundation_id], 2)}
+        )
+
+    async def _evaluate_shard(
+        self, project: ProjectDescription, shard: List[Dict[str, Any]]
+    ) -> List[FoundationEvaluation]:
+        """
+        Evaluate one shard of candidates, retrying failed calls and missing foundations.
+
+        Returns the evaluations that could be obtained; never raises for LLM errors.
+        """
+        pending = [f for f in shard if f.get("_id") or f.get("id")]
+        evaluations: Dict[str, FoundationEvaluation] = {}
+
+        for attempt in range(settings.SCORING_SHARD_RETRIES + 1):
+            if not pending:
+                break
+            if attempt > 0:
+                logger.warning(
+                    f"Retrying LLM evaluation for {len(pending)} foundations (attempt {attempt + 1})."
+                )
+            try:
+                async with self._llm_semaphore:
+                    parsed_output = await self._invoke_scoring_llm(project, pending)
+            except Exception:
+                logger.exception("LLM evaluation of a candidate shard failed")
                 continue
 
-            evaluation = evaluation_map.get(foundation_id)
+            pending_ids = {f.get("_id") or f.get("id") for f in pending}
+            for evaluation in parsed_output.evaluations:
+                if evaluation.foundation_id in pending_ids:
+                    evaluations[evaluation.foundation_id] = evaluation
+            pending = [f for f in pending if (f.get("_id") or f.get("id")) not in evaluations]
 
-            if evaluation:
-                # Convert evaluation to FoundationScore
-                scored = self._convert_to_foundation_score(foundation, evaluation)
-                scored_foundations.append(scored)
-            else:
-                # If LLM didn't evaluate this foundation, it's a critical error
-                error_msg = f"FATAL: LLM failed to return an evaluation for foundation ID: {foundation_id}. Halting process."
-                logger.error(error_msg)
-                raise ValueError(error_msg)
+        return list(evaluations.values())
 
-        return scored_foundations
+    async def _invoke_scoring_llm(
+        self, project: ProjectDescription, candidate_foundations: List[Dict[str, Any]]
+    ) -> ScoringResponse:
+        """Run a single structured-output scoring call for the given candidates."""
+        # Build prompt with project and foundation details
+        prompt = self._create_scoring_prompt()
+        with stage("prompt_build"):
+            inputs = self._prompt_inputs(project, candidate_foundations)
+
+        # Invoke LLM with structured output
+        chain = prompt | self.structured_llm
+
+        logger.info(f"Invoking LLM for evaluation of {len(candidate_foundations)} foundations...")
+        started = time.perf_counter()
+        parsed_output: ScoringResponse = await chain.ainvoke(inputs)
+        self._trace_llm_call("detail", prompt, inputs, candidate_foundations, started)
+
+        if len(parsed_output.evaluations) != len(candidate_foundations):
+            logger.warning(
+                f"LLM returned a different number of evaluations ({len(parsed_output.evaluations)}) than candidates provided ({len(candidate_foundations)})."
+            )
+        return parsed_output
+
+    async def _invoke_ranking_llm(
+        self, project: ProjectDescription, candidate_foundations: List[Dict[str, Any]]
+    ) -> RankingResponse:
+        """Run a single score-only ranking call for the given candidates."""
+        prompt = self._create_ranking_prompt()
+        with stage("prompt_build"):
+            inputs = self._prompt_inputs(project, candidate_foundations)
+        chain = prompt | self.structured_ranking_llm
+        logger.info(f"Invoking LLM for ranking of {len(candidate_foundations)} foundations...")
+        started = time.perf_counter()
+        parsed_output: RankingResponse = await chain.ainvoke(inputs)
+        self._trace_llm_call("ranking", prompt, inputs, candidate_foundations, started)
+        return parsed_output
+
+    @staticmethod
+    def _trace_llm_call(
+        tier: str,
+        prompt: ChatPromptTemplate,
+        inputs: Dict[str, str],
+        candidate_foundations: List[Dict[str, Any]],
+        started: float,
+    ) -> None:
+        """Record a finished LLM call and the size of its prompt in the explain trace."""
+        trace = current_trace()
+        if trace is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        text = "\n".join(str(message.content) for message in prompt.format_messages(**inputs))
+        prompt_tokens = get_context_packer().count_tokens(text)
+        trace.prompt_chars += len(text)
+        trace.prompt_tokens += prompt_tokens
+        trace.llm_calls.append(
+            {
+                "tier": tier,
+                "foundation_ids": [f.get("_id") or f.get("id") for f in candidate_foundations],
+                "prompt_chars": len(text),
+                "prompt_tokens": prompt_tokens,
+                "ms": round(elapsed, 1),
+            }
+        )
+
+    def _prompt_inputs(
+        self, project: ProjectDescription, candidate_foundations: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Variables of the scoring and ranking prompts."""
+        # Format foundations for prompt
+        foundations_text = self._format_foundations_for_prompt(candidate_foundations)
+        logger.debug(f"Formatted prompt text length: {len(foundations_text)}")
+
+        charitable_purposes_str = ", ".join(
+            [p.value for p in project.charitable_purpose]
+        )
+        project_description = get_context_packer().truncate(
+            project.description, settings.SCORING_PROMPT_PROJECT_TOKENS
+        )
+        return {
+            "project_name": project.name,
+            "project_description": project_description,
+            "target_group": project.target_group,
+            "charitable_purpose": charitable_purposes_str,
+            "foundations": foundations_text,
+        }
 
     def _create_scoring_prompt(self) -> ChatPromptTemplate:
         """Create the prompt template for foundation scoring."""
@@ -338,41 +1455,115 @@ WICHTIG:
             [("system", system_message), ("human", human_message)]
         )
 
+    def _create_ranking_prompt(self) -> ChatPromptTemplate:
+        """Create the prompt template for the score-only ranking tier."""
+
+        system_message = """Du bist ein erfahrener Experte für die Bewertung von Stiftungsanträgen in Deutschland.
+Deine Aufgabe ist es, zu beurteilen, wie gut Stiftungen zu einem Projekt passen.
+
+RICHTLINIEN:
+1. Berücksichtige: gemeinnützige Zwecke, Förderbereich, Förderhöhe, Antragsprozess, vergangene Projekte
+2. Vergib Match-Scores zwischen 0.0 (kein Match) und 1.0 (perfekter Match)
+3. Gib ausschließlich Scores zurück, keine Begründungen"""
+
+        human_message = """Bewerte die folgenden Stiftungen für das folgende Projekt:
+
+PROJEKT:
+Name: {project_name}
+Beschreibung: {project_description}
+Zielgruppe: {target_group}
+Gemeinnützige Zwecke: {charitable_purpose}
+
+KANDIDATEN-STIFTUNGEN:
+{foundations}
+
+AUFGABE:
+Gib für JEDE Stiftung die foundation_id und einen match_score zwischen 0.0 und 1.0 an,
+der die Gesamtkompatibilität widerspiegelt."""
+
+        return ChatPromptTemplate.from_messages(
+            [("system", system_message), ("human", human_message)]
+        )
+
+    def _heuristic_scores(
+        self,
+        project: ProjectDescription,
+        candidate_foundations: List[Dict[str, Any]],
+        limit: int,
+    ) -> List[FoundationScore]:
+        """Score candidates with the heuristic pre-ranker only (LLM fallback)."""
+        preranker = get_heuristic_preranker()
+        return [
+            self._convert_to_foundation_score(
+                foundation, preranker.evaluation(project, foundation, score)
+            )
+            for foundation, score in preranker.rank(project, candidate_foundations)[:limit]
+        ]
+
     def _format_foundations_for_prompt(self, foundations: List[Dict[str, Any]]) -> str:
-        """Format foundation data for inclusion in the prompt."""
+        """
+        Format foundation data for inclusion in the prompt.
+
+        Each foundation gets SCORING_PROMPT_TOKENS_PER_FOUNDATION tokens. ID,
+        name and funding are always included; purposes, the description (up to
+        half the budget) and past projects, in this order of priority, fill the
+        rest. Past projects most similar to the project come first (see
+        past_project_index_service), otherwise the earliest listed.
+
+        A foundation with an up-to-date brief (see foundation_brief_service)
+        gets the brief instead of the description and past projects, followed
+        by its most similar past project if the past project index found one.
+        """
+        packer = get_context_packer()
         formatted = []
 
         for i, foundation in enumerate(foundations, 1):
-            foundation_id = foundation.get("_id") or foundation.get("id", "")
-            name = foundation.get("name", "Unbekannt")
-            long_desc = foundation.get("long_description", "")
-            zwecke = ", ".join(foundation.get("gemeinnuetzige_zwecke", []))
-            foerderbereich = foundation.get("foerderbereich", {})
-            scope = foerderbereich.get("scope", "unbekannt")
-            foerderhoehe = foundation.get("foerderhoehe") or {}
-            min_amount = foerderhoehe.get("min_amount") or 0
-            max_amount = foerderhoehe.get("max_amount") or 0
-            antragsprozess = foundation.get("antragsprozess", {})
-
-            # Format past projects
-            past_projects = foundation.get("past_projects", [])
-            projects_text = ""
-            if past_projects:
-                projects_text = "\nVergangene Projekte:\n"
-                for proj in past_projects[:3]:  # Limit to 3 for prompt size
-                    projects_text += f"- {proj.get('name', 'Unbekannt')}: {proj.get('description', '')}\n"
-
-            foundation_text = f"""
-STIFTUNG {i}:
-ID: {foundation_id}
-Name: {name}
-Gemeinnützige Zwecke: {zwecke}
-Förderbereich: {scope}
-Förderhöhe: {min_amount:,.0f}€ - {max_amount:,.0f}€
-Beschreibung: {long_desc[:500]}{"..." if len(long_desc) > 500 else ""}
-{projects_text}
-"""
-            formatted.append(foundation_text)
+            parts = get_derived_fields(foundation)["prompt_parts"]
+            past_projects = parts["past_projects"]
+            order = [p for p in foundation.get("past_project_order") or [] if p < len(past_projects)]
+            if order:
+                ordered = set(order)
+                past_projects = [past_projects[p] for p in order] + [
+                    line for p, line in enumerate(past_projects) if p not in ordered
+                ]
+            if foundation.get("brief"):
+                block = "\n".join(
+                    [
+                        parts["header"],
+                        parts["purposes"],
+                        parts["funding"],
+                        "Kurzprofil:\n"
+                        + packer.truncate(foundation["brief"], settings.SCORING_PROMPT_BRIEF_TOKENS),
+                    ]
+                )
+                if order:
+                    block += "\n\nÄhnlichstes vergangenes Projekt:\n" + packer.truncate(
+                        past_projects[0], settings.SCORING_PROMPT_BRIEF_TOKENS // 2
+                    )
+                formatted.append(f"\nSTIFTUNG {i}:\n{block}\n")
+                continue
+            # Reserve room for the "Vergangene Projekte" heading
+            budget = settings.SCORING_PROMPT_TOKENS_PER_FOUNDATION - packer.count_tokens(
+                "\nVergangene Projekte:"
+            )
+            segments = [
+                ContextSegment(parts["header"], priority=4, truncatable=False),
+                ContextSegment(parts["purposes"], priority=3, min_tokens=24),
+                ContextSegment(parts["funding"], priority=4, truncatable=False),
+                # At most half the budget so past projects still fit
+                ContextSegment(packer.truncate(parts["description"], budget // 2), priority=2, min_tokens=32),
+            ] + [
+                # Most similar (or earlier) projects first
+                ContextSegment(project_line, priority=1 - j / (len(past_projects) + 1), min_tokens=16)
+                for j, project_line in enumerate(past_projects)
+            ]
+            packed = packer.select(segments, budget)
+
+            block = "\n".join(text for text in packed[:4] if text is not None)
+            project_lines = [text for text in packed[4:] if text is not None]
+            if project_lines:
+                block += "\n\nVergangene Projekte:\n" + "\n".join(project_lines)
+            formatted.append(f"\nSTIFTUNG {i}:\n{block}\n")
 
         return "\n".join(formatted)
 
@@ -391,6 +1582,14 @@ Beschreibung: {long_desc[:500]}{"..." if len(long_desc) > 500 else ""}
             matches.append(MatchItem(text=fit_text, type="fit"))
         for mismatch_text in evaluation.mismatches:
             matches.append(MatchItem(text=mismatch_text, type="mismatch"))
+        antragsprozess = foundation.get("antragsprozess")
+        if settings.SCORING_EXPIRED_DEADLINES == "mark" and is_deadline_expired(antragsprozess):
+            matches.append(
+                MatchItem(
+                    text=f"Bewerbungsfrist abgelaufen ({antragsprozess.get('deadline_date')})",
+                    type="mismatch",
+                )
+            )
         for question_text in evaluation.questions:
             matches.append(MatchItem(text=question_text, type="question"))
 
@@ -398,57 +1597,9 @@ Beschreibung: {long_desc[:500]}{"..." if len(long_desc) > 500 else ""}
         zwecke = foundation.get("gemeinnuetzige_zwecke", [])
         purpose = zwecke[0] if zwecke else "Allgemeine Förderung"
 
-        # Format funding amount
-        funding_amount = self._format_funding_amount(foundation.get("foerderhoehe", {}))
-
-        # Handle foerderhoehe with category-based defaults
-        foerderhoehe_raw = foundation.get("foerderhoehe", {})
-        if not isinstance(foerderhoehe_raw, dict):
-            foerderhoehe_raw = {}
-
-        if foerderhoehe_raw:
-            category = foerderhoehe_raw.get("category")
-            min_amount = foerderhoehe_raw.get("min_amount")
-            max_amount = foerderhoehe_raw.get("max_amount")
-
-            if min_amount is None or max_amount is None:
-                logger.debug(
-                    f"Applying default funding amounts for category '{category}' for foundation {foundation_id}."
-                )
-                category_lower = str(category).lower() if category else ""
-                if category_lower in ["large", "großförderung", "grossfoerderung"]:
-                    foerderhoehe_raw["min_amount"] = (
-                        min_amount if min_amount is not None else 50000
-                    )
-                    foerderhoehe_raw["max_amount"] = (
-                        max_amount if max_amount is not None else 200000
-                    )
-                elif category_lower in ["small", "kleinförderung", "kleinfoerderung"]:
-                    foerderhoehe_raw["min_amount"] = (
-                        min_amount if min_amount is not None else 0
-                    )
-                    foerderhoehe_raw["max_amount"] = (
-                        max_amount if max_amount is not None else 5000
-                    )
-                elif category_lower in [
-                    "medium",
-                    "mittelgroße förderung",
-                    "mittelgrosse foerderung",
-                ]:
-                    foerderhoehe_raw["min_amount"] = (
-                        min_amount if min_amount is not None else 5000
-                    )
-                    foerderhoehe_raw["max_amount"] = (
-                        max_amount if max_amount is not None else 50000
-                    )
-
-        # Sanitize antragsprozess to remove AI reasoning contamination
-        antragsprozess_raw = foundation.get("antragsprozess")
-        antragsprozess_clean = (
-            self._sanitize_antragsprozess(antragsprozess_raw)
-            if isinstance(antragsprozess_raw, dict)
-            else {}
-        )
+        # Funding defaults, funding string and sanitized antragsprozess are
+        # precomputed when the foundation is written (see derivation_service)
+        derived = get_derived_fields(foundation)
 
         score = FoundationScore(
             id=foundation_id,
@@ -458,17 +1609,17 @@ Beschreibung: {long_desc[:500]}{"..." if len(long_desc) > 500 else ""}
             description=foundation.get(
                 "short_description", "Keine Beschreibung verfügbar."
             ),
-            funding_amount=funding_amount,
+            funding_amount=derived["funding_amount"],
             match_score=evaluation.match_score,
             matches=matches,
             long_description=foundation.get("long_description", ""),
             legal_form=foundation.get("legal_form", "Stiftung"),
             gemeinnuetzige_zwecke=zwecke,
-            antragsprozess=antragsprozess_clean,
+            antragsprozess=derived["antragsprozess"],
             foerderbereich=foundation.get("foerderbereich")
             if isinstance(foundation.get("foerderbereich"), dict)
             else {},
-            foerderhoehe=foerderhoehe_raw,
+            foerderhoehe=derived["foerderhoehe"],
             contact=foundation.get("contact")
             if isinstance(foundation.get("contact"), dict)
             else {},
@@ -480,87 +1631,6 @@ Beschreibung: {long_desc[:500]}{"..." if len(long_desc) > 500 else ""}
         logger.debug(f"Successfully created FoundationScore for {foundation_id}.")
         return score
 
-    def _sanitize_rolling_info(self, rolling_info: Optional[str]) -> Optional[str]:
-        """
-        Clean up rolling_info field to remove AI reasoning contamination.
-        
-        Removes internal notes, translations, and reasoning that may have been
-        included in the data from AI-generated content.
-        """
-        if not rolling_info:
-            return rolling_info
-        
-        # List of markers that indicate reasoning contamination
-        contamination_markers = [
-            "Translation:",
-            "Text used:",
-            "Note:",
-            "JSON Construction:",
-            "Wait,",
-            "Snippet",
-            "Setting deadline_type",
-            "(Translation:",
-            "Decision timeline:",
-            "Required documents:",
-            "Evaluation process:"
-        ]
-        
-        # Find the earliest contamination marker
-        earliest_pos = len(rolling_info)
-        for marker in contamination_markers:
-            pos = rolling_info.find(marker)
-            if pos != -1 and pos < earliest_pos:
-                earliest_pos = pos
-        
-        # Clean the text up to the contamination marker
-        clean_text = rolling_info[:earliest_pos].strip()
-        
-        # Remove trailing incomplete sentences
-        if clean_text and not clean_text.endswith(('.', '!', '?')):
-            # Find the last complete sentence
-            last_period = clean_text.rfind('.')
-            if last_period > 0:
-                clean_text = clean_text[:last_period + 1]
-        
-        # If we cleaned too much or got empty string, provide fallback
-        if not clean_text or len(clean_text) < 10:
-            return "Anträge sind fortlaufend möglich"
-        
-        # Limit to first 2-3 sentences if still too long
-        if len(clean_text) > 300:
-            sentences = clean_text.split('. ')
-            clean_text = '. '.join(sentences[:2]) + '.'
-        
-        return clean_text
-
-    def _sanitize_antragsprozess(self, antragsprozess: Dict[str, Any]) -> Dict[str, Any]:
-        """Sanitize application process data, particularly the rolling_info field."""
-        if not isinstance(antragsprozess, dict):
-            return antragsprozess
-        
-        # Create a copy to avoid modifying the original
-        sanitized = antragsprozess.copy()
-        
-        # Clean the rolling_info field if it exists
-        if "rolling_info" in sanitized and sanitized["rolling_info"]:
-            sanitized["rolling_info"] = self._sanitize_rolling_info(sanitized["rolling_info"])
-        
-        return sanitized
-
-    def _format_funding_amount(self, foerderhoehe: Dict[str, Any]) -> str:
-        """Format funding amount for display."""
-        if not isinstance(foerderhoehe, dict):
-            return "Förderhöhe nicht angegeben"
-
-        max_amount = foerderhoehe.get("max_amount")
-
-        if not max_amount:
-            return "Förderhöhe nicht angegeben"
-
-        # Format with dots as thousands separators (German style)
-        formatted = f"{max_amount:,.0f}".replace(",", ".")
-        return f"Bis zu {formatted} €"
-
 
 # Global service instance
 _scoring_service = None
@@ -590,3 +1660,28 @@ async def score_foundations(
     """
     service = get_scoring_service()
     return await service.score_foundations(project, limit, db)
+
+
+async def stream_foundation_scores(
+    project: ProjectDescription, limit: int = 5, db: AsyncIOMotorDatabase = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Convenience function to score foundations with progress events.
+
+    See ScoringService.stream_foundation_scores for the event format.
+    """
+    service = get_scoring_service()
+    async for event in service.stream_foundation_scores(project, limit, db):
+        yield event
+
+
+async def explain_scoring(
+    project: ProjectDescription, limit: int = 5, db: AsyncIOMotorDatabase = None
+) -> Tuple[List[FoundationScore], ScoringExplain]:
+    """
+    Convenience function to score foundations with the candidate funnel and stage timings.
+
+    See ScoringService.score_foundations_explained.
+    """
+    service = get_scoring_service()
+    return await service.score_foundations_explained(project, limit, db)
@@ -0,0 +1,52 @@
+"""
+Per-request trace of the scoring pipeline (explain mode).
+
+``trace_scoring()`` starts a ScoringExplain trace for the current task. The
+pipeline records its funnel into ``current_trace()`` and times its stages with
+``stage()``; both are no-ops while no trace is active, so regular requests pay
+nothing. The trace is held in a context variable: the LLM shard tasks a
+request starts inherit it and record into the same trace.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.models.scores import ScoringExplain
+
+_current_trace: ContextVar[Optional[ScoringExplain]] = ContextVar("scoring_trace", default=None)
+
+
+def current_trace() -> Optional[ScoringExplain]:
+    """The trace of the current request, if explain mode is on."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_scoring() -> Iterator[ScoringExplain]:
+    """Collect a trace of the scoring calls made inside the block."""
+    trace = ScoringExplain()
+    token = _current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.timings_ms["total"] = (time.perf_counter() - started) * 1000
+        trace.timings_ms = {name: round(ms, 1) for name, ms in trace.timings_ms.items()}
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the wall time of the block to the stage ``name`` of the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        trace.timings_ms[name] = trace.timings_ms.get(name, 0.0) + elapsed
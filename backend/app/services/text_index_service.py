@@ -0,0 +1,398 @@
+"""
+In-process BM25 full-text index over the foundation catalog.
+
+Replaces the MongoDB ``$text`` stage for candidate retrieval: the index lives in
+memory, uses a German analyzer (umlaut folding, CISTEM stemming, compound
+splitting) and is built off the event loop. When foundations change, only
+their postings are replaced (see index_refresh_service).
+"""
+
+import heapq
+import logging
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.index_refresh_service import RefreshingIndex
+
+logger = logging.getLogger(__name__)
+
+
+# Small German stopword list; the catalog texts are long enough that removing
+# function words matters much more for BM25 than a complete list would.
+GERMAN_STOPWORDS = {
+    "aber", "alle", "allem", "allen", "aller", "alles", "als", "also", "am", "an",
+    "ander", "andere", "anderen", "auch", "auf", "aus", "bei", "beim", "bin", "bis",
+    "bist", "da", "damit", "dann", "das", "dass", "dein", "dem", "den", "denn",
+    "der", "des", "dich", "die", "dies", "diese", "diesem", "diesen", "dieser",
+    "dieses", "dir", "doch", "dort", "du", "durch", "ein", "eine", "einem",
+    "einen", "einer", "eines", "er", "es", "etwas", "euch", "euer", "fuer",
+    "für", "gegen", "hab", "habe", "haben", "hat", "hatte", "hier", "hin",
+    "ich", "ihr", "ihre", "ihrem", "ihren", "ihrer", "im", "in", "ins", "ist",
+    "jede", "jedem", "jeden", "jeder", "jedes", "kann", "kein", "keine", "mit",
+    "muss", "nach", "nicht", "noch", "nur", "ob", "oder", "ohne", "sehr", "sein",
+    "seine", "seinem", "seinen", "seiner", "sich", "sie", "sind", "so", "soll",
+    "sollen", "sowie", "um", "und", "uns", "unser", "unsere", "unter", "vom",
+    "von", "vor", "wann", "war", "waren", "was", "weil", "wenn", "werden", "wie",
+    "wir", "wird", "wo", "zu", "zum", "zur", "ueber", "über",
+}
+
+_TOKEN_RE = re.compile(r"[a-zäöüß0-9]+")
+
+# CISTEM stemmer (Weissweiler & Fraser, 2017) - small, fast and well suited for German.
+_STRIP_GE = re.compile(r"^ge(.{4,})")
+_REPL_XX = re.compile(r"(.)\1")
+_STRIP_EMR = re.compile(r"e[mr]$")
+_STRIP_ND = re.compile(r"nd$")
+_STRIP_T = re.compile(r"t$")
+_STRIP_ESN = re.compile(r"[esn]$")
+_REPL_XX_BACK = re.compile(r"(.)\*")
+
+# Linking morphemes ("Fugenelemente") that may sit between compound parts
+_LINKING_SUFFIXES = ("", "s", "es", "n", "en", "e")
+
+# Cached compound splits; query words are cached too, so the cache is bounded
+_SPLIT_CACHE_SIZE = 100_000
+
+
+def fold_umlauts(text: str) -> str:
+    """Fold umlauts and their ASCII transliterations to the plain vowel."""
+    text = text.replace("ä", "a").replace("ö", "o").replace("ü", "u").replace("ß", "ss")
+    return text.replace("ae", "a").replace("oe", "o").replace("ue", "u")
+
+
+def cistem_stem(word: str) -> str:
+    """Stem an already lowercased, umlaut-folded German word with CISTEM."""
+    if not word:
+        return word
+
+    word = _STRIP_GE.sub(r"\1", word)
+    word = word.replace("sch", "$").replace("ei", "%").replace("ie", "&")
+    word = _REPL_XX.sub(r"\1*", word)
+
+    while len(word) > 3:
+        if len(word) > 5:
+            word, stripped = _STRIP_EMR.subn("", word)
+            if stripped:
+                continue
+            word, stripped = _STRIP_ND.subn("", word)
+            if stripped:
+                continue
+        word, stripped = _STRIP_T.subn("", word)
+        if stripped:
+            continue
+        word, stripped = _STRIP_ESN.subn("", word)
+        if not stripped:
+            break
+
+    word = _REPL_XX_BACK.sub(r"\1\1", word)
+    return word.replace("%", "ei").replace("&", "ie").replace("$", "sch")
+
+
+class GermanAnalyzer:
+    """
+    Turns German text into index terms.
+
+    Pipeline: lowercase -> tokenize -> stopword removal -> umlaut folding ->
+    CISTEM stemming. Long words are additionally split into compound parts
+    against a lexicon of stems learned from the indexed corpus, so that
+    "Hausaufgabenhilfe" also matches documents talking about "Hilfe".
+    """
+
+    MIN_PART_LENGTH = 4
+    MIN_COMPOUND_LENGTH = 8
+    MAX_SPLIT_DEPTH = 3
+
+    def __init__(self):
+        self.lexicon: Set[str] = set()
+        self._split_cache: Dict[str, List[str]] = {}
+
+    def _words(self, text: str) -> List[str]:
+        words = []
+        for token in _TOKEN_RE.findall(text.lower()):
+            if token in GERMAN_STOPWORDS or len(token) < 2:
+                continue
+            words.append(fold_umlauts(token))
+        return words
+
+    def learn(self, text: str) -> None:
+        """Add the stems of all words in ``text`` to the compound lexicon."""
+        grew = False
+        for word in self._words(text):
+            if len(word) < self.MIN_PART_LENGTH:
+                continue
+            stem = cistem_stem(word)
+            if stem not in self.lexicon:
+                self.lexicon.add(stem)
+                grew = True
+        if grew:
+            self._split_cache.clear()
+
+    def analyze(self, text: str) -> List[str]:
+        """Return the list of index terms for ``text`` (with repetitions)."""
+        terms = []
+        for word in self._words(text):
+            terms.append(cistem_stem(word))
+            if len(word) >= self.MIN_COMPOUND_LENGTH:
+                terms.extend(self._compound_parts(word))
+        return terms
+
+    def _compound_parts(self, word: str) -> List[str]:
+        """Split a compound into lexicon stems, or return [] if it does not split."""
+        cached = self._split_cache.get(word)
+        if cached is None:
+            cached = self._split(word, 0) or []
+            if len(cached) < 2:
+                cached = []
+            if len(self._split_cache) >= _SPLIT_CACHE_SIZE:
+                self._split_cache.clear()
+            self._split_cache[word] = cached
+        return cached
+
+    def _split(self, word: str, depth: int) -> Optional[List[str]]:
+        if depth > 0:
+            stem = cistem_stem(word)
+            if stem in self.lexicon:
+                return [stem]
+        if depth >= self.MAX_SPLIT_DEPTH or len(word) < 2 * self.MIN_PART_LENGTH:
+            return None
+
+        # Prefer the longest known head, e.g. "hausaufgaben|hilfe" over "haus|aufgabenhilfe"
+        for i in range(len(word) - self.MIN_PART_LENGTH, self.MIN_PART_LENGTH - 1, -1):
+            head_stem = self._head_stem(word[:i])
+            if head_stem is None:
+                continue
+            rest = self._split(word[i:], depth + 1)
+            if rest:
+                return [head_stem] + rest
+        return None
+
+    def _head_stem(self, head: str) -> Optional[str]:
+        for suffix in _LINKING_SUFFIXES:
+            if suffix and not head.endswith(suffix):
+                continue
+            candidate = head[: len(head) - len(suffix)] if suffix else head
+            if len(candidate) < self.MIN_PART_LENGTH:
+                continue
+            stem = cistem_stem(candidate)
+            if stem in self.lexicon:
+                return stem
+        return None
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 ranking and incremental add/remove.
+
+    Fields are weighted by scaling their term frequencies (BM25F-style) before
+    they are merged into one bag of terms per document.
+    """
+
+    def __init__(
+        self,
+        analyzer: GermanAnalyzer,
+        field_weights: Dict[str, float],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.analyzer = analyzer
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_len: Dict[str, float] = {}
+        self.total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def term_freqs(self, fields: Dict[str, str]) -> Dict[str, float]:
+        """Field-weighted term frequencies of a document given its text per field."""
+        term_freqs: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            if not text or weight <= 0:
+                continue
+            for term in self.analyzer.analyze(text):
+                term_freqs[term] = term_freqs.get(term, 0.0) + weight
+        return term_freqs
+
+    def add(self, doc_id: str, fields: Dict[str, str]) -> None:
+        """Index (or re-index) a document given its text per field."""
+        self.add_terms(doc_id, self.term_freqs(fields))
+
+    def add_terms(self, doc_id: str, term_freqs: Dict[str, float]) -> None:
+        """Index (or re-index) a document given its term frequencies (see term_freqs)."""
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+
+        length = sum(term_freqs.values())
+        self.doc_terms[doc_id] = term_freqs
+        self.doc_len[doc_id] = length
+        self.total_len += length
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document from the index (no-op if unknown)."""
+        term_freqs = self.doc_terms.pop(doc_id, None)
+        if term_freqs is None:
+            return
+        self.total_len -= self.doc_len.pop(doc_id, 0.0)
+        for term in term_freqs:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+
+    def search(
+        self,
+        query: str,
+        candidate_ids: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank documents for ``query``.
+
+        Args:
+            query: Free text query
+            candidate_ids: Optional restriction of the result set
+            limit: Maximum number of hits to return (all hits if None)
+
+        Returns:
+            List of (doc_id, score) tuples sorted by descending score
+        """
+        n_docs = len(self.doc_len)
+        if n_docs == 0:
+            return []
+
+        allowed = set(candidate_ids) if candidate_ids is not None else None
+        avg_len = self.total_len / n_docs if self.total_len else 1.0
+
+        query_terms: Dict[str, int] = {}
+        for term in self.analyzer.analyze(query):
+            query_terms[term] = query_terms.get(term, 0) + 1
+
+        scores: Dict[str, float] = {}
+        for term, query_tf in query_terms.items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_tf * idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        if limit is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+# Fields loaded from MongoDB to build the index
+TEXT_INDEX_PROJECTION = {
+    "short_description": 1,
+    "long_description": 1,
+    "gemeinnuetzige_zwecke": 1,
+    "past_projects.description": 1,
+}
+
+TEXT_INDEX_FIELD_WEIGHTS = {
+    "short_description": 2.0,
+    "long_description": 1.0,
+    "gemeinnuetzige_zwecke": 1.0,
+    "past_projects": 1.5,
+}
+
+
+def foundation_text_fields(foundation: Dict[str, Any]) -> Dict[str, str]:
+    """Extract the searchable text of a foundation document per field."""
+    past_projects = foundation.get("past_projects") or []
+    return {
+        "short_description": foundation.get("short_description") or "",
+        "long_description": foundation.get("long_description") or "",
+        "gemeinnuetzige_zwecke": " ".join(foundation.get("gemeinnuetzige_zwecke") or []),
+        "past_projects": " ".join(
+            project.get("description") or ""
+            for project in past_projects
+            if isinstance(project, dict)
+        ),
+    }
+
+
+class FoundationTextIndex(RefreshingIndex):
+    """BM25 index over the foundation catalog, loaded lazily from MongoDB."""
+
+    name = "BM25 text index"
+    projection = TEXT_INDEX_PROJECTION
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = GermanAnalyzer()
+        self.index = BM25Index(self.analyzer, TEXT_INDEX_FIELD_WEIGHTS)
+
+    def _build(self, foundations: List[Dict[str, Any]]) -> Tuple[GermanAnalyzer, BM25Index]:
+        analyzer = GermanAnalyzer()
+        index = BM25Index(analyzer, TEXT_INDEX_FIELD_WEIGHTS)
+        documents = [
+            (foundation["_id"], foundation_text_fields(foundation))
+            for foundation in foundations
+            if foundation.get("_id") is not None
+        ]
+        # Learn the whole lexicon first so compound splitting is order independent
+        for _, fields in documents:
+            for text in fields.values():
+                analyzer.learn(text)
+        for doc_id, fields in documents:
+            index.add(doc_id, fields)
+        return analyzer, index
+
+    def _swap(self, built: Tuple[GermanAnalyzer, BM25Index]) -> None:
+        self.analyzer, self.index = built
+
+    def _patch(
+        self, foundations: List[Dict[str, Any]], removed_ids: Set[str]
+    ) -> Tuple[List[Tuple[str, Dict[str, float]]], Set[str]]:
+        # Analyzing is the expensive part and runs here; the analyzer only gains
+        # lexicon stems and cached splits, which concurrent searches can live with
+        documents = [
+            (foundation["_id"], foundation_text_fields(foundation)) for foundation in foundations
+        ]
+        for _, fields in documents:
+            for text in fields.values():
+                self.analyzer.learn(text)
+        return [(doc_id, self.index.term_freqs(fields)) for doc_id, fields in documents], removed_ids
+
+    def _apply_patch(self, patch: Tuple[List[Tuple[str, Dict[str, float]]], Set[str]]) -> None:
+        # Swapping postings of a few documents is cheap enough for the event loop
+        documents, removed_ids = patch
+        for doc_id in removed_ids:
+            self.index.remove(doc_id)
+        for doc_id, term_freqs in documents:
+            self.index.add_terms(doc_id, term_freqs)
+
+    def _describe(self) -> str:
+        return f"over {len(self.index)} foundations ({len(self.index.postings)} terms)"
+
+    def search(
+        self, text: str, candidate_ids: Optional[Iterable[str]] = None, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Rank foundations for ``text``, optionally restricted to ``candidate_ids``."""
+        return self.index.search(text, candidate_ids, limit)
+
+
+# Global index instance
+_foundation_text_index = None
+
+
+def get_foundation_text_index() -> FoundationTextIndex:
+    """Get or create the global foundation text index."""
+    global _foundation_text_index
+    if _foundation_text_index is None:
+        _foundation_text_index = FoundationTextIndex()
+    return _foundation_text_index
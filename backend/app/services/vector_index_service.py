@@ -0,0 +1,270 @@
+"""
+In-memory hashed TF-IDF index over the foundation catalog.
+
+Every foundation is a sparse row of hashed features (analyzer terms plus
+character n-grams of the folded words). A project is scored against the whole
+catalog with a single vectorized sparse matrix-vector product in NumPy, which
+tolerates paraphrases and inflected or compounded forms better than pure term
+matching.
+"""
+
+import logging
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.index_refresh_service import RefreshingIndex
+from app.services.text_index_service import (
+    GermanAnalyzer,
+    TEXT_INDEX_FIELD_WEIGHTS,
+    TEXT_INDEX_PROJECTION,
+    foundation_text_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HashingVectorizer:
+    """Maps text to sparse hashed feature counts (feature index -> weight)."""
+
+    NGRAM_SIZE = 4
+    NGRAM_WEIGHT = 0.25
+
+    def __init__(self, analyzer: GermanAnalyzer, n_features: int):
+        self.analyzer = analyzer
+        self.n_features = n_features
+
+    def _bucket(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self.n_features
+
+    def features(self, text: str, weight: float = 1.0) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        n = self.NGRAM_SIZE
+        for term in self.analyzer.analyze(text):
+            bucket = self._bucket(term)
+            counts[bucket] = counts.get(bucket, 0.0) + weight
+            padded = f"<{term}>"
+            for i in range(len(padded) - n + 1):
+                bucket = self._bucket("#" + padded[i : i + n])
+                counts[bucket] = counts.get(bucket, 0.0) + weight * self.NGRAM_WEIGHT
+        return counts
+
+    def document_features(self, fields: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+        counts: Dict[int, float] = {}
+        for field, text in fields.items():
+            weight = TEXT_INDEX_FIELD_WEIGHTS.get(field, 1.0)
+            if not text or weight <= 0:
+                continue
+            for bucket, value in self.features(text, weight).items():
+                counts[bucket] = counts.get(bucket, 0.0) + value
+        buckets = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return buckets, values
+
+
+class TfidfMatrix:
+    """
+    Column-major (CSC) TF-IDF matrix with L2-normalized rows.
+
+    Rows are kept as per-document feature arrays so single documents can be
+    added or removed without re-analyzing the others; the packed arrays are
+    rebuilt lazily on the next query after a change. FoundationVectorIndex
+    changes a copy in its worker thread and packs it there before swapping it
+    in, so its searches never pack. Queries only touch the columns of their own
+    features, so latency depends on query length rather than catalog size.
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer):
+        self.vectorizer = vectorizer
+        self.rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty = True
+        self.doc_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.col_ptr = np.zeros(vectorizer.n_features + 1, dtype=np.int64)
+        self.row_indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(vectorizer.n_features, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def copy(self) -> "TfidfMatrix":
+        """Unpacked copy sharing the row arrays (rows are replaced, never changed)."""
+        matrix = TfidfMatrix(self.vectorizer)
+        matrix.rows = dict(self.rows)
+        return matrix
+
+    def add(self, doc_id: str, fields: Dict[str, str]) -> None:
+        self.rows[doc_id] = self.vectorizer.document_features(fields)
+        self._dirty = True
+
+    def remove(self, doc_id: str) -> None:
+        if self.rows.pop(doc_id, None) is not None:
+            self._dirty = True
+
+    def pack(self) -> None:
+        """(Re-)build the packed column arrays from the row dictionary."""
+        n_features = self.vectorizer.n_features
+        self.doc_ids = list(self.rows.keys())
+        self.row_of = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        n_docs = len(self.doc_ids)
+
+        if n_docs:
+            indices = np.concatenate([self.rows[doc_id][0] for doc_id in self.doc_ids])
+            counts = np.concatenate([self.rows[doc_id][1] for doc_id in self.doc_ids])
+            lengths = [self.rows[doc_id][0].size for doc_id in self.doc_ids]
+        else:
+            indices = np.zeros(0, dtype=np.int32)
+            counts = np.zeros(0, dtype=np.float32)
+            lengths = []
+        nnz_rows = np.repeat(np.arange(n_docs, dtype=np.int32), lengths)
+
+        col_counts = np.bincount(indices, minlength=n_features)
+        idf = (np.log((1.0 + n_docs) / (1.0 + col_counts)) + 1.0).astype(np.float32)
+
+        # Sublinear tf, idf weighting and row-wise L2 normalization
+        data = np.log1p(counts) * idf[indices]
+        norms = np.sqrt(np.bincount(nnz_rows, weights=data * data, minlength=n_docs))
+        norms[norms == 0] = 1.0
+        data = data / norms[nnz_rows]
+
+        order = np.argsort(indices, kind="stable")
+        col_ptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(col_counts, out=col_ptr[1:])
+
+        self.col_ptr = col_ptr
+        self.row_indices = nnz_rows[order]
+        self.data = data[order].astype(np.float32)
+        self.idf = idf
+        self._dirty = False
+
+    def _query_weights(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        features = self.vectorizer.features(text)
+        buckets = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+        counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+        weights = np.log1p(counts) * self.idf[buckets]
+        norm = float(np.sqrt(np.dot(weights, weights)))
+        if norm > 0:
+            weights = weights / norm
+        return buckets, weights
+
+    def search(
+        self,
+        text: str,
+        candidate_ids: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Cosine similarity of ``text`` against all (or the candidate) rows."""
+        if not self.rows:
+            return []
+        if self._dirty:
+            self.pack()
+
+        buckets, weights = self._query_weights(text)
+        if buckets.size == 0:
+            return []
+
+        # Gather the non-zeros of all query columns at once ...
+        starts = self.col_ptr[buckets]
+        lengths = self.col_ptr[buckets + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        # ... and accumulate the sparse matrix-vector product per row
+        scores = np.bincount(
+            self.row_indices[offsets],
+            weights=self.data[offsets] * np.repeat(weights, lengths),
+            minlength=len(self.doc_ids),
+        )
+
+        if candidate_ids is not None:
+            rows = np.fromiter(
+                (self.row_of[c] for c in candidate_ids if c in self.row_of), dtype=np.int64
+            )
+        else:
+            rows = np.arange(len(self.doc_ids))
+        rows = rows[scores[rows] > 0]
+        if rows.size == 0:
+            return []
+
+        if limit is not None and rows.size > limit:
+            top = np.argpartition(-scores[rows], limit - 1)[:limit]
+            rows = rows[top]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [(self.doc_ids[row], float(scores[row])) for row in rows]
+
+
+class FoundationVectorIndex(RefreshingIndex):
+    """Hashed TF-IDF matrix over the foundation catalog, loaded lazily from MongoDB."""
+
+    name = "TF-IDF matrix"
+    projection = TEXT_INDEX_PROJECTION
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = GermanAnalyzer()
+        self.matrix = TfidfMatrix(
+            HashingVectorizer(self.analyzer, settings.VECTOR_INDEX_FEATURES)
+        )
+
+    def _build(self, foundations: List[Dict[str, Any]]) -> Tuple[GermanAnalyzer, TfidfMatrix]:
+        analyzer = GermanAnalyzer()
+        matrix = TfidfMatrix(HashingVectorizer(analyzer, settings.VECTOR_INDEX_FEATURES))
+        documents = [
+            (foundation["_id"], foundation_text_fields(foundation))
+            for foundation in foundations
+            if foundation.get("_id") is not None
+        ]
+        for _, fields in documents:
+            for text in fields.values():
+                analyzer.learn(text)
+        for doc_id, fields in documents:
+            matrix.add(doc_id, fields)
+        # Pack in the worker thread, never on the first request
+        matrix.pack()
+        return analyzer, matrix
+
+    def _swap(self, built: Tuple[GermanAnalyzer, TfidfMatrix]) -> None:
+        self.analyzer, self.matrix = built
+
+    def _patch(
+        self, foundations: List[Dict[str, Any]], removed_ids: Set[str]
+    ) -> Tuple[GermanAnalyzer, TfidfMatrix]:
+        # Only the changed rows are vectorized; idf and norms need a full repack anyway
+        documents = [
+            (foundation["_id"], foundation_text_fields(foundation)) for foundation in foundations
+        ]
+        for _, fields in documents:
+            for text in fields.values():
+                self.analyzer.learn(text)
+        matrix = self.matrix.copy()
+        for doc_id in removed_ids:
+            matrix.remove(doc_id)
+        for doc_id, fields in documents:
+            matrix.add(doc_id, fields)
+        matrix.pack()
+        return self.analyzer, matrix
+
+    def _describe(self) -> str:
+        return f"over {len(self.matrix)} foundations ({self.matrix.data.size} non-zeros)"
+
+    def search(
+        self, text: str, candidate_ids: Optional[Iterable[str]] = None, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Rank foundations by cosine similarity, optionally restricted to ``candidate_ids``."""
+        return self.matrix.search(text, candidate_ids, limit)
+
+
+# Global index instance
+_foundation_vector_index = None
+
+
+def get_foundation_vector_index() -> FoundationVectorIndex:
+    """Get or create the global foundation vector index."""
+    global _foundation_vector_index
+    if _foundation_vector_index is None:
+        _foundation_vector_index = FoundationVectorIndex()
+    return _foundation_vector_index
@@ -0,0 +1,36 @@
+"""
+Train the distilled candidate ranker on logged LLM scores.
+Run with: python -m app.train_ranker
+"""
+import asyncio
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.services.distilled_ranker_service import FEATURE_NAMES, get_distilled_ranker
+
+
+async def train_ranker():
+    """Fit the ranker on the scoring_labels collection and store it in ranker_models."""
+    print("Connecting to MongoDB...")
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        model = await get_distilled_ranker().train(db)
+
+        print(f"\n📊 Trained on {model['labels']} labels (retrieval mode: {model['retrieval_mode']})")
+        for name, weight in zip(FEATURE_NAMES, model["weights"]):
+            print(f"  - {name}: {weight:+.3f}")
+        print(f"  - bias: {model['bias']:+.3f}")
+        for name, value in model["metrics"].items():
+            print(f"📊 {name}: {value:.3f}" if isinstance(value, float) else f"📊 {name}: {value}")
+        print("\n✅ Ranker stored; set SCORING_DISTILLED_RANKER=order or =score to serve it")
+    except ValueError as e:
+        print(f"❌ {e}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(train_ranker())
@@ -0,0 +1,11 @@
+"""
+Shared test setup.
+
+Settings require a MongoDB URL and a Requesty key at import time; the tests
+never connect to either, so placeholders are enough.
+"""
+
+import os
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("REQUESTY_API_KEY", "test-key")
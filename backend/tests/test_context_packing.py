@@ -0,0 +1,53 @@
+"""Tests for the token-budget context packer (with the character estimate)."""
+
+from app.services.context_packing_service import ContextPacker, ContextSegment
+
+# Without an encoding the packer counts four characters per token
+packer = ContextPacker()
+
+
+def test_count_tokens_estimate():
+    assert packer.count_tokens("") == 0
+    assert packer.count_tokens("abcd") == 1
+    assert packer.count_tokens("abcde") == 2
+
+
+def test_truncate_keeps_short_text():
+    assert packer.truncate("kurz", 10) == "kurz"
+    assert packer.truncate("kurz", 0) == ""
+
+
+def test_truncate_fits_the_budget_and_cuts_at_a_word():
+    text = " ".join(["Wort"] * 50)
+    truncated = packer.truncate(text, 10)
+    assert truncated.endswith("...")
+    assert packer.count_tokens(truncated) <= 10
+    assert truncated[:-3].split(" ") == ["Wort"] * len(truncated[:-3].split(" "))
+
+
+def test_select_packs_by_priority_in_input_order():
+    segments = [
+        ContextSegment("a" * 40, priority=0),
+        ContextSegment("b" * 40, priority=2),
+        ContextSegment("c" * 40, priority=1),
+    ]
+    # Each segment costs 10 tokens plus 1 for the separator
+    assert packer.select(segments, 22) == [None, "b" * 40, "c" * 40]
+    assert packer.pack(segments, 22) == "b" * 40 + "\n" + "c" * 40
+
+
+def test_select_truncates_or_drops_what_does_not_fit():
+    long_text = " ".join(["Wort"] * 100)
+    segments = [
+        ContextSegment("kopf", priority=2, truncatable=False),
+        ContextSegment(long_text, priority=1, min_tokens=5),
+    ]
+    header, body = packer.select(segments, 20)
+    assert header == "kopf"
+    assert body.endswith("...")
+    assert packer.count_tokens(header) + packer.count_tokens(body) + 2 <= 20
+
+    # Fewer than min_tokens left: the segment is dropped
+    assert packer.select(segments, 6)[1] is None
+    # Untruncatable segments are dropped rather than cut
+    assert packer.select([ContextSegment(long_text, truncatable=False)], 20) == [None]
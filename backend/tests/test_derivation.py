@@ -0,0 +1,95 @@
+"""Tests for the derived foundation fields and the deadline normalization."""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.services.derivation_service import (
+    DERIVED_FIELD,
+    apply_funding_defaults,
+    get_derived_fields,
+    is_current,
+    is_deadline_expired,
+    parse_deadline,
+    with_derived_fields,
+)
+
+
+def fixed(deadline_date):
+    return {"deadline_type": "fixed", "deadline_date": deadline_date}
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2024-12-31",
+        "2024-12-31T18:00:00",
+        "31.12.2024",
+        "31.12.24",
+        "2024/12/31",
+        " 31.12.2024 ",
+        datetime(2024, 12, 31, 18, 30),
+        date(2024, 12, 31),
+    ],
+)
+def test_parse_deadline_normalizes_to_midnight(value):
+    assert parse_deadline(fixed(value)) == datetime(2024, 12, 31)
+
+
+@pytest.mark.parametrize(
+    "antragsprozess",
+    [
+        fixed("Ende des Jahres"),
+        fixed(""),
+        fixed(None),
+        {"deadline_type": "rolling", "deadline_date": "2024-12-31"},
+        None,
+        "2024-12-31",
+    ],
+)
+def test_parse_deadline_rejects_rolling_and_unparseable(antragsprozess):
+    assert parse_deadline(antragsprozess) is None
+
+
+def test_is_deadline_expired():
+    today = date(2025, 1, 1)
+    assert is_deadline_expired(fixed("31.12.2024"), today)
+    assert not is_deadline_expired(fixed("01.01.2025"), today)
+    assert not is_deadline_expired({"deadline_type": "rolling"}, today)
+
+
+def test_funding_defaults_fill_missing_amounts_only():
+    assert apply_funding_defaults({"category": "small"}) == {
+        "category": "small",
+        "min_amount": 0,
+        "max_amount": 5000,
+    }
+    assert apply_funding_defaults({"category": "Medium", "max_amount": 20000})["max_amount"] == 20000
+    assert apply_funding_defaults(None) == {}
+
+
+def test_is_current_tracks_the_source_fields():
+    foundation = with_derived_fields(
+        {"_id": "f1", "name": "Stiftung", "antragsprozess": fixed("31.12.2024")}
+    )
+    derived = foundation[DERIVED_FIELD]
+    assert derived["deadline"] == datetime(2024, 12, 31)
+    assert is_current(derived, foundation)
+
+    # Fields the derivations do not read leave them current
+    assert is_current(derived, {**foundation, "website": "https://example.org"})
+    assert not is_current(derived, {**foundation, "antragsprozess": fixed("31.12.2025")})
+    assert not is_current({**derived, "version": derived["version"] - 1}, foundation)
+    assert not is_current(None, foundation)
+
+
+def test_get_derived_fields_trusts_the_stored_fields():
+    foundation = with_derived_fields({"_id": "f1", "foerderhoehe": {"category": "small"}})
+    stored = foundation[DERIVED_FIELD]
+    # Freshness is checked on write, reads return the stored fields as they are
+    changed = {**foundation, "foerderhoehe": {"category": "large"}}
+    assert get_derived_fields(changed) is stored
+
+    outdated = {**changed, DERIVED_FIELD: {**stored, "version": stored["version"] - 1}}
+    assert get_derived_fields(outdated)["foerderhoehe"]["max_amount"] == 200000
+    assert get_derived_fields({"_id": "f2"})["funding_amount"] == "Förderhöhe nicht angegeben"
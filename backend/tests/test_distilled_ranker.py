@@ -0,0 +1,62 @@
+"""Tests for the logistic-regression ranker distilled from LLM scores."""
+
+import numpy as np
+
+from app.services.distilled_ranker_service import (
+    FEATURE_NAMES,
+    DistilledRanker,
+    _sigmoid,
+    fit_logistic_regression,
+    pairwise_accuracy,
+)
+
+
+def test_fit_recovers_soft_targets():
+    rng = np.random.default_rng(0)
+    features = rng.uniform(size=(400, 3))
+    true_weights = np.array([3.0, -2.0, 0.0])
+    targets = _sigmoid(features @ true_weights - 0.5)
+
+    weights, bias = fit_logistic_regression(features, targets, l2=0.0, iterations=5000)
+    predicted = _sigmoid(features @ weights + bias)
+    assert np.abs(predicted - targets).mean() < 0.02
+    assert weights[0] > 0 > weights[1]
+
+
+def test_l2_shrinks_the_weights():
+    rng = np.random.default_rng(1)
+    features = rng.uniform(size=(200, 2))
+    targets = (features[:, 0] > 0.5).astype(np.float64)
+    weights, _ = fit_logistic_regression(features, targets, l2=0.0)
+    shrunk, _ = fit_logistic_regression(features, targets, l2=1.0)
+    assert np.linalg.norm(shrunk) < np.linalg.norm(weights)
+
+
+def test_pairwise_accuracy_counts_pairs_within_projects():
+    scores = np.array([0.9, 0.1, 0.5, 0.2, 0.3])
+    targets = np.array([1.0, 0.0, 0.2, 0.8, 0.5])
+    groups = np.array(["a", "a", "b", "b", "c"])
+    # Project a is ordered correctly, project b is not, c has a single label
+    assert pairwise_accuracy(scores, targets, groups) == 0.5
+    assert np.isnan(pairwise_accuracy(scores[4:], targets[4:], groups[4:]))
+
+
+def test_untrained_ranker_predicts_zeros_and_keeps_the_order():
+    ranker = DistilledRanker()
+    assert not ranker.ready
+    candidates = [{"_id": "f1"}, {"_id": "f2"}]
+    assert ranker.rank(None, candidates) == [(candidates[0], 0.0), (candidates[1], 0.0)]
+
+
+def test_ranker_orders_by_the_learned_weights(monkeypatch):
+    ranker = DistilledRanker()
+    ranker.weights = np.array([2.0] + [0.0] * (len(FEATURE_NAMES) - 1))
+    ranker.bias = -1.0
+    features = np.zeros((3, len(FEATURE_NAMES)))
+    features[:, 0] = [0.0, 1.0, 0.5]
+    monkeypatch.setattr(ranker, "features", lambda project, foundations: features)
+
+    candidates = [{"_id": "f1"}, {"_id": "f2"}, {"_id": "f3"}]
+    ranked = ranker.rank(None, candidates)
+    assert [foundation["_id"] for foundation, _ in ranked] == ["f2", "f3", "f1"]
+    assert np.allclose([score for _, score in ranked], _sigmoid(np.array([1.0, 0.0, -1.0])))
@@ -0,0 +1,61 @@
+"""Tests for the columnar foundation catalog filters and its incremental patching."""
+
+from datetime import date
+
+from app.models.project_description import CharitablePurpose
+from app.services.foundation_catalog_service import FoundationCatalog
+
+SPORTS = CharitablePurpose.SPORTS.value
+CULTURE = CharitablePurpose.ART_AND_CULTURE.value
+
+FOUNDATIONS = [
+    {
+        "_id": "sport",
+        "gemeinnuetzige_zwecke": [SPORTS],
+        "foerderbereich": {"scope": "regional", "specific_areas": ["Bayern"]},
+        "foerderhoehe": {"min_amount": 1000, "max_amount": 10000},
+    },
+    {
+        "_id": "kultur",
+        "gemeinnuetzige_zwecke": [CULTURE],
+        "foerderbereich": {"scope": "local", "specific_areas": ["Berlin"]},
+        "foerderhoehe": {"category": "small"},
+        "antragsprozess": {"deadline_type": "fixed", "deadline_date": "2024-12-31"},
+    },
+    {
+        "_id": "beides",
+        "gemeinnuetzige_zwecke": [SPORTS, CULTURE],
+        "foerderbereich": {"scope": "national"},
+        "foerderhoehe": {"category": "large"},
+    },
+]
+
+
+def build(foundations):
+    catalog = FoundationCatalog()
+    catalog._swap(catalog._build(foundations))
+    return catalog
+
+
+def test_filters():
+    catalog = build(FOUNDATIONS)
+    assert catalog.filter_ids(purposes=[SPORTS]) == ["sport", "beides"]
+    assert catalog.filter_ids(scopes=["local", "national"]) == ["kultur", "beides"]
+    assert catalog.filter_ids(min_funding=20000) == ["beides"]
+    assert catalog.filter_ids(max_funding=500) == ["kultur"]
+    assert catalog.filter_ids(open_on=date(2025, 1, 1)) == ["sport", "beides"]
+    assert catalog.filter_ids(regions=["de-by-muenchen"]) == ["sport", "beides"]
+
+
+def test_patch_replaces_rows_in_a_copy():
+    catalog = build(FOUNDATIONS)
+    served = catalog.purpose_mask
+    changed = [{**FOUNDATIONS[1], "gemeinnuetzige_zwecke": [SPORTS]}]
+    catalog._apply_patch(catalog._patch(changed, {"sport"}))
+
+    assert catalog.filter_ids(purposes=[SPORTS]) == ["kultur", "beides"]
+    assert catalog.filter_ids(regions=["de-by-muenchen"]) == ["beides"]
+    assert len(catalog) == 2
+    # The arrays the previous catalog served are untouched
+    assert catalog.purpose_mask is not served
+    assert served[0] != 0
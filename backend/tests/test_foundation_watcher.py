@@ -0,0 +1,38 @@
+"""Tests for the change collection of the foundation watcher."""
+
+from datetime import datetime
+
+from app.services.foundation_watcher_service import FoundationChangeWatcher, is_derived_only
+
+
+def update_event(foundation_id, updated_fields, document=None):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": foundation_id},
+        "updateDescription": {"updatedFields": updated_fields, "removedFields": []},
+        "fullDocument": document,
+    }
+
+
+def test_is_derived_only():
+    assert is_derived_only({"updatedFields": {"derived": {}, "derived.version": 2}})
+    assert not is_derived_only({"updatedFields": {"derived": {}, "name": "Neu"}})
+    assert not is_derived_only({"updatedFields": {"derived_notes": "x"}})
+    assert not is_derived_only({"updatedFields": {}, "removedFields": []})
+    assert not is_derived_only(None)
+
+
+def test_change_events_are_collected_until_flushed():
+    watcher = FoundationChangeWatcher(30.0, 60.0, 5.0)
+    watcher._handle_change_event(update_event("f1", {"derived.version": 2}))
+    assert watcher._pending == {}
+
+    first = datetime(2025, 1, 1)
+    later = datetime(2025, 1, 2)
+    watcher._handle_change_event(update_event("f1", {"name": "A"}, {"_id": "f1", "updated_at": first}))
+    watcher._handle_change_event(update_event("f1", {"name": "B"}, {"_id": "f1", "updated_at": later}))
+    watcher._handle_change_event({"operationType": "delete", "documentKey": {"_id": "f2"}})
+    # The latest document of a foundation wins, all changes go into one flush
+    assert watcher._pending == {"f1": {"_id": "f1", "updated_at": later}, "f2": None}
+    assert watcher._versions == {"f1": later}
+    assert watcher._watermark == later
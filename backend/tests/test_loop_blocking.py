@@ -0,0 +1,104 @@
+"""
+Regression tests: LLM calls in the service layer must not block the event loop.
+
+The fake model below blocks in its synchronous path and only awaits in its
+async path, so a service that calls ``invoke`` instead of ``ainvoke`` stalls
+the loop for longer than EVENT_LOOP_BLOCK_WARN_SECONDS and fails the test.
+"""
+
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.core.loop_monitor import _CHECK_INTERVAL_SECONDS, LoopMonitor
+from app.models.project_description import CharitablePurpose, ProjectDescription
+from app.models.scores import FoundationEvaluation, ScoringResponse
+from app.seed_data import MOCK_FOUNDATIONS
+from app.services.derivation_service import with_derived_fields
+from app.services.document_generation_service import DocumentGenerationService
+from app.services.scoring_service import ScoringService
+
+THRESHOLD = settings.EVENT_LOOP_BLOCK_WARN_SECONDS
+LLM_SECONDS = THRESHOLD + 0.5
+
+PROJECT = ProjectDescription(
+    name="Lernpaten",
+    description="Hausaufgabenhilfe für Kinder",
+    target_group="Kinder",
+    charitable_purpose=[CharitablePurpose.YOUTH_AND_ELDERLY_CARE],
+)
+
+
+def slow_model(response):
+    """Fake model answering ``response`` after LLM_SECONDS, blocking only when called synchronously."""
+
+    def invoke(_):
+        time.sleep(LLM_SECONDS)
+        return response
+
+    async def ainvoke(_):
+        await asyncio.sleep(LLM_SECONDS)
+        return response
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+async def max_loop_lag(awaitable):
+    """Await ``awaitable`` under a LoopMonitor and return the largest lag it saw."""
+    monitor = LoopMonitor(THRESHOLD)
+    monitor.start()
+    # Let the monitor schedule its first check before the handler runs
+    await asyncio.sleep(0)
+    try:
+        result = await awaitable
+        # A blocked loop is only measured on the monitor's next wake-up
+        await asyncio.sleep(2 * _CHECK_INTERVAL_SECONDS)
+    finally:
+        await monitor.stop()
+    return monitor.max_lag, result
+
+
+def test_harness_detects_a_blocking_handler():
+    async def blocking_handler():
+        time.sleep(LLM_SECONDS)
+
+    lag, _ = asyncio.run(max_loop_lag(blocking_handler()))
+    assert lag > THRESHOLD
+
+
+def test_scoring_llm_call_does_not_block_the_loop():
+    foundation = with_derived_fields(MOCK_FOUNDATIONS[0])
+    service = ScoringService()
+    service.structured_llm = slow_model(
+        ScoringResponse(
+            evaluations=[
+                FoundationEvaluation(
+                    foundation_id=foundation["_id"],
+                    match_score=0.8,
+                    fits=["Bildung"],
+                    mismatches=[],
+                    questions=[],
+                )
+            ]
+        )
+    )
+
+    lag, evaluations = asyncio.run(max_loop_lag(service._evaluate_shard(PROJECT, [foundation])))
+
+    assert [evaluation.foundation_id for evaluation in evaluations] == [foundation["_id"]]
+    assert lag < THRESHOLD
+
+
+def test_proofreading_does_not_block_the_loop():
+    service = DocumentGenerationService()
+    service.llm = slow_model(AIMessage(content='{"improvements": ["Eins", "Zwei", "Drei"]}'))
+
+    lag, improvements = asyncio.run(
+        max_loop_lag(service.proofread_document("Unser Projekt fördert Kinder.", "projektbeschreibung"))
+    )
+
+    assert improvements == ["Eins", "Zwei", "Drei"]
+    assert lag < THRESHOLD
@@ -0,0 +1,146 @@
+"""Tests for the IVF index over past project embeddings."""
+
+import numpy as np
+
+from app.services.past_project_index_service import (
+    IVFIndex,
+    PastProjectEmbedder,
+    PastProjectIndex,
+    past_project_texts,
+)
+from app.services.text_index_service import GermanAnalyzer
+
+DIM = 32
+
+
+def random_groups(n_groups=40, per_group=5, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = {}
+    for i in range(n_groups):
+        vectors = rng.normal(size=(per_group, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        groups[f"f{i}"] = vectors
+    return groups
+
+
+def build_index(groups):
+    index = IVFIndex(DIM)
+    for group_id, vectors in groups.items():
+        index.add(group_id, vectors, np.arange(vectors.shape[0]))
+    index.pack()
+    return index
+
+
+def exact_search(groups, query):
+    best = {group_id: float(np.max(vectors @ query)) for group_id, vectors in groups.items()}
+    return sorted(
+        ((group_id, score) for group_id, score in best.items() if score > 0),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+def test_probing_all_lists_matches_exact_search():
+    groups = random_groups()
+    index = build_index(groups)
+    query = groups["f7"][2]
+    hits = index.search(query, n_probe=index.centroids.shape[0])
+    expected = exact_search(groups, query)
+    assert [g for g, _ in hits] == [g for g, _ in expected]
+    assert np.allclose([s for _, s in hits], [s for _, s in expected], atol=1e-5)
+
+
+def test_search_finds_a_group_through_its_closest_vector():
+    groups = random_groups()
+    index = build_index(groups)
+    hits = index.search(groups["f3"][4], limit=1, n_probe=1)
+    assert hits[0][0] == "f3"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+
+
+def test_search_respects_candidates_and_limit():
+    groups = random_groups()
+    index = build_index(groups)
+    query = groups["f3"][0]
+    hits = index.search(query, candidate_ids=["f1", "f2", "unknown"], n_probe=100)
+    assert {g for g, _ in hits} <= {"f1", "f2"}
+    assert len(index.search(query, limit=3, n_probe=100)) == 3
+
+
+def test_changes_repack_on_next_search():
+    groups = random_groups()
+    index = build_index(groups)
+    index.remove("f3")
+    assert all(g != "f3" for g, _ in index.search(groups["f3"][0], n_probe=100))
+    assert len(index) == 39 * 5
+
+
+def test_group_similarities_orders_positions():
+    groups = random_groups()
+    index = build_index(groups)
+    similarity, positions = index.group_similarities(groups["f5"][3], "f5")
+    assert positions[0] == 3
+    assert abs(similarity - 1.0) < 1e-5
+    assert index.group_similarities(groups["f5"][3], "unknown") == (0.0, [])
+
+
+def test_embedder_gives_similar_texts_closer_vectors():
+    texts = [
+        "Hausaufgabenhilfe für Grundschulkinder",
+        "Hausaufgabenhilfe für Kinder in der Grundschule",
+        "Renovierung einer Dorfkirche",
+    ]
+    embedder = PastProjectEmbedder(GermanAnalyzer(), DIM * 8)
+    embedder.fit(texts)
+    vectors = embedder.embed_many(texts)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert not embedder.embed("und der die").any()
+
+
+def test_past_project_texts_skips_empty_projects():
+    foundation = {
+        "past_projects": [
+            {"name": "Lernpaten", "description": "Nachhilfe"},
+            {"name": "", "description": None},
+            "invalid",
+            {"description": "Chor"},
+        ]
+    }
+    assert past_project_texts(foundation) == [(0, "Lernpaten Nachhilfe"), (3, "Chor")]
+
+
+def test_copies_keep_their_centroids_until_the_size_doubles():
+    groups = random_groups(n_groups=40)
+    index = build_index(groups)
+    centroids = index.centroids
+
+    copy = index.copy()
+    copy.remove("f0")
+    copy.add("new", groups["f1"], np.arange(5))
+    copy.pack()
+    assert copy.centroids is centroids
+    assert len(index) == 200 and "new" not in index.groups
+
+    for group_id, vectors in random_groups(n_groups=41, seed=1).items():
+        copy.add(f"more-{group_id}", vectors, np.arange(5))
+    copy.pack()
+    assert copy.centroids is not centroids
+    assert copy.trained_size == len(copy)
+
+
+def test_patch_embeds_only_the_changed_foundations():
+    foundations = [
+        {"_id": "lernen", "past_projects": [{"name": "Lernpaten", "description": "Hausaufgabenhilfe für Kinder"}]},
+        {"_id": "kirche", "past_projects": [{"name": "Dorfkirche", "description": "Renovierung des Kirchturms"}]},
+    ]
+    index = PastProjectIndex()
+    index._swap(index._build(foundations))
+    served = index.index
+
+    changed = [{"_id": "kirche", "past_projects": [{"name": "Lesen", "description": "Leseförderung für Kinder"}]}]
+    index._apply_patch(index._patch(changed, {"lernen"}))
+    assert index.index is not served
+    assert [group_id for group_id, _ in index.search("Leseförderung")] == ["kirche"]
+    assert set(index.index.groups) == {"kirche"}
+    assert set(served.groups) == {"lernen", "kirche"}
@@ -0,0 +1,107 @@
+"""Tests for the MinHash LSH index of recorded project rankings."""
+
+import numpy as np
+
+from app.models.project_description import CharitablePurpose, ProjectDescription
+from app.services.project_similarity_service import (
+    MinHasher,
+    ProjectSimilarityIndex,
+    project_group,
+    shingles,
+)
+from app.services.scoring_cache_service import project_fingerprint
+
+DESCRIPTION = (
+    "Ehrenamtliche Lernpaten helfen Grundschulkindern aus dem Stadtteil zweimal pro Woche "
+    "bei den Hausaufgaben und beim Lesenlernen in den Räumen der Stadtbibliothek"
+)
+
+
+def make_project(description=DESCRIPTION, location="München", purposes=None):
+    return ProjectDescription(
+        name="Lernpaten",
+        description=description,
+        target_group="Grundschulkinder",
+        charitable_purpose=purposes or [CharitablePurpose.YOUTH_AND_ELDERLY_CARE],
+        location=location,
+    )
+
+
+def jaccard(left, right):
+    a, b = shingles(left), shingles(right)
+    return len(a & b) / len(a | b)
+
+
+def test_shingles_normalize_case_and_punctuation():
+    assert shingles("Hallo, Welt!") == shingles("hallo welt")
+    assert shingles("abc") == {"abc"}
+    assert shingles("") == set()
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher()
+    left = DESCRIPTION
+    right = DESCRIPTION.replace("zweimal", "dreimal").replace("Lesenlernen", "Rechnen")
+    other = "Sanierung des Vereinsheims und Anschaffung neuer Trikots für die Fußballjugend"
+    estimate = hasher.similarity(hasher.signature(left), hasher.signature(right))
+    assert abs(estimate - jaccard(left, right)) < 0.1
+    assert hasher.similarity(hasher.signature(left), hasher.signature(other)) < 0.2
+    assert hasher.similarity(hasher.signature(left), hasher.signature(left)) == 1.0
+
+
+def test_signatures_are_deterministic():
+    assert np.array_equal(MinHasher().signature(DESCRIPTION), MinHasher().signature(DESCRIPTION))
+
+
+def test_group_key_ignores_purpose_order_and_location_case():
+    purposes = [CharitablePurpose.SPORTS, CharitablePurpose.YOUTH_AND_ELDERLY_CARE]
+    assert project_group(make_project(purposes=purposes, location=" münchen ")) == project_group(
+        make_project(purposes=list(reversed(purposes)), location="München")
+    )
+
+
+def test_find_returns_a_near_duplicate_with_the_same_group():
+    index = ProjectSimilarityIndex()
+    recorded = make_project()
+    index._add(project_fingerprint(recorded), recorded, [("f1", 0.9), ("f2", 0.7)])
+
+    similar = index.find(make_project(DESCRIPTION + " am Nachmittag"))
+    assert similar is not None
+    assert similar.fingerprint == project_fingerprint(recorded)
+    assert similar.ranking == [("f1", 0.9), ("f2", 0.7)]
+
+    assert index.find(make_project(DESCRIPTION + " am Nachmittag", location="Berlin")) is None
+    assert index.find(make_project("Neue Trikots für die Fußballjugend des Vereins")) is None
+    # The project itself is served by the scoring cache, not by reuse
+    assert index.find(recorded) is None
+
+
+def test_readding_a_fingerprint_replaces_its_buckets():
+    index = ProjectSimilarityIndex()
+    project = make_project()
+    fingerprint = project_fingerprint(project)
+    index._add(fingerprint, project, [("f1", 0.9)])
+    buckets = len(index._buckets)
+    index._add(fingerprint, project, [("f2", 0.8)])
+    assert len(index) == 1
+    assert len(index._buckets) == buckets
+    index._remove(fingerprint)
+    assert len(index) == 0
+    assert index._buckets == {}
+
+
+def test_build_indexes_recorded_documents_into_a_fresh_index():
+    index = ProjectSimilarityIndex()
+    recorded = make_project()
+    documents = [
+        {
+            "_id": project_fingerprint(recorded),
+            "project": recorded.model_dump(mode="json"),
+            "ranking": [["f1", 0.9], ["f2", 0.7]],
+        },
+        {"_id": "invalid", "project": {"name": "Ohne Beschreibung"}, "ranking": []},
+    ]
+    built = index._build(documents)
+    assert len(index) == 0
+    assert len(built) == 1
+    assert built.find(make_project(DESCRIPTION + " am Nachmittag")).ranking == [("f1", 0.9), ("f2", 0.7)]
@@ -0,0 +1,72 @@
+"""Tests for the region hierarchy and the geographic pruning rules."""
+
+from app.models.project_description import CharitablePurpose, ProjectDescription
+from app.services.region_service import get_region_hierarchy, normalize_region_name
+
+
+def make_project(name="Lernpaten", description="Hausaufgabenhilfe", location=None):
+    return ProjectDescription(
+        name=name,
+        description=description,
+        target_group="Kinder",
+        charitable_purpose=[CharitablePurpose.YOUTH_AND_ELDERLY_CARE],
+        location=location,
+    )
+
+
+def test_normalize_region_name():
+    assert normalize_region_name("Kempten (Allgäu)") == "kempten allgau"
+    assert normalize_region_name("Baden-Württemberg") == "baden wurttemberg"
+
+
+def test_resolve_names_and_aliases():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy.resolve("München") == ["de-by-muenchen"]
+    assert hierarchy.resolve("Muenchen") == ["de-by-muenchen"]
+    assert hierarchy.resolve("Bayern") == ["de-by"]
+    assert hierarchy.resolve("Landkreis Erding") == ["de-by-landkreis-erding"]
+
+
+def test_contains_follows_the_tree():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy.contains("de", "de-by-muenchen")
+    assert hierarchy.contains("de-by", "de-by-muenchen")
+    assert hierarchy.contains("de-by-muenchen", "de-by-muenchen")
+    assert not hierarchy.contains("de-by-muenchen", "de-by")
+    assert not hierarchy.contains("de-be-stadt", "de-by-muenchen")
+
+
+def test_common_words_need_a_location_preposition():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy.detect("Wir essen gemeinsam") == []
+    assert hierarchy.detect("Projekt in Essen") == ["de-nw-essen"]
+
+
+def test_location_regions_only_use_the_explicit_location():
+    hierarchy = get_region_hierarchy()
+    trip = make_project(name="Jugendfahrt nach Berlin")
+    assert hierarchy.location_regions(trip) == []
+    assert hierarchy.project_regions(trip) == ["de-be-stadt"]
+
+    located = make_project(name="Jugendfahrt nach Berlin", location="München")
+    assert hierarchy.location_regions(located) == ["de-by-muenchen"]
+    assert hierarchy.project_regions(located) == ["de-by-muenchen"]
+
+
+def test_can_fund():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy.can_fund(["de-by"], ["de-by-muenchen"])
+    # A coarser project location keeps more specific foundations
+    assert hierarchy.can_fund(["de-by-muenchen"], ["de-by"])
+    assert not hierarchy.can_fund(["de-be-stadt"], ["de-by-muenchen"])
+    # Unknown regions on either side never prune
+    assert hierarchy.can_fund([], ["de-by-muenchen"])
+    assert hierarchy.can_fund(["de-be-stadt"], [])
+
+
+def test_foundation_regions_fall_back_to_the_scope():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy.foundation_regions({"specific_areas": ["Bayern"], "scope": "regional"}) == ["de-by"]
+    assert hierarchy.foundation_regions({"specific_areas": ["Atlantis"], "scope": "national"}) == ["de"]
+    assert hierarchy.foundation_regions({"scope": "regional"}) == []
+    assert hierarchy.foundation_regions(None) == []
@@ -0,0 +1,111 @@
+"""Tests for the German analyzer (CISTEM, umlauts, compounds) and BM25 ranking."""
+
+from app.services import text_index_service
+from app.services.text_index_service import (
+    BM25Index,
+    FoundationTextIndex,
+    GermanAnalyzer,
+    cistem_stem,
+    fold_umlauts,
+)
+
+
+def test_fold_umlauts_maps_umlauts_and_transliterations_alike():
+    assert fold_umlauts("grüne") == fold_umlauts("gruene") == "grune"
+    assert fold_umlauts("straße") == "strasse"
+
+
+def test_cistem_conflates_inflected_forms():
+    assert cistem_stem("forderungen") == cistem_stem("forderung")
+    assert cistem_stem("kinder") == cistem_stem("kind")
+    assert cistem_stem("gefordert") == cistem_stem("fordert")
+    assert cistem_stem("") == ""
+
+
+def test_analyzer_drops_stopwords_and_stems():
+    analyzer = GermanAnalyzer()
+    assert analyzer.analyze("der die das und Kinder") == ["kind"]
+    assert analyzer.analyze("Förderungen") == analyzer.analyze("Foerderung")
+
+
+def test_analyzer_splits_compounds_against_the_learned_lexicon():
+    analyzer = GermanAnalyzer()
+    assert analyzer.analyze("Hausaufgabenhilfe") == ["hausaufgabenhilf"]
+
+    analyzer.learn("Hausaufgaben und Hilfe für Schüler")
+    assert analyzer.analyze("Hausaufgabenhilfe") == ["hausaufgabenhilf", "hausaufgab", "hilf"]
+
+
+def make_index():
+    analyzer = GermanAnalyzer()
+    documents = {
+        "sport": {"short_description": "Sportvereine und Sport für Kinder"},
+        "kultur": {"short_description": "Kunst und Kultur", "long_description": "Theater für Kinder"},
+        "umwelt": {"short_description": "Umweltschutz", "long_description": "Bäume pflanzen"},
+    }
+    for fields in documents.values():
+        for text in fields.values():
+            analyzer.learn(text)
+    index = BM25Index(analyzer, {"short_description": 2.0, "long_description": 1.0})
+    for doc_id, fields in documents.items():
+        index.add(doc_id, fields)
+    return index
+
+
+def test_bm25_ranks_matching_documents_first():
+    index = make_index()
+    hits = index.search("Sport für Kinder")
+    assert [doc_id for doc_id, _ in hits] == ["sport", "kultur"]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_bm25_weights_fields():
+    index = make_index()
+    index.add("theater", {"short_description": "Theater"})
+    hits = dict(index.search("Theater"))
+    # Same term, but in the short description (weight 2) of a shorter document
+    assert hits["theater"] > hits["kultur"]
+
+
+def test_bm25_restricts_to_candidates_and_limits():
+    index = make_index()
+    assert index.search("Kinder", candidate_ids=["kultur", "umwelt"]) == index.search("Kinder")[1:]
+    assert len(index.search("Kinder", limit=1)) == 1
+    assert index.search("Raumfahrt") == []
+
+
+def test_bm25_remove_and_readd():
+    index = make_index()
+    total_len = index.total_len
+    index.remove("umwelt")
+    assert len(index) == 2
+    assert index.search("Umweltschutz") == []
+    index.add("umwelt", {"short_description": "Umweltschutz", "long_description": "Bäume pflanzen"})
+    assert index.total_len == total_len
+    assert [doc_id for doc_id, _ in index.search("Umweltschutz")] == ["umwelt"]
+
+
+def test_patched_index_ranks_like_a_rebuilt_one():
+    foundations = [
+        {"_id": "sport", "short_description": "Sportvereine und Sport für Kinder"},
+        {"_id": "kultur", "short_description": "Kunst und Kultur"},
+        {"_id": "umwelt", "short_description": "Umweltschutz"},
+    ]
+    changed = [{"_id": "kultur", "short_description": "Theater für Kinder"}]
+    patched = FoundationTextIndex()
+    patched._swap(patched._build(foundations))
+    patched._apply_patch(patched._patch(changed, {"umwelt"}))
+
+    rebuilt = FoundationTextIndex()
+    rebuilt._swap(rebuilt._build([foundations[0], *changed]))
+    for query in ("Kinder", "Theater", "Kunst", "Umweltschutz"):
+        assert patched.search(query) == rebuilt.search(query)
+    assert len(patched.index) == 2
+
+
+def test_split_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(text_index_service, "_SPLIT_CACHE_SIZE", 2)
+    analyzer = GermanAnalyzer()
+    for word in ("hausaufgabenhilfe", "sportvereinsheim", "umweltschutzprojekt"):
+        analyzer.analyze(word)
+    assert len(analyzer._split_cache) <= 2
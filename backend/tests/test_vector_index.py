@@ -0,0 +1,41 @@
+"""Tests for the hashed TF-IDF matrix and its incremental patching."""
+
+from app.services.vector_index_service import FoundationVectorIndex
+
+FOUNDATIONS = [
+    {"_id": "sport", "short_description": "Sportvereine und Sport für Kinder"},
+    {"_id": "kultur", "short_description": "Kunst und Kultur"},
+    {"_id": "umwelt", "short_description": "Umweltschutz und Naturschutz"},
+]
+
+
+def build(foundations):
+    index = FoundationVectorIndex()
+    index._swap(index._build(foundations))
+    return index
+
+
+def test_search_tolerates_inflected_forms():
+    index = build(FOUNDATIONS)
+    hits = index.search("Sportverein für ein Kind")
+    assert hits[0][0] == "sport"
+    assert index.search("Naturschützer", limit=1)[0][0] == "umwelt"
+    assert [doc_id for doc_id, _ in index.search("Kultur", candidate_ids=["sport"])] == []
+
+
+def test_patch_swaps_in_a_packed_copy():
+    index = build(FOUNDATIONS)
+    served = index.matrix
+    changed = [{"_id": "kultur", "short_description": "Theater für Kinder"}]
+    index._apply_patch(index._patch(changed, {"umwelt"}))
+
+    # The served matrix is never changed, the patched copy is packed
+    assert len(served) == 3
+    assert len(index.matrix) == 2
+    assert not index.matrix._dirty
+
+    rebuilt = build([FOUNDATIONS[0], *changed])
+    for query in ("Kinder", "Theater", "Umweltschutz"):
+        assert [doc_id for doc_id, _ in index.search(query)] == [
+            doc_id for doc_id, _ in rebuilt.search(query)
+        ]